@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+# Copyright IRT Antoine de Saint Exupéry et Université Paul Sabatier Toulouse III - All
+# rights reserved. DEEL is a research program operated by IVADO, IRT Saint Exupéry,
+# CRIAQ and ANITI - https://www.deel.ai/
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""
+Micro-benchmark of the transfer loops of the providers, against a local HTTP
+server:
+
+    python benchmarks/transfer.py --size 512
+
+The former loops (1 KiB reads, one progress update per read) are compared with
+`deel.datasets.providers.transfer` (adaptive reads into a reusable buffer,
+throttled progress updates), and `shutil.copyfile` with `transfer.copy_file`.
+"""
+import argparse
+import contextlib
+import functools
+import http.server
+import os
+import pathlib
+import shutil
+import tempfile
+import threading
+import time
+import typing
+import urllib.request
+
+from tqdm import tqdm
+
+from deel.datasets.providers import transfer
+
+
+def legacy_download(url: str, target: pathlib.Path):
+    with urllib.request.urlopen(url) as conn, open(target, "wb") as fp:
+        pbar = tqdm(unit="bytes", unit_scale=True, unit_divisor=1024)
+        while True:
+            data = conn.read(1024)
+            if not data:
+                break
+            fp.write(data)
+            pbar.update(len(data))
+        pbar.close()
+
+
+def core_download(url: str, target: pathlib.Path):
+    with urllib.request.urlopen(url) as conn, open(target, "wb") as fp:
+        with transfer.Progress(None, target.name) as progress:
+            transfer.copy_stream(conn, fp, progress)
+
+
+def measure(
+    name: str, function: typing.Callable[[], None], size: int, repeat: int
+) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        # The progress bars are written, but not displayed:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stderr(devnull):
+            start = time.perf_counter()
+            function()
+            best = min(best, time.perf_counter() - start)
+    throughput = size / best / (1 << 20)
+    print("{:<28} {:>10.1f} MiB/s".format(name, throughput))
+    return throughput
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--size", type=int, default=256, help="file size in MiB")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per loop")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        root = pathlib.Path(folder)
+        source = root.joinpath("source.bin")
+        with open(source, "wb") as fp:
+            for _ in range(args.size):
+                fp.write(os.urandom(1 << 20))
+        size = source.stat().st_size
+        target = root.joinpath("target.bin")
+
+        class QuietHandler(http.server.SimpleHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+        handler = functools.partial(QuietHandler, directory=folder)
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = "http://127.0.0.1:{}/source.bin".format(server.server_port)
+
+        try:
+            legacy = measure(
+                "HTTP, 1 KiB reads",
+                lambda: legacy_download(url, target),
+                size,
+                args.repeat,
+            )
+            core = measure(
+                "HTTP, transfer.copy_stream",
+                lambda: core_download(url, target),
+                size,
+                args.repeat,
+            )
+            print("{:<28} {:>10.1f}x".format("Speed-up", core / legacy))
+
+            measure(
+                "File, shutil.copyfile",
+                lambda: shutil.copyfile(source, target),
+                size,
+                args.repeat,
+            )
+            measure(
+                "File, transfer.copy_file",
+                lambda: transfer.copy_file(source, target),
+                size,
+                args.repeat,
+            )
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == "__main__":
+    main()
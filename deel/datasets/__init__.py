@@ -23,6 +23,8 @@
 
 __version__ = "0.0.7"
 
+import asyncio
+import functools
 import logging
 from typing import Any
 from typing import Optional
@@ -40,6 +42,7 @@ def load(
     mode: Optional[str] = None,
     version: str = "latest",
     force_update: bool = False,
+    offline_first: Optional[bool] = None,
     with_info: bool = False,
     settings: Settings = None,
     **kwargs
@@ -55,6 +58,9 @@ def load(
             own sets of available modes.
         version: Version of the dataset.
         force_update: Force update of the local dataset if possible.
+        offline_first: If `True`, an exact version that is complete locally is used
+            without contacting the remote, if `False`, the remote is always contacted,
+            if `None`, the provider settings are used.
         with_info: Returns information about the dataset alongside the actual
             dataset(s).
         settings: Settings to use to load the dataset.
@@ -108,11 +114,71 @@ def load(
 
         # If this is not a volatile dataset:
         if isinstance(dataset_object, Dataset):
-            dataset_object.load(mode="path", force_update=force_update, **kwargs)
+            dataset_object.load(
+                mode="path",
+                force_update=force_update,
+                offline_first=offline_first,
+                **kwargs
+            )
 
         return dataset_object
 
     # Create the dataset object and load:
     return dataset_object.load(
-        mode=mode, force_update=force_update, with_info=with_info, **kwargs
+        mode=mode,
+        force_update=force_update,
+        offline_first=offline_first,
+        with_info=with_info,
+        **kwargs
+    )
+
+
+async def load_async(
+    dataset: str,
+    mode: Optional[str] = None,
+    version: str = "latest",
+    force_update: bool = False,
+    offline_first: Optional[bool] = None,
+    with_info: bool = False,
+    settings: Settings = None,
+    **kwargs
+) -> Any:
+    """
+    Awaitable version of `load`: the dataset is loaded on the default executor of
+    the event loop, so that multiple datasets can be loaded concurrently, e.g.,
+    with `asyncio.gather`.
+
+    Args:
+        dataset: Dataset to load.
+        mode: Mode to use, see `load`.
+        version: Version of the dataset.
+        force_update: Force update of the local dataset if possible.
+        offline_first: If `True`, an exact version that is complete locally is used
+            without contacting the remote, if `False`, the remote is always contacted,
+            if `None`, the provider settings are used.
+        with_info: Returns information about the dataset alongside the actual
+            dataset(s).
+        settings: Settings to use to load the dataset.
+        **kwargs: Extra arguments for the given dataset and mode.
+
+    Returns:
+        The dataset in the format specified by `mode`.
+
+    Raises:
+        DatasetNotFoundError: If the `dataset` does not exist.
+        ImportError: If the plugin could not be loaded.
+    """
+    return await asyncio.get_event_loop().run_in_executor(
+        None,
+        functools.partial(
+            load,
+            dataset,
+            mode=mode,
+            version=version,
+            force_update=force_update,
+            offline_first=offline_first,
+            with_info=with_info,
+            settings=settings,
+            **kwargs
+        ),
     )
@@ -21,6 +21,7 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 import argparse
+import logging
 import sys
 
 from . import load as load_dataset
@@ -41,6 +42,11 @@ def _store_dataset(args: argparse.Namespace, settings):
         args: Arguments from the command line.
         settings : settings from config
     """
+    # Report the changes found when revalidating the local datasets:
+    if args.force:
+        logging.basicConfig(format="%(message)s")
+        logging.getLogger("deel.datasets.providers").setLevel(logging.INFO)
+
     for dataset in args.datasets:
         print("Fetching {}... ".format(dataset))
 
@@ -57,6 +63,9 @@ def _store_dataset(args: argparse.Namespace, settings):
             version=version,
             settings=settings,
             force_update=args.force,
+            include=args.include,
+            exclude=args.exclude,
+            split=args.split,
         )
 
         print("Dataset {} loaded and stored at '{}'.".format(dataset, path))
@@ -83,9 +92,15 @@ def _list_dataset_for_provider(provider):
     print("Listing datasets at {}:".format(location))
 
     # List datasets:
-    datasets = sorted(provider.list_datasets())
-    for dataset in datasets:
-        versions = sorted(provider.list_versions(dataset), reverse=True)
+    if isinstance(provider, RemoteProvider):
+        catalogue = provider.list_catalogue()
+    else:
+        catalogue = {
+            dataset: provider.list_versions(dataset)
+            for dataset in provider.list_datasets()
+        }
+    for dataset in sorted(catalogue):
+        versions = sorted(catalogue[dataset], reverse=True)
         latest = provider.get_version("latest", versions)
         print(
             "  {}: {}".format(
@@ -306,7 +321,31 @@ download_parser.add_argument(
     help="provider in configuration to use",
 )
 download_parser.add_argument(
-    "-f", "--force", action="store_true", help="force download"
+    "-f",
+    "--force",
+    action="store_true",
+    help="force update, only the files that changed on the remote are downloaded",
+)
+download_parser.add_argument(
+    "-i",
+    "--include",
+    action="append",
+    metavar="PATTERN",
+    help="only download the files matching the given glob pattern (relative to the "
+    "dataset folder, e.g., 'train/cats/**'), can be repeated",
+)
+download_parser.add_argument(
+    "-x",
+    "--exclude",
+    action="append",
+    metavar="PATTERN",
+    help="do not download the files matching the given glob pattern, can be repeated",
+)
+download_parser.add_argument(
+    "-s",
+    "--split",
+    type=str,
+    help="only download the given split (top-level folder) of the datasets",
 )
 download_parser.set_defaults(func=download_datasets)
 
@@ -24,7 +24,10 @@ import pathlib
 import typing
 from abc import abstractmethod
 
+from .providers.archive_folder import ArchiveFolder
 from .providers.provider import Provider
+from .providers.remote_provider import RemoteProvider
+from .providers.selection import Selection
 from .settings import get_default_settings
 from .settings import Settings
 
@@ -229,6 +232,19 @@ class Dataset(BaseDataset):
         """
         return self._settings.make_provider(self._name)
 
+    def _lease_provider(self) -> typing.ContextManager[Provider]:
+        """
+        Lease a provider for this dataset from the process-wide `ProviderPool` (see
+        `Settings.lease_provider`), unless `_get_provider` is overridden, in which
+        case the provider it creates is used.
+
+        Returns:
+            A context manager returning the provider.
+        """
+        if type(self)._get_provider is not Dataset._get_provider:
+            return self._get_provider()
+        return self._settings.lease_provider(self._name)
+
     def load_path(self, path: pathlib.Path) -> pathlib.Path:
         """
         Load method for path mode.
@@ -246,6 +262,10 @@ class Dataset(BaseDataset):
         mode: typing.Optional[str] = None,
         with_info: bool = False,
         force_update: bool = False,
+        offline_first: typing.Optional[bool] = None,
+        include: typing.Union[None, str, typing.Sequence[str]] = None,
+        exclude: typing.Union[None, str, typing.Sequence[str]] = None,
+        split: typing.Optional[str] = None,
         **kwargs
     ) -> typing.Any:
         """
@@ -257,11 +277,25 @@ class Dataset(BaseDataset):
 
         If this dataset consists of a single file as specified by `_single_file`,
         the path used will be the one of this file, otherwise, the folder will
-        be used.
+        be used. If the provider keeps the archives of the dataset instead of
+        extracting them, the path is the root `ArchivePath` of an `ArchiveFolder`.
+
+        With a remote provider, a subset of the dataset can be retrieved using glob
+        patterns on the paths of the files, relative to the dataset folder (see
+        `Selection`), e.g., `include="test"` or `exclude="**/*.tif"`, in which case
+        the other files may be missing from the dataset folder.
 
         Args:
             mode: Mode to load the dataset, or `None` to use the default mode.
             force_update: Force update of the dataset if possible.
+            offline_first: If `True`, an exact version that is complete locally is
+                used without contacting the remote, if `False`, the remote is always
+                contacted, if `None`, the provider settings are used.
+            include: Patterns of the files to retrieve, or `None` to retrieve all
+                the files that are not excluded.
+            exclude: Patterns of the files to not retrieve.
+            split: Name of a split of the dataset (i.e., of a top-level folder,
+                e.g., `"test"`) to retrieve, added to the `include` patterns.
             with_info: Returns information about the dataset alongside the actual
                 dataset(s).
             **kwargs: Extra arguments for the specific mode.
@@ -282,13 +316,33 @@ class Dataset(BaseDataset):
         if mode not in self.available_modes:
             raise InvalidModeError(self, mode)
 
-        with self._get_provider() as provider:
+        # Resolution policy, only available for remote providers:
+        folder_kwargs = {}
+        if offline_first is not None:
+            folder_kwargs["offline_first"] = offline_first
+        if split is not None:
+            include = [include] if isinstance(include, str) else list(include or [])
+            include.append(split)
+        if include is not None or exclude is not None:
+            folder_kwargs["selection"] = Selection(include, exclude)
+
+        with self._lease_provider() as provider:
+            if not isinstance(provider, RemoteProvider):
+                folder_kwargs = {}
             path, version = provider.get_folder(
                 self._name,
                 self._version,
                 force_update=force_update,
                 returns_version=True,
+                **folder_kwargs
             )
+            keep_archives = isinstance(provider, RemoteProvider) and (
+                provider.keep_archives
+            )
+
+        # Members of the kept archives are read directly from the archives:
+        if keep_archives:
+            path = ArchiveFolder(path).root
 
         # Update version:
         self._info["version"] = version
@@ -393,9 +447,10 @@ class VolatileDataset(BaseDataset):
         if mode not in self.available_modes:
             raise InvalidModeError(self, mode)
 
-        # Remove force_update:
-        if "force_update" in kwargs:
-            del kwargs["force_update"]
+        # Remove the arguments used to retrieve the files:
+        for name in ("force_update", "offline_first", "include", "exclude", "split"):
+            if name in kwargs:
+                del kwargs[name]
 
         # Retrieve the method:
         load_fn = getattr(self, "load_" + mode)
@@ -29,6 +29,42 @@ from .provider import Provider
 
 logger = logging.getLogger(__name__)
 
+# Options of the configuration forwarded to all the remote providers:
+REMOTE_PROVIDER_OPTIONS: typing.Tuple[str, ...] = (
+    "max_workers",
+    "dedup",
+    "delta_sync",
+    "revalidate",
+    "catalogue_ttl",
+    "catalogue_max_stale",
+    "offline_first",
+    "checksum",
+    "lock_timeout",
+    "cache_size",
+    "cache_policy",
+    "keep_archives",
+    "extract_workers",
+)
+
+
+def _remote_options(
+    provider_options: typing.Dict[str, typing.Any]
+) -> typing.Dict[str, typing.Any]:
+    """
+    Extract the options for `RemoteProvider` from the given provider options.
+
+    Args:
+        provider_options: Options of the provider.
+
+    Returns:
+        The keyword arguments to forward to `RemoteProvider`.
+    """
+    return {
+        key: provider_options[key]
+        for key in REMOTE_PROVIDER_OPTIONS
+        if key in provider_options
+    }
+
 
 def make_provider(
     provider_type: str,
@@ -64,7 +100,12 @@ def make_provider(
         source_path = provider_options["path"]
 
         if "copy" in provider_options and provider_options["copy"] is True:
-            return LocalAsProvider(root_folder=root_path, source_folder=source_path)
+            return LocalAsProvider(
+                root_folder=root_path,
+                source_folder=source_path,
+                materialize=provider_options.get("materialize", "copy"),
+                **_remote_options(provider_options)
+            )
 
         return LocalProvider(root_folder=source_path)
 
@@ -110,6 +151,7 @@ def make_provider(
             remote_url=provider_options["url"],
             remote_path=remote_path,
             authenticator=webdav_authenticator,
+            **_remote_options(provider_options)
         )
 
     elif provider_type == "ftp":
@@ -136,6 +178,7 @@ def make_provider(
             root_path,
             remote_url=provider_options["url"],
             authenticator=ftp_authenticator,
+            **_remote_options(provider_options)
         )
 
     raise InvalidConfigurationError("Invalid provider type '{}'.".format(provider_type))
@@ -0,0 +1,687 @@
+# -*- coding: utf-8 -*-
+# Copyright IRT Antoine de Saint Exupéry et Université Paul Sabatier Toulouse III - All
+# rights reserved. DEEL is a research program operated by IVADO, IRT Saint Exupéry,
+# CRIAQ and ANITI - https://www.deel.ai/
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import fnmatch
+import io
+import json
+import mmap
+import os
+import pathlib
+import stat
+import threading
+import typing
+import zipfile
+
+from .tar_index import TarIndex
+
+# Suffix of the index of an archive, appended to the name of the archive:
+INDEX_SUFFIX: str = ".index"
+
+
+def archive_format(file: pathlib.Path) -> typing.Optional[str]:
+    """
+    Find the format of the given archive from its name.
+
+    Args:
+        file: Path to the archive.
+
+    Returns:
+        The format of the archive (`"zip"`, `"tar"` or `"tar.gz"`), or `None` if
+        the file is not an archive that can be indexed.
+    """
+    if file.suffix in (".zip", ".tar"):
+        return file.suffix[1:]
+    if file.suffix == ".tgz" or file.suffixes[-2:] == [".tar", ".gz"]:
+        return "tar.gz"
+    return None
+
+
+def index_path(archive: pathlib.Path) -> pathlib.Path:
+    """
+    Args:
+        archive: Path to an archive.
+
+    Returns:
+        The path of the index of the given archive.
+    """
+    return archive.with_name(archive.name + INDEX_SUFFIX)
+
+
+def _check_member(archive: pathlib.Path, name: str):
+    """
+    Check that the given member of an archive stays inside the folder of the
+    archive.
+
+    Args:
+        archive: Path to the archive.
+        name: Name of the member.
+
+    Raises:
+        Exception: If the member would be outside of the folder of the archive.
+    """
+    path = pathlib.PurePosixPath(name)
+    if path.is_absolute() or ".." in path.parts:
+        raise Exception("Attempted Path Traversal in {}".format(archive.name))
+
+
+class ZipIndex(object):
+
+    """
+    Index of the members of a zip archive, mapping the name of each regular
+    file to the offset of its local header in the archive and its size, so
+    that the members can be listed without reading the archive.
+    """
+
+    # Size of the indexed archive, used to detect outdated indexes:
+    _archive_size: int
+
+    # Offset and size of the members, by name:
+    _members: typing.Dict[str, typing.Tuple[int, int]]
+
+    def __init__(
+        self, archive_size: int, members: typing.Dict[str, typing.Tuple[int, int]]
+    ):
+        """
+        Args:
+            archive_size: Size of the indexed archive, in bytes.
+            members: Offset and size of the members, by name.
+        """
+        self._archive_size = archive_size
+        self._members = members
+
+    @property
+    def format(self) -> str:
+        """
+        Returns: The format of the archive (`"zip"`).
+        """
+        return "zip"
+
+    @property
+    def members(self) -> typing.Dict[str, typing.Tuple[int, int]]:
+        """
+        Returns: The offset and size of the members, by name.
+        """
+        return self._members
+
+    @staticmethod
+    def build(archive: pathlib.Path) -> "ZipIndex":
+        """
+        Build the index of the given archive, from its central directory.
+
+        Args:
+            archive: Path to the archive.
+
+        Returns:
+            The index of the archive.
+
+        Raises:
+            Exception: If a member would be outside of the folder of the archive.
+        """
+        members: typing.Dict[str, typing.Tuple[int, int]] = {}
+        with zipfile.ZipFile(archive, "r") as zp:
+            for info in zp.infolist():
+                if not info.is_dir():
+                    _check_member(archive, info.filename)
+                    members[info.filename] = (info.header_offset, info.file_size)
+        return ZipIndex(archive.stat().st_size, members)
+
+    @staticmethod
+    def load(path: pathlib.Path, archive: pathlib.Path) -> typing.Optional["ZipIndex"]:
+        """
+        Load the index of the given archive from the given file.
+
+        Args:
+            path: Path to the index file.
+            archive: Path to the archive.
+
+        Returns:
+            The index of the archive, or `None` if the index does not exist, is
+            invalid or is outdated.
+        """
+        try:
+            with open(path, "r") as fp:
+                data = json.load(fp)
+            if data["archive_size"] != archive.stat().st_size:
+                return None
+            return ZipIndex(
+                data["archive_size"],
+                {name: (offset, size) for name, offset, size in data["members"]},
+            )
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def save(self, path: pathlib.Path) -> pathlib.Path:
+        """
+        Save this index to the given file.
+
+        Args:
+            path: Path to the index file.
+
+        Returns:
+            The path to the index file.
+        """
+        tmp = path.with_name("{}.{}.tmp".format(path.name, os.getpid()))
+        with open(tmp, "w") as fp:
+            json.dump(
+                {
+                    "archive_size": self._archive_size,
+                    "members": [
+                        [name, offset, size]
+                        for name, (offset, size) in self._members.items()
+                    ],
+                },
+                fp,
+            )
+        os.replace(tmp, path)
+        return path
+
+
+# Index of an archive:
+ArchiveIndex = typing.Union[ZipIndex, TarIndex]
+
+
+def build_index(archive: pathlib.Path) -> pathlib.Path:
+    """
+    Build the index of the given archive and save it next to the archive.
+
+    Args:
+        archive: Path to the archive, zip, uncompressed tar or block-compressed
+            tar (see `tar_index.is_block_compressed`).
+
+    Returns:
+        The path to the index file.
+
+    Raises:
+        Exception: If a member would be outside of the folder of the archive.
+    """
+    index: ArchiveIndex
+    if archive_format(archive) == "zip":
+        index = ZipIndex.build(archive)
+    else:
+        index = TarIndex.build(archive)
+    return index.save(index_path(archive))
+
+
+def load_index(archive: pathlib.Path) -> typing.Optional[ArchiveIndex]:
+    """
+    Load the index of the given archive.
+
+    Args:
+        archive: Path to the archive.
+
+    Returns:
+        The index of the archive, or `None` if the archive has no index or if
+        the index is outdated.
+    """
+    format = archive_format(archive)
+    if format is None:
+        return None
+    if format == "zip":
+        return ZipIndex.load(index_path(archive), archive)
+    return TarIndex.load(index_path(archive), archive)
+
+
+class MemberReader(io.RawIOBase):
+
+    """
+    Read-only seekable stream over a buffer (e.g., the content of a member of a
+    memory-mapped tar archive), without copying the buffer.
+    """
+
+    # The buffer:
+    _view: memoryview
+
+    # Current position in the buffer:
+    _position: int
+
+    def __init__(self, view: memoryview):
+        """
+        Args:
+            view: The buffer to read.
+        """
+        super().__init__()
+        self._view = view
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def getbuffer(self) -> memoryview:
+        """
+        Returns:
+            The whole buffer, without copy.
+        """
+        return self._view
+
+    def readinto(self, buffer) -> int:
+        data = self._view[self._position : self._position + len(buffer)]
+        memoryview(buffer).cast("B")[: len(data)] = data
+        self._position += len(data)
+        return len(data)
+
+    def read(self, size: typing.Optional[int] = -1) -> bytes:
+        end = len(self._view)
+        if size is not None and size >= 0:
+            end = min(end, self._position + size)
+        data = self._view[self._position : end].tobytes()
+        self._position += len(data)
+        return data
+
+    def readall(self) -> bytes:
+        return self.read()
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        if offset < 0:
+            raise ValueError("Negative seek position {}.".format(offset))
+        self._position = offset
+        return offset
+
+    def tell(self) -> int:
+        return self._position
+
+
+class _Archive(object):
+
+    """
+    Indexed archive of an `ArchiveFolder`, with the handles used to read its
+    members. Uncompressed tar archives are memory-mapped once per process, other
+    archives are opened once per thread and per process so that workers do not
+    share a file position.
+    """
+
+    # Path to the archive:
+    path: pathlib.Path
+
+    # Index of the archive:
+    index: ArchiveIndex
+
+    # Memory-mapping of an uncompressed tar archive, and the process it belongs to:
+    _mmap: typing.Optional[mmap.mmap]
+    _mmap_pid: int
+
+    # Handle of the current thread, and the process it belongs to:
+    _local: threading.local
+
+    _lock: threading.Lock
+
+    def __init__(self, path: pathlib.Path, index: ArchiveIndex):
+        self.path = path
+        self.index = index
+        self._mmap = None
+        self._mmap_pid = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _mapping(self) -> mmap.mmap:
+        with self._lock:
+            if self._mmap is None or self._mmap_pid != os.getpid():
+                with open(self.path, "rb") as fp:
+                    self._mmap = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+                self._mmap_pid = os.getpid()
+            return self._mmap
+
+    @property
+    def mapped(self) -> bool:
+        """
+        Returns: `True` if the members are read from a memory-mapping.
+        """
+        return isinstance(self.index, TarIndex) and not self.index.compressed
+
+    def _handle(self) -> typing.Any:
+        if getattr(self._local, "pid", None) != os.getpid():
+            if isinstance(self.index, TarIndex):
+                self._local.handle = open(self.path, "rb")
+            else:
+                self._local.handle = zipfile.ZipFile(self.path, "r")
+            self._local.pid = os.getpid()
+        return self._local.handle
+
+    def view(self, name: str) -> memoryview:
+        """
+        Returns:
+            A view on the content of the given member, without copy if `mapped`.
+        """
+        if not self.mapped:
+            if isinstance(self.index, TarIndex):
+                return memoryview(self.index.read(self._handle(), name))
+            return memoryview(self._handle().read(name))
+        offset, size = self.index.members[name]
+        return memoryview(self._mapping())[offset : offset + size]
+
+    def open(self, name: str) -> typing.BinaryIO:
+        """
+        Returns:
+            A readable stream over the content of the given member.
+        """
+        if isinstance(self.index, TarIndex):
+            return MemberReader(self.view(name))  # type: ignore
+        return self._handle().open(name, "r")  # type: ignore
+
+
+# A file of an `ArchiveFolder`: the archive containing it (`None` for files that
+# are not in an archive), its name in the archive (or its path) and its size:
+_File = typing.Tuple[typing.Optional[_Archive], str, int]
+
+
+class ArchiveFolder(object):
+
+    """
+    Read-only view of a dataset version whose archives were kept instead of
+    being extracted (see `RemoteProvider` with `keep_archives`), in which the
+    members of the indexed archives appear as files in the folder of their
+    archive, and the archives and their indexes are hidden.
+
+    The files are accessed through `ArchivePath` objects, starting from `root`,
+    which support the `pathlib.Path` methods used to list and read files.
+
+    Example:
+        >>> root = ArchiveFolder(path).root
+        >>> for image in root.glob("train/*/*.png"):
+        ...     with image.open("rb") as fp:
+        ...         ...
+    """
+
+    # Path to the version folder:
+    _path: pathlib.Path
+
+    # Files of the folder, by relative path:
+    _files: typing.Dict[str, _File]
+
+    # Names of the children of each directory, by relative path ("" for the root):
+    _children: typing.Dict[str, typing.Dict[str, None]]
+
+    def __init__(self, path: pathlib.Path):
+        """
+        Args:
+            path: Path to the version folder.
+        """
+        self._path = path
+        self._files = {}
+        self._children = {"": {}}
+
+        for dirpath, dirnames, filenames in os.walk(path):
+            dirnames.sort()
+            parent = pathlib.Path(dirpath).relative_to(path).as_posix()
+            parent = "" if parent == "." else parent
+            for name in sorted(filenames):
+                relative = self._join(parent, name)
+                if name.endswith(INDEX_SUFFIX) and name[: -len(INDEX_SUFFIX)] in (
+                    filenames
+                ):
+                    continue
+                file = pathlib.Path(dirpath, name)
+                index = load_index(file)
+                if index is None:
+                    self._add(relative, (None, str(file), file.stat().st_size))
+                    continue
+                archive = _Archive(file, index)
+                for member, (_, size) in index.members.items():
+                    self._add(
+                        self._join(parent, pathlib.PurePosixPath(member).as_posix()),
+                        (archive, member, size),
+                    )
+
+    @staticmethod
+    def _join(parent: str, name: str) -> str:
+        return name if not parent else parent + "/" + name
+
+    def _add(self, relative: str, file: _File):
+        self._files[relative] = file
+        name = relative
+        while name:
+            parent, _, base = name.rpartition("/")
+            children = self._children.setdefault(parent, {})
+            if base in children:
+                break
+            children[base] = None
+            name = parent
+
+    @staticmethod
+    def has_archives(path: pathlib.Path) -> bool:
+        """
+        Check if the given version folder contains indexed archives.
+
+        Args:
+            path: Path to the version folder.
+
+        Returns:
+            `True` if the folder contains at least one indexed archive.
+        """
+        return any(
+            index.with_name(index.name[: -len(INDEX_SUFFIX)]).is_file()
+            for index in path.rglob("*" + INDEX_SUFFIX)
+        )
+
+    @property
+    def path(self) -> pathlib.Path:
+        """
+        Returns: The path to the version folder.
+        """
+        return self._path
+
+    @property
+    def root(self) -> "ArchivePath":
+        """
+        Returns: The root folder of the version.
+        """
+        return ArchivePath(self, "")
+
+
+class ArchivePath(object):
+
+    """
+    Path of a file or directory of an `ArchiveFolder`, with a subset of the
+    interface of `pathlib.Path` (files are read-only).
+    """
+
+    # The folder this path belongs to:
+    _folder: ArchiveFolder
+
+    # Path relative to the folder, "" for the root:
+    _relative: str
+
+    def __init__(self, folder: ArchiveFolder, relative: str):
+        self._folder = folder
+        self._relative = relative
+
+    def _make(self, relative: str) -> "ArchivePath":
+        return ArchivePath(self._folder, relative)
+
+    def _file(self) -> _File:
+        try:
+            return self._folder._files[self._relative]
+        except KeyError:
+            raise FileNotFoundError(str(self))
+
+    @property
+    def _pure(self) -> pathlib.PurePosixPath:
+        return pathlib.PurePosixPath(self._relative)
+
+    @property
+    def name(self) -> str:
+        return self._pure.name
+
+    @property
+    def suffix(self) -> str:
+        return self._pure.suffix
+
+    @property
+    def suffixes(self) -> typing.List[str]:
+        return self._pure.suffixes
+
+    @property
+    def stem(self) -> str:
+        return self._pure.stem
+
+    @property
+    def parts(self) -> typing.Tuple[str, ...]:
+        return self._pure.parts
+
+    @property
+    def parent(self) -> "ArchivePath":
+        return self._make(self._relative.rpartition("/")[0])
+
+    def joinpath(self, *others: typing.Union[str, os.PathLike]) -> "ArchivePath":
+        relative = self._pure.joinpath(*others).as_posix()
+        return self._make("" if relative == "." else relative)
+
+    def __truediv__(self, other: typing.Union[str, os.PathLike]) -> "ArchivePath":
+        return self.joinpath(other)
+
+    def relative_to(self, other: "ArchivePath") -> pathlib.PurePosixPath:
+        return self._pure.relative_to(other._pure)
+
+    def __str__(self) -> str:
+        return str(self._folder.path.joinpath(self._relative))
+
+    def __repr__(self) -> str:
+        return "ArchivePath('{}')".format(self)
+
+    def _key(self) -> typing.Tuple[str, typing.Tuple[str, ...]]:
+        return (str(self._folder.path), self.parts)
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, ArchivePath) and self._key() == other._key()
+
+    def __lt__(self, other: "ArchivePath") -> bool:
+        return self._key() < other._key()
+
+    def __hash__(self) -> int:
+        return hash(self._key())
+
+    def is_dir(self) -> bool:
+        return self._relative in self._folder._children
+
+    def is_file(self) -> bool:
+        return self._relative in self._folder._files
+
+    def exists(self) -> bool:
+        return self.is_dir() or self.is_file()
+
+    def stat(self) -> os.stat_result:
+        """
+        Returns:
+            The status of this path (only the mode and the size are set for the
+            members of archives).
+        """
+        if self.is_dir():
+            return os.stat_result((stat.S_IFDIR | 0o555,) + (0,) * 9)
+        archive, name, size = self._file()
+        if archive is None:
+            return os.stat(name)
+        return os.stat_result((stat.S_IFREG | 0o444, 0, 0, 1, 0, 0, size, 0, 0, 0))
+
+    def iterdir(self) -> typing.Iterator["ArchivePath"]:
+        if not self.is_dir():
+            raise NotADirectoryError(str(self))
+        for name in self._folder._children[self._relative]:
+            yield self._make(ArchiveFolder._join(self._relative, name))
+
+    def _glob(
+        self, parts: typing.Sequence[str], seen: typing.Set[str]
+    ) -> typing.Iterator["ArchivePath"]:
+        if not parts:
+            if self._relative not in seen:
+                seen.add(self._relative)
+                yield self
+            return
+        if not self.is_dir():
+            return
+        if parts[0] == "**":
+            yield from self._glob(parts[1:], seen)
+            for child in self.iterdir():
+                if child.is_dir():
+                    yield from child._glob(parts, seen)
+        else:
+            for child in self.iterdir():
+                if fnmatch.fnmatchcase(child.name, parts[0]):
+                    yield from child._glob(parts[1:], seen)
+
+    def glob(self, pattern: str) -> typing.Iterator["ArchivePath"]:
+        """
+        Iterate over the files and directories matching the given relative
+        pattern, see `pathlib.Path.glob`.
+        """
+        return self._glob(pathlib.PurePosixPath(pattern).parts, set())
+
+    def rglob(self, pattern: str) -> typing.Iterator["ArchivePath"]:
+        """
+        Iterate over the files and directories matching the given relative
+        pattern in this directory and its subdirectories.
+        """
+        return self.glob("**/" + pattern)
+
+    def open(self, mode: str = "r", encoding: typing.Optional[str] = None) -> typing.IO:
+        """
+        Open this file for reading. The members of uncompressed tar archives are
+        read from the memory-mapped archive without copy, the members of other
+        archives are read through a handle specific to the current thread and
+        process.
+
+        Args:
+            mode: Mode to open the file with (`"r"` or `"rb"`).
+            encoding: Encoding of the file, for text mode.
+
+        Returns:
+            A readable stream over the content of this file.
+
+        Raises:
+            ValueError: If the mode is not a read mode.
+            FileNotFoundError: If this file does not exist.
+        """
+        if mode not in ("r", "rb"):
+            raise ValueError("Invalid mode '{}', files are read-only.".format(mode))
+        archive, name, _ = self._file()
+        if archive is None:
+            return open(name, mode, encoding=encoding)
+        stream = archive.open(name)
+        if mode == "r":
+            return io.TextIOWrapper(stream, encoding=encoding)  # type: ignore
+        return stream
+
+    def read_bytes(self) -> bytes:
+        with self.open("rb") as fp:
+            return fp.read()
+
+    def read_text(self, encoding: typing.Optional[str] = None) -> str:
+        with self.open("r", encoding=encoding) as fp:
+            return fp.read()
+
+    def read_buffer(self) -> memoryview:
+        """
+        Read the content of this file, without copy for the members of
+        uncompressed tar archives.
+
+        Returns:
+            A view on the content of this file.
+        """
+        archive, name, _ = self._file()
+        if archive is not None:
+            return archive.view(name)
+        return memoryview(self.read_bytes())
@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+# Copyright IRT Antoine de Saint Exupéry et Université Paul Sabatier Toulouse III - All
+# rights reserved. DEEL is a research program operated by IVADO, IRT Saint Exupéry,
+# CRIAQ and ANITI - https://www.deel.ai/
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import asyncio
+import concurrent.futures
+import functools
+import pathlib
+import threading
+import typing
+import weakref
+
+from .provider import Provider
+from .provider_pool import ProviderPool
+
+T = typing.TypeVar("T")
+
+# Locks serialising the calls to the providers wrapped by `AsyncProvider`, shared
+# by all the instances wrapping the same provider:
+_PROVIDER_LOCKS: "weakref.WeakKeyDictionary[Provider, threading.Lock]" = (
+    weakref.WeakKeyDictionary()
+)
+_PROVIDER_LOCKS_LOCK: threading.Lock = threading.Lock()
+
+
+def _provider_lock(provider: Provider) -> threading.Lock:
+    """
+    Args:
+        provider: A provider.
+
+    Returns:
+        The lock serialising the calls to the given provider.
+    """
+    with _PROVIDER_LOCKS_LOCK:
+        return _PROVIDER_LOCKS.setdefault(provider, threading.Lock())
+
+
+class AsyncProvider(object):
+
+    """
+    Asynchronous interface over a `Provider`, for notebooks and asynchronous
+    services that need several datasets at once.
+
+    The blocking methods of the providers run on a thread pool. Providers are not
+    thread-safe (e.g., a FTP connection cannot be shared), so the calls to a
+    wrapped provider run one at a time. To run calls concurrently, a function
+    creating providers can be wrapped instead: each running call then uses its own
+    provider, and at most `max_concurrency` of them run at the same time. The
+    providers are reused by the following calls and closed when exiting.
+
+    Concurrent calls to `get_folder` for the same dataset version share a single
+    retrieval.
+
+    Example:
+        >>> async with AsyncProvider(lambda: make_provider(...)) as aprovider:
+        ...     paths = await asyncio.gather(
+        ...         aprovider.get_folder("blink"), aprovider.get_folder("acas")
+        ...     )
+    """
+
+    # Default maximum number of concurrent calls to the providers:
+    DEFAULT_MAX_CONCURRENCY: int = 4
+
+    # The wrapped provider, or `None` if providers are created by `_factory`:
+    _provider: typing.Optional[Provider]
+
+    # Function creating the providers, and the pool of the providers created,
+    # `None` if a single provider is wrapped:
+    _factory: typing.Optional[typing.Callable[[], Provider]]
+    _pool: typing.Optional[ProviderPool]
+
+    # Maximum number of concurrent calls to the providers:
+    _max_concurrency: int
+
+    # Executor to run the blocking calls on, `None` for the default executor
+    # of the event loop:
+    _executor: typing.Optional[concurrent.futures.Executor]
+
+    # Event loop the semaphore and pending retrievals belong to:
+    _loop: typing.Optional[asyncio.AbstractEventLoop]
+    _semaphore: typing.Optional[asyncio.Semaphore]
+    _pending: typing.Dict[typing.Tuple[typing.Any, ...], "asyncio.Future[typing.Any]"]
+
+    def __init__(
+        self,
+        provider: typing.Union[Provider, typing.Callable[[], Provider]],
+        max_concurrency: typing.Optional[int] = None,
+        executor: typing.Optional[concurrent.futures.Executor] = None,
+    ):
+        """
+        Args:
+            provider: The provider to wrap, whose methods are called one at a time,
+                or a function creating new providers, so that calls run
+                concurrently.
+            max_concurrency: Maximum number of concurrent calls to the providers,
+                or `None` to use `DEFAULT_MAX_CONCURRENCY`.
+            executor: Executor to run the blocking calls on, or `None` to use the
+                default executor of the event loop.
+        """
+        if max_concurrency is None:
+            max_concurrency = self.DEFAULT_MAX_CONCURRENCY
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1.")
+
+        if isinstance(provider, Provider):
+            self._provider, self._factory, self._pool = provider, None, None
+        else:
+            self._provider, self._factory = None, provider
+            self._pool = ProviderPool(max_idle=max_concurrency)
+        self._max_concurrency = max_concurrency
+        self._executor = executor
+        self._loop = None
+        self._semaphore = None
+        self._pending = {}
+
+    @property
+    def provider(self) -> typing.Optional[Provider]:
+        """
+        Returns: The wrapped provider, or `None` if providers are created by a
+        function.
+        """
+        return self._provider
+
+    def _bind(self) -> asyncio.AbstractEventLoop:
+        """
+        Bind this provider to the current event loop, the semaphore and the
+        pending retrievals are specific to an event loop.
+
+        Returns:
+            The current event loop.
+        """
+        loop = asyncio.get_event_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self._max_concurrency)
+            self._pending = {}
+        return loop
+
+    async def _run(self, function: typing.Callable[..., T], *args, **kwargs) -> T:
+        """
+        Run the given blocking function on the executor, once a slot is available.
+
+        Args:
+            function: The function to run.
+            *args: Positional arguments for the function.
+            **kwargs: Keyword arguments for the function.
+
+        Returns:
+            The value returned by the function.
+        """
+        loop = self._bind()
+        async with self._semaphore:  # type: ignore
+            return await loop.run_in_executor(
+                self._executor, functools.partial(function, *args, **kwargs)
+            )
+
+    def _call(self, method: str, *args, **kwargs) -> typing.Any:
+        """
+        Call the given method of the wrapped provider, once the previous calls are
+        done, or of a provider of the pool that is not in use.
+
+        Args:
+            method: Name of the method.
+            *args: Positional arguments for the method.
+            **kwargs: Keyword arguments for the method.
+
+        Returns:
+            The value returned by the method.
+        """
+        if self._pool is None:
+            with _provider_lock(self._provider):  # type: ignore
+                return getattr(self._provider, method)(*args, **kwargs)
+        with self._pool.lease(None, self._factory) as provider:  # type: ignore
+            return getattr(provider, method)(*args, **kwargs)
+
+    async def __aenter__(self) -> "AsyncProvider":
+        # The providers created by the factory are entered when created:
+        if self._pool is None:
+            await self._run(self._call, "__enter__")
+        return self
+
+    async def __aexit__(self, type, value, traceback):
+        if self._pool is None:
+            return await self._run(self._call, "__exit__", type, value, traceback)
+        await self._run(self._pool.clear)
+
+    async def list_datasets(self) -> typing.List[str]:
+        """
+        List the available datasets of the wrapped provider.
+
+        Returns:
+            The list of datasets available for the wrapped provider.
+        """
+        return await self._run(self._call, "list_datasets")
+
+    async def list_versions(self, dataset: str) -> typing.List[str]:
+        """
+        List the available versions of the given dataset.
+
+        Returns:
+            The list of available versions of the given dataset.
+
+        Raises:
+            DatasetNotFoundError: If the given dataset does not exist.
+        """
+        return await self._run(self._call, "list_versions", dataset)
+
+    async def get_folder(
+        self,
+        name: str,
+        version: str = "latest",
+        force_update: bool = False,
+        returns_version: bool = False,
+        **kwargs
+    ) -> typing.Union[pathlib.Path, typing.Tuple[pathlib.Path, str]]:
+        """
+        Retrieve the root folder for the given dataset, see `Provider.get_folder`.
+
+        Args:
+            name: Name of the dataset to retrieve the folder for.
+            version: Version of the dataset to retrieve the folder for.
+            force_update: Force the update of the local dataset if possible.
+            returns_version: If `True`, the exact version of the dataset will be
+                returned along the path.
+            **kwargs: Extra arguments for the `get_folder` method of the wrapped
+                provider.
+
+        Returns:
+            A path to the root folder for the given dataset name, or a tuple containing
+            the path and the exact version.
+
+        Raises:
+            DatasetNotFoundError: If the requested dataset was not found.
+            DatasetVersionNotFoundError: If the requested version of the dataset was
+            not found.
+        """
+        self._bind()
+
+        # Concurrent retrievals of the same version share the same result:
+        key = (name, version, force_update, tuple(sorted(kwargs.items())))
+        future = self._pending.get(key)
+        if future is None:
+            future = asyncio.ensure_future(
+                self._run(
+                    self._call,
+                    "get_folder",
+                    name,
+                    version,
+                    force_update=force_update,
+                    returns_version=True,
+                    **kwargs
+                )
+            )
+            self._pending[key] = future
+
+            def forget(done: "asyncio.Future[typing.Any]"):
+                if self._pending.get(key) is done:
+                    del self._pending[key]
+
+            future.add_done_callback(forget)
+
+        # The shared retrieval is not cancelled with the current task:
+        path, exact_version = await asyncio.shield(future)
+        if returns_version:
+            return path, exact_version
+        return path
@@ -0,0 +1,331 @@
+# -*- coding: utf-8 -*-
+# Copyright IRT Antoine de Saint Exupéry et Université Paul Sabatier Toulouse III - All
+# rights reserved. DEEL is a research program operated by IVADO, IRT Saint Exupéry,
+# CRIAQ and ANITI - https://www.deel.ai/
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import concurrent.futures
+import hashlib
+import json
+import os
+import pathlib
+import typing
+
+from . import logger
+
+# Linux ioctl request to clone the extents of a file (copy-on-write):
+_FICLONE: int = 0x40049409
+
+
+def reflink(source: os.PathLike, target: os.PathLike):
+    """
+    Create `target` as a copy-on-write clone of `source`.
+
+    Args:
+        source: File to clone.
+        target: Path of the clone, must not exist.
+
+    Raises:
+        OSError: If the platform or the filesystem does not support reflinks.
+    """
+    try:
+        import fcntl
+    except ImportError:
+        raise OSError("Reflinks are not supported on this platform.")
+
+    with open(source, "rb") as sp, open(target, "xb") as tp:
+        try:
+            fcntl.ioctl(tp.fileno(), _FICLONE, sp.fileno())
+        except OSError:
+            tp.close()
+            os.unlink(target)
+            raise
+
+
+class BlobStore(object):
+
+    """
+    Content-addressed store for the files of the datasets, used to share
+    identical files between dataset versions.
+
+    Each file is stored once in a blob keyed by the SHA-256 of its content, under
+    the `.blobs` folder of the local root folder, and the files in the version
+    folders are hardlinks (or reflinks) to the blobs. The store keeps track of
+    the blobs referenced by each dataset version, so that blobs that are not
+    referenced anymore can be removed.
+
+    Since hardlinked files share their content, modifying a file in a version
+    folder modifies it in all the versions that contain it. Reflinks do not
+    have this issue but are only available on some filesystems (e.g., Btrfs, XFS).
+    """
+
+    # Name of the store folder in the root folder:
+    FOLDER: str = ".blobs"
+
+    # Available link methods:
+    LINK_METHODS: typing.Tuple[str, ...] = ("hardlink", "reflink")
+
+    # Algorithm of the digests identifying the blobs (see `checksum.split_digest`):
+    ALGORITHM: str = "sha256"
+
+    # Size of the reads when hashing files:
+    _buffer_size: int = 1 << 20
+
+    # Root of the store:
+    _path: pathlib.Path
+
+    # Link method:
+    _link: str
+
+    def __init__(self, root_folder: os.PathLike, link: str = "hardlink"):
+        """
+        Args:
+            root_folder: Root folder of the datasets.
+            link: Method used to materialize files from blobs, either `"hardlink"`
+                or `"reflink"`. Reflinks fall back to hardlinks if the filesystem
+                does not support them.
+
+        Raises:
+            ValueError: If the link method is invalid.
+        """
+        if link not in self.LINK_METHODS:
+            raise ValueError("Invalid link method '{}'.".format(link))
+        self._path = pathlib.Path(root_folder).joinpath(self.FOLDER)
+        self._link = link
+
+    @classmethod
+    def exists(cls, root_folder: os.PathLike) -> bool:
+        """
+        Check if a store exists in the given root folder.
+
+        Args:
+            root_folder: Root folder of the datasets.
+
+        Returns:
+            `True` if a store exists in the given root folder.
+        """
+        return pathlib.Path(root_folder).joinpath(cls.FOLDER).is_dir()
+
+    @property
+    def path(self) -> pathlib.Path:
+        """
+        Returns: The path to the store.
+        """
+        return self._path
+
+    def _blob_path(self, digest: str) -> pathlib.Path:
+        return self._path.joinpath("objects", digest[:2], digest[2:])
+
+    def _refs_path(self, name: str, version: str) -> pathlib.Path:
+        return self._path.joinpath("refs", name, version + ".json")
+
+    def hash_file(self, file: pathlib.Path) -> str:
+        """
+        Compute the digest used to identify the given file in the store.
+
+        Args:
+            file: The file to hash.
+
+        Returns:
+            The SHA-256 digest of the file content.
+        """
+        sha = hashlib.sha256()
+        with open(file, "rb") as fp:
+            while True:
+                data = fp.read(self._buffer_size)
+                if not data:
+                    break
+                sha.update(data)
+        return sha.hexdigest()
+
+    def _materialize(self, blob: pathlib.Path, file: pathlib.Path):
+        """
+        Replace the given file by a link to the given blob.
+
+        Args:
+            blob: The blob to link to.
+            file: The file to replace.
+        """
+        tmp = file.with_name(file.name + ".blob")
+        if tmp.exists():
+            tmp.unlink()
+        if self._link == "reflink":
+            try:
+                reflink(blob, tmp)
+            except OSError:
+                os.link(blob, tmp)
+        else:
+            os.link(blob, tmp)
+        os.replace(tmp, file)
+
+    def _is_linked(self, file: pathlib.Path, digest: str) -> bool:
+        """
+        Check if the given file is a hardlink to the given blob.
+
+        Args:
+            file: The file to check.
+            digest: The digest of the blob.
+
+        Returns:
+            `True` if the file and the blob are the same file on disk.
+        """
+        try:
+            return os.path.samefile(file, self._blob_path(digest))
+        except OSError:
+            return False
+
+    def add(self, file: pathlib.Path, digest: typing.Optional[str] = None) -> str:
+        """
+        Add the given file to the store and replace it by a link to the
+        corresponding blob.
+
+        Args:
+            file: The file to add.
+            digest: The SHA-256 digest (hexadecimal) of the file if already known,
+                otherwise the file is hashed.
+
+        Returns:
+            The digest of the file.
+        """
+        if digest is None:
+            digest = self.hash_file(file)
+        blob = self._blob_path(digest)
+        blob.parent.mkdir(parents=True, exist_ok=True)
+
+        if blob.exists():
+            self._materialize(blob, file)
+            return digest
+
+        try:
+            if self._link == "reflink":
+                try:
+                    reflink(file, blob)
+                except OSError:
+                    os.link(file, blob)
+            else:
+                os.link(file, blob)
+        except FileExistsError:
+            # The blob was created concurrently:
+            self._materialize(blob, file)
+
+        return digest
+
+    def add_folder(
+        self,
+        name: str,
+        version: str,
+        path: pathlib.Path,
+        executor: typing.Optional[concurrent.futures.Executor] = None,
+        digests: typing.Optional[typing.Mapping[str, str]] = None,
+    ):
+        """
+        Add all the files of the given dataset version folder to the store, and
+        remove the blobs that were only referenced by a previous content of
+        this version.
+
+        Args:
+            name: Name of the dataset.
+            version: Version of the dataset.
+            path: Local folder containing the dataset version.
+            executor: Executor used to hash the files concurrently.
+            digests: Known SHA-256 digests (hexadecimal) of files of the version,
+                by path relative to the version folder (e.g., from the manifest of
+                the version). Only the other files are hashed.
+        """
+        known = digests or {}
+        previous = self._read_refs(name, version)
+
+        def add(file: pathlib.Path) -> str:
+            # Files still linked to their blob (e.g., after a revalidation of the
+            # version) do not need to be hashed again:
+            relative_path = file.relative_to(path).as_posix()
+            digest = previous.get(relative_path)
+            if digest is not None and self._is_linked(file, digest):
+                return digest
+            return self.add(file, known.get(relative_path))
+
+        files = sorted(f for f in path.rglob("*") if f.is_file() and not f.is_symlink())
+        if executor is None:
+            digests = [add(file) for file in files]
+        else:
+            digests = list(executor.map(add, files))
+
+        self._write_refs(
+            name,
+            version,
+            {
+                file.relative_to(path).as_posix(): digest
+                for file, digest in zip(files, digests)
+            },
+        )
+        self._collect(set(previous.values()) - set(digests))
+
+    def release(self, name: str, version: str):
+        """
+        Release the blobs referenced by the given dataset version, removing
+        the ones that are not referenced by any other version.
+
+        Args:
+            name: Name of the dataset.
+            version: Version of the dataset.
+        """
+        refs_path = self._refs_path(name, version)
+        previous = self._read_refs(name, version)
+        if refs_path.exists():
+            refs_path.unlink()
+            if not any(refs_path.parent.iterdir()):
+                refs_path.parent.rmdir()
+        self._collect(set(previous.values()))
+
+    def _read_refs(self, name: str, version: str) -> typing.Dict[str, str]:
+        refs_path = self._refs_path(name, version)
+        if not refs_path.exists():
+            return {}
+        with open(refs_path, "r") as fp:
+            return json.load(fp)  # type: ignore
+
+    def _write_refs(self, name: str, version: str, refs: typing.Dict[str, str]):
+        refs_path = self._refs_path(name, version)
+        refs_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = refs_path.with_suffix(".tmp")
+        with open(tmp, "w") as fp:
+            json.dump(refs, fp)
+        os.replace(tmp, refs_path)
+
+    def _collect(self, candidates: typing.Set[str]):
+        """
+        Remove the given blobs if they are not referenced by any dataset version.
+
+        Args:
+            candidates: Digests of the blobs to remove.
+        """
+        if not candidates:
+            return
+
+        refs_root = self._path.joinpath("refs")
+        if refs_root.exists():
+            for refs_path in refs_root.glob("*/*.json"):
+                with open(refs_path, "r") as fp:
+                    candidates -= set(json.load(fp).values())
+
+        for digest in candidates:
+            blob = self._blob_path(digest)
+            if blob.exists():
+                logger.debug("Removing unreferenced blob {}.".format(digest))
+                blob.unlink()
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+# Copyright IRT Antoine de Saint Exupéry et Université Paul Sabatier Toulouse III - All
+# rights reserved. DEEL is a research program operated by IVADO, IRT Saint Exupéry,
+# CRIAQ and ANITI - https://www.deel.ai/
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import hashlib
+import json
+import os
+import pathlib
+import threading
+import time
+import typing
+
+from . import logger
+
+T = typing.TypeVar("T")
+
+
+class CatalogueCache(object):
+
+    """
+    On-disk cache of the catalogue of a remote (its datasets and their versions),
+    used to avoid contacting the remote when a dataset is loaded.
+
+    Each remote has its own cache file under the `.catalogue` folder of the local
+    root folder. A cached value is used as-is while it is younger than the TTL.
+    After that, it is still used for `max_stale` seconds but refreshed in the
+    background (stale-while-revalidate), and then retrieved again from the remote
+    before being used.
+    """
+
+    # Name of the cache folder in the root folder:
+    FOLDER: str = ".catalogue"
+
+    # Path to the cache file:
+    _path: pathlib.Path
+
+    # Time-to-live of the cached values, in seconds:
+    _ttl: float
+
+    # Duration a value can be used after its TTL while being refreshed, in seconds:
+    _max_stale: float
+
+    # Lock for the accesses to the cache file from this process:
+    _lock: threading.Lock
+
+    # Threads refreshing stale values:
+    _refreshes: typing.List[threading.Thread]
+
+    def __init__(
+        self,
+        root_folder: os.PathLike,
+        remote_id: str,
+        ttl: float,
+        max_stale: float = 0,
+    ):
+        """
+        Args:
+            root_folder: Root folder of the datasets.
+            remote_id: Identifier of the remote (e.g., its URL).
+            ttl: Time-to-live of the cached values, in seconds.
+            max_stale: Duration a value can be used after its TTL while being
+                refreshed in the background, in seconds.
+        """
+        digest = hashlib.sha256(remote_id.encode("utf-8")).hexdigest()[:16]
+        self._path = pathlib.Path(root_folder).joinpath(self.FOLDER, digest + ".json")
+        self._ttl = ttl
+        self._max_stale = max_stale
+        self._lock = threading.Lock()
+        self._refreshes = []
+
+    @property
+    def path(self) -> pathlib.Path:
+        """
+        Returns: The path to the cache file.
+        """
+        return self._path
+
+    def _read(self) -> typing.Dict[str, typing.Any]:
+        try:
+            with open(self._path, "r") as fp:
+                return json.load(fp)  # type: ignore
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, key: str) -> typing.Tuple[typing.Any, float]:
+        """
+        Retrieve a value from the cache.
+
+        Args:
+            key: Key of the value.
+
+        Returns:
+            The cached value and its age in seconds, or `(None, inf)` if the value
+            is not in the cache.
+        """
+        with self._lock:
+            entry = self._read().get(key)
+        if entry is None:
+            return None, float("inf")
+        return entry["value"], max(time.time() - entry["time"], 0)
+
+    def set(self, key: str, value: typing.Any):
+        """
+        Store a value in the cache.
+
+        Args:
+            key: Key of the value.
+            value: Value to store, must be serializable to JSON.
+        """
+        with self._lock:
+            data = self._read()
+            data[key] = {"time": time.time(), "value": value}
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self._path.with_name("{}.{}.tmp".format(self._path.name, os.getpid()))
+            with open(tmp, "w") as fp:
+                json.dump(data, fp)
+            os.replace(tmp, self._path)
+
+    def invalidate(self):
+        """
+        Remove all the cached values of the remote.
+        """
+        with self._lock:
+            if self._path.exists():
+                self._path.unlink()
+
+    def lookup(
+        self,
+        key: str,
+        fetch: typing.Callable[[], T],
+        refresh: typing.Optional[typing.Callable[[], T]] = None,
+    ) -> T:
+        """
+        Retrieve a value from the cache, or from the remote using the given
+        function if the cached value has expired.
+
+        Args:
+            key: Key of the value.
+            fetch: Function retrieving the value from the remote.
+            refresh: Function retrieving the value from the remote in a background
+                thread, to refresh a stale value, or `None` to use `fetch`.
+
+        Returns:
+            The value.
+        """
+        value, age = self.get(key)
+        if age <= self._ttl:
+            return value  # type: ignore
+
+        if age <= self._ttl + self._max_stale:
+            thread = threading.Thread(
+                target=self._refresh,
+                args=(key, fetch if refresh is None else refresh),
+                name="deel-datasets-catalogue",
+            )
+            thread.start()
+            self._refreshes.append(thread)
+            return value  # type: ignore
+
+        value = fetch()
+        self.set(key, value)
+        return value
+
+    def wait(self):
+        """
+        Wait for the background refreshes of stale values to complete.
+        """
+        while self._refreshes:
+            self._refreshes.pop().join()
+
+    def _refresh(self, key: str, fetch: typing.Callable[[], typing.Any]):
+        """
+        Refresh the given value from the remote, errors are only logged.
+
+        Args:
+            key: Key of the value.
+            fetch: Function retrieving the value from the remote.
+        """
+        try:
+            self.set(key, fetch())
+        except Exception as e:
+            logger.info("Failed to refresh the catalogue cache: {}".format(e))
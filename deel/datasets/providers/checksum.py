@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+# Copyright IRT Antoine de Saint Exupéry et Université Paul Sabatier Toulouse III - All
+# rights reserved. DEEL is a research program operated by IVADO, IRT Saint Exupéry,
+# CRIAQ and ANITI - https://www.deel.ai/
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import hashlib
+import pathlib
+import typing
+
+try:
+    import xxhash  # type: ignore
+except ImportError:
+    xxhash = None
+
+# Algorithm of digests without an explicit algorithm:
+DEFAULT_ALGORITHM: str = "sha256"
+
+# Available algorithms, the xxHash ones require the optional xxhash package:
+ALGORITHMS: typing.List[str] = ["sha256", "blake2b"] + (
+    ["xxh64", "xxh3_128"] if xxhash is not None else []
+)
+
+# Size of the reads when hashing files:
+_buffer_size: int = 1 << 20
+
+
+# Hash objects (from hashlib or xxhash), with `update` and `hexdigest` methods:
+Hasher = typing.Any
+
+
+def new_hasher(algorithm: str) -> Hasher:
+    """
+    Create a new hash object for the given algorithm.
+
+    Args:
+        algorithm: One of `ALGORITHMS`.
+
+    Returns:
+        A new hash object.
+
+    Raises:
+        ValueError: If the algorithm is not available.
+    """
+    if algorithm not in ALGORITHMS:
+        raise ValueError(
+            "Unknown or unavailable checksum algorithm '{}', available algorithms "
+            "are {}.".format(algorithm, ", ".join(ALGORITHMS))
+        )
+    if algorithm.startswith("xxh"):
+        return getattr(xxhash, algorithm)()  # type: ignore
+    return hashlib.new(algorithm)
+
+
+def split_digest(digest: str) -> typing.Tuple[str, str]:
+    """
+    Split the given digest into its algorithm and its hexadecimal value. Digests
+    are formatted as `algorithm:value`, or simply `value` for `DEFAULT_ALGORITHM`.
+
+    Args:
+        digest: The digest to split.
+
+    Returns:
+        A tuple (algorithm, value).
+    """
+    if ":" in digest:
+        algorithm, value = digest.split(":", 1)
+        return algorithm, value.lower()
+    return DEFAULT_ALGORITHM, digest.lower()
+
+
+def digests_conflict(first: typing.Optional[str], second: typing.Optional[str]) -> bool:
+    """
+    Check if the given digests are known, computed with the same algorithm, and
+    different. Digests computed with different algorithms cannot be compared.
+
+    Args:
+        first: A digest, or `None` if unknown.
+        second: Another digest, or `None` if unknown.
+
+    Returns:
+        `True` if the digests identify different contents.
+    """
+    if first is None or second is None:
+        return False
+    first_algorithm, first_value = split_digest(first)
+    second_algorithm, second_value = split_digest(second)
+    return first_algorithm == second_algorithm and first_value != second_value
+
+
+def format_digest(algorithm: str, hasher: Hasher) -> str:
+    """
+    Format the digest of the given hash object.
+
+    Args:
+        algorithm: Algorithm of the hash object.
+        hasher: The hash object.
+
+    Returns:
+        The formatted digest, see `split_digest`.
+    """
+    if algorithm == DEFAULT_ALGORITHM:
+        return hasher.hexdigest()
+    return "{}:{}".format(algorithm, hasher.hexdigest())
+
+
+def hash_file(
+    path: pathlib.Path, hasher: Hasher, length: typing.Optional[int] = None
+) -> Hasher:
+    """
+    Update the given hash object with the content of the given file.
+
+    Args:
+        path: The file to hash.
+        hasher: The hash object to update.
+        length: Number of bytes to hash from the start of the file, or `None` to
+            hash the whole file.
+
+    Returns:
+        The given hash object.
+    """
+    with open(path, "rb") as fp:
+        while length is None or length > 0:
+            size = _buffer_size if length is None else min(_buffer_size, length)
+            data = fp.read(size)
+            if not data:
+                break
+            hasher.update(data)
+            if length is not None:
+                length -= len(data)
+    return hasher
+
+
+class HashingWriter(object):
+
+    """
+    Minimal write-only stream that wraps another stream and updates a hash
+    object with the data written.
+    """
+
+    # The wrapped stream:
+    _stream: typing.BinaryIO
+
+    # The hash object to update:
+    _hasher: Hasher
+
+    def __init__(self, stream: typing.BinaryIO, hasher: Hasher):
+        """
+        Args:
+            stream: The stream to wrap.
+            hasher: The hash object to update.
+        """
+        self._stream = stream
+        self._hasher = hasher
+
+    def write(self, data: bytes) -> int:
+        self._hasher.update(data)
+        return self._stream.write(data)
+
+    def close(self):
+        self._stream.close()
+
+    def __enter__(self) -> "HashingWriter":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class HashingReader(object):
+
+    """
+    Minimal read-only stream that wraps another stream and updates a hash
+    object with the data read. The number of bytes read is available in `size`.
+    """
+
+    # The wrapped stream:
+    _stream: typing.BinaryIO
+
+    # The hash object to update, if any:
+    _hasher: typing.Optional[Hasher]
+
+    # Number of bytes read:
+    size: int
+
+    def __init__(self, stream: typing.BinaryIO, hasher: typing.Optional[Hasher]):
+        """
+        Args:
+            stream: The stream to wrap.
+            hasher: The hash object to update, if any.
+        """
+        self._stream = stream
+        self._hasher = hasher
+        self.size = 0
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._stream.read(size)
+        if self._hasher is not None:
+            self._hasher.update(data)
+        self.size += len(data)
+        return data
+
+    def close(self):
+        self._stream.close()
+
+    def __enter__(self) -> "HashingReader":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,424 @@
+# -*- coding: utf-8 -*-
+# Copyright IRT Antoine de Saint Exupéry et Université Paul Sabatier Toulouse III - All
+# rights reserved. DEEL is a research program operated by IVADO, IRT Saint Exupéry,
+# CRIAQ and ANITI - https://www.deel.ai/
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import json
+import os
+import pathlib
+import re
+import stat
+import threading
+import time
+import typing
+
+from . import logger
+from .exceptions import LockTimeoutError
+from .file_lock import FileLock
+from .file_lock import SHARED_LOCKS
+from .local_provider import LocalProvider
+from .manifest import Manifest
+
+# Multipliers of the size units, see `parse_size`:
+_SIZE_UNITS: typing.Dict[str, int] = {
+    "": 1,
+    "k": 1 << 10,
+    "m": 1 << 20,
+    "g": 1 << 30,
+    "t": 1 << 40,
+}
+
+# Pins held by this process, by path of their pin file, with the number of caches
+# holding them (a version is pinned once per process):
+_pins: typing.Dict[pathlib.Path, typing.Tuple[FileLock, int]] = {}
+_pins_lock: threading.Lock = threading.Lock()
+
+# Permissions given to the group on the files and folders of the cache, so that
+# the cache can be shared by the users of a group:
+_GROUP_FILE_MODE: int = stat.S_IRGRP | stat.S_IWGRP
+_GROUP_FOLDER_MODE: int = stat.S_IRGRP | stat.S_IWGRP | stat.S_IXGRP
+
+_SIZE_REGEX: typing.Pattern = re.compile(
+    r"\s*([0-9]+(?:[.][0-9]*)?)\s*([kmgt]?)i?b?\s*"
+)
+
+
+def share_with_group(*paths: os.PathLike):
+    """
+    Make the given files and folders readable and writable by their group, when
+    they are owned by the current user (the others are left as they are).
+
+    Args:
+        *paths: The files and folders.
+    """
+    for path in paths:
+        try:
+            mode = os.stat(path).st_mode
+            extra = _GROUP_FOLDER_MODE if stat.S_ISDIR(mode) else _GROUP_FILE_MODE
+            if mode & extra != extra:
+                os.chmod(path, stat.S_IMODE(mode) | extra)
+        except OSError:
+            pass
+
+
+def parse_size(size: typing.Union[int, float, str]) -> int:
+    """
+    Parse the given size, either a number of bytes or a string with a unit
+    (e.g., `"500M"`, `"1.5 TiB"` or `"200GB"`). Units are powers of 1024.
+
+    Args:
+        size: The size to parse.
+
+    Returns:
+        The size, in bytes.
+
+    Raises:
+        ValueError: If the size is invalid.
+    """
+    if isinstance(size, (int, float)):
+        return int(size)
+    match = _SIZE_REGEX.fullmatch(size.lower())
+    if match is None:
+        raise ValueError("Invalid size '{}'.".format(size))
+    return int(float(match.group(1)) * _SIZE_UNITS[match.group(2)])
+
+
+class DatasetCache(object):
+
+    """
+    Size-limited cache of the dataset versions in the root folder of a provider,
+    which can be shared between users and processes.
+
+    The accesses to each version are recorded in its metadata folder, and the
+    least recently (`"lru"`) or least frequently (`"lfu"`) used versions are
+    removed (see `LocalProvider.del_folder`) when the versions exceed the
+    maximum size of the cache.
+
+    Versions are pinned while they are used, and pinned versions are never
+    removed. A pin is a shared lock on a pin file, next to the lock file of the
+    version, held until the version is unpinned (see `unpin` and `unpin_all`) or
+    the process exits.
+
+    The lock, pin and usage files of the versions, and their folders, are made
+    writable by their group (see `share_with_group`), so that the users of a
+    group can record accesses to the versions and pin them.
+    """
+
+    # Name of the file containing the usage of a version in its metadata folder:
+    USAGE_FILENAME: str = "usage.json"
+
+    # Available eviction policies:
+    POLICIES: typing.Tuple[str, ...] = ("lru", "lfu")
+
+    # Provider of the local versions:
+    _local_provider: LocalProvider
+
+    # Function creating the lock of a version:
+    _make_lock: typing.Callable[[str, str], FileLock]
+
+    # Maximum size of the cache, in bytes:
+    _max_size: int
+
+    # Eviction policy:
+    _policy: str
+
+    # Paths of the pin files of the versions pinned by this cache:
+    _pinned: typing.Set[pathlib.Path]
+
+    def __init__(
+        self,
+        local_provider: LocalProvider,
+        make_lock: typing.Callable[[str, str], FileLock],
+        max_size: typing.Union[int, str],
+        policy: str = "lru",
+    ):
+        """
+        Args:
+            local_provider: Provider of the local versions.
+            make_lock: Function creating the lock of a version (held while the
+                version is retrieved), used to find the pin file of the version.
+            max_size: Maximum size of the cache, see `parse_size`.
+            policy: Eviction policy, one of `POLICIES`.
+
+        Raises:
+            ValueError: If the size or the policy is invalid.
+        """
+        if policy not in self.POLICIES:
+            raise ValueError("Invalid cache policy '{}'.".format(policy))
+        self._local_provider = local_provider
+        self._make_lock = make_lock
+        self._max_size = parse_size(max_size)
+        self._policy = policy
+        self._pinned = set()
+
+    @property
+    def max_size(self) -> int:
+        """
+        Returns:
+            The maximum size of the cache, in bytes.
+        """
+        return self._max_size
+
+    def _make_pin(self, name: str, version: str, shared: bool) -> FileLock:
+        return FileLock(
+            self._make_lock(name, version).path.with_suffix(".pin"), shared=shared
+        )
+
+    def _usage_path(self, name: str, version: str) -> pathlib.Path:
+        return self._local_provider._make_meta_folder(name, version).joinpath(
+            self.USAGE_FILENAME
+        )
+
+    def _read_usage(self, name: str, version: str) -> typing.Dict[str, typing.Any]:
+        try:
+            with open(self._usage_path(name, version), "r") as fp:
+                usage = json.load(fp)
+            if isinstance(usage, dict):
+                return usage
+        except (OSError, ValueError):
+            pass
+        return {}
+
+    def _compute_size(self, name: str, version: str) -> int:
+        """
+        Compute the size of the given version, from its manifest if possible.
+        """
+        manifest = Manifest.load(self._local_provider._make_meta_folder(name, version))
+        if manifest is not None and manifest.outputs() is not None:
+            return sum(
+                size for entry in manifest.entries for size in entry.outputs.values()
+            )
+        return sum(
+            path.stat().st_size
+            for path in self._local_provider._make_folder(name, version).rglob("*")
+            if path.is_file()
+        )
+
+    def _manifest_mtime(self, name: str, version: str) -> typing.Optional[int]:
+        try:
+            return (
+                self._local_provider._make_meta_folder(name, version)
+                .joinpath(Manifest.FILENAME)
+                .stat()
+                .st_mtime_ns
+            )
+        except OSError:
+            return None
+
+    def usage(self, name: str, version: str) -> typing.Dict[str, typing.Any]:
+        """
+        Retrieve the usage of the given local version.
+
+        Args:
+            name: Name of the dataset.
+            version: Version of the dataset.
+
+        Returns:
+            A dictionary containing the time of the last access to the version
+            (`"last_access"`, the modification time of the version if unknown),
+            the number of accesses (`"accesses"`) and the size of the version in
+            bytes (`"size"`).
+        """
+        usage = self._read_usage(name, version)
+        if "last_access" not in usage:
+            path = self._local_provider._make_folder(name, version)
+            usage["last_access"] = path.stat().st_mtime
+        usage.setdefault("accesses", 0)
+        if "size" not in usage or usage.get("manifest") != self._manifest_mtime(
+            name, version
+        ):
+            usage["size"] = self._compute_size(name, version)
+        return usage
+
+    def record_access(self, name: str, version: str):
+        """
+        Record an access to the given local version. Concurrent accesses from
+        multiple processes may not all be counted.
+
+        Args:
+            name: Name of the dataset.
+            version: Version of the dataset.
+        """
+        usage = self._read_usage(name, version)
+        manifest_mtime = self._manifest_mtime(name, version)
+        if "size" not in usage or usage.get("manifest") != manifest_mtime:
+            usage["size"] = self._compute_size(name, version)
+            usage["manifest"] = manifest_mtime
+        usage["last_access"] = time.time()
+        usage["accesses"] = usage.get("accesses", 0) + 1
+
+        path = self._usage_path(name, version)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        share_with_group(path.parent.parent, path.parent)
+        tmp = path.with_name(
+            "{}.{}.{}.tmp".format(path.name, os.getpid(), threading.get_ident())
+        )
+        with open(tmp, "w") as fp:
+            json.dump(usage, fp)
+        share_with_group(tmp)
+        os.replace(tmp, path)
+
+    def pin(self, name: str, version: str):
+        """
+        Pin the given version, so that it is not removed until it is unpinned
+        by this cache or the process exits. Pinning a version that is being
+        removed waits for the removal.
+
+        Args:
+            name: Name of the dataset.
+            version: Version of the dataset.
+        """
+        pin = self._make_pin(name, version, shared=True)
+        with _pins_lock:
+            if pin.path in self._pinned:
+                return
+            if pin.path in _pins:
+                pin, count = _pins[pin.path]
+                _pins[pin.path] = (pin, count + 1)
+            else:
+                try:
+                    # Without shared locks, the version is already pinned if the
+                    # pin is held by someone else:
+                    pin.acquire(None if SHARED_LOCKS else 0)
+                except LockTimeoutError:
+                    return
+                _pins[pin.path] = (pin, 1)
+            self._pinned.add(pin.path)
+        lock_path = self._make_lock(name, version).path
+        share_with_group(lock_path.parent.parent, lock_path.parent, lock_path, pin.path)
+
+    def _unpin(self, path: pathlib.Path):
+        """
+        Release the pin of this cache on the given pin file, the pin is released
+        once no cache of the process holds it. Must be called with the lock held.
+        """
+        self._pinned.discard(path)
+        pin, count = _pins[path]
+        if count > 1:
+            _pins[path] = (pin, count - 1)
+        else:
+            del _pins[path]
+            pin.release()
+
+    def unpin(self, name: str, version: str):
+        """
+        Unpin the given version, if pinned by this cache.
+
+        Args:
+            name: Name of the dataset.
+            version: Version of the dataset.
+        """
+        path = self._make_pin(name, version, shared=True).path
+        with _pins_lock:
+            if path in self._pinned:
+                self._unpin(path)
+
+    def unpin_all(self):
+        """
+        Unpin all the versions pinned by this cache.
+        """
+        with _pins_lock:
+            for path in list(self._pinned):
+                self._unpin(path)
+
+    def evict(
+        self,
+        required: int = 0,
+        keep: typing.AbstractSet[typing.Tuple[str, str]] = frozenset(),
+    ) -> typing.List[typing.Tuple[str, str]]:
+        """
+        Remove local versions until the size of the cache (plus the required
+        size) does not exceed its maximum size. Pinned versions and versions
+        being retrieved are not removed.
+
+        Args:
+            required: Size that will be added to the cache, in bytes.
+            keep: Versions (name and version) that should not be removed.
+
+        Returns:
+            The removed versions.
+        """
+        candidates: typing.List[typing.Tuple[str, str, typing.Dict[str, typing.Any]]]
+        candidates = []
+        total = 0
+        for name in self._local_provider.list_datasets():
+            for version in self._local_provider.list_versions(name):
+                try:
+                    usage = self.usage(name, version)
+                except OSError:
+                    continue
+                total += usage["size"]
+                if (name, version) not in keep:
+                    candidates.append((name, version, usage))
+
+        if total + required <= self._max_size:
+            return []
+
+        if self._policy == "lru":
+            candidates.sort(key=lambda c: c[2]["last_access"])
+        else:
+            candidates.sort(key=lambda c: (c[2]["accesses"], c[2]["last_access"]))
+
+        evicted: typing.List[typing.Tuple[str, str]] = []
+        for name, version, usage in candidates:
+            if total + required <= self._max_size:
+                break
+            # The version is not removed while it is retrieved or pinned:
+            pin = self._make_pin(name, version, shared=False)
+            if pin.path in _pins:
+                continue
+            lock = self._make_lock(name, version)
+            try:
+                lock.acquire(0)
+            except LockTimeoutError:
+                continue
+            try:
+                try:
+                    pin.acquire(0)
+                except LockTimeoutError:
+                    continue
+                try:
+                    logger.info(
+                        "Removing {} {} from the cache ({} bytes).".format(
+                            name, version, usage["size"]
+                        )
+                    )
+                    self._local_provider.del_folder(name, version, keep_dataset=True)
+                finally:
+                    pin.release()
+            finally:
+                lock.release()
+            total -= usage["size"]
+            evicted.append((name, version))
+
+        # Remove the datasets without versions:
+        for name in {name for name, _ in evicted}:
+            path = self._local_provider._make_folder(name)
+            if not any(path.iterdir()):
+                path.rmdir()
+
+        if total + required > self._max_size:
+            logger.warning(
+                "The cache exceeds its maximum size ({} bytes for {} bytes), the "
+                "remaining versions are in use.".format(
+                    total + required, self._max_size
+                )
+            )
+        return evicted
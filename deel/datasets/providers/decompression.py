@@ -0,0 +1,449 @@
+# -*- coding: utf-8 -*-
+# Copyright IRT Antoine de Saint Exupéry et Université Paul Sabatier Toulouse III - All
+# rights reserved. DEEL is a research program operated by IVADO, IRT Saint Exupéry,
+# CRIAQ and ANITI - https://www.deel.ai/
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import collections
+import concurrent.futures
+import io
+import lzma
+import os
+import queue
+import struct
+import threading
+import typing
+import zlib
+
+try:
+    import zstandard  # type: ignore
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame  # type: ignore
+except ImportError:
+    lz4 = None
+
+# Size of the chunks decompressed in the background, in bytes:
+_CHUNK_SIZE: int = 1 << 20
+
+# Maximum number of decompressed chunks waiting to be read:
+_QUEUE_SIZE: int = 8
+
+# Maximum total uncompressed size of the xz blocks decoded at once, in bytes (a
+# larger block is still decoded, alone):
+_MAX_PENDING_SIZE: int = 256 << 20
+
+# Magic bytes of the header and the footer of xz streams:
+_XZ_HEADER_MAGIC: bytes = b"\xfd7zXZ\x00"
+_XZ_FOOTER_MAGIC: bytes = b"YZ"
+
+
+class BackgroundReader(io.RawIOBase):
+
+    """
+    Read-only stream reading another stream (e.g., a decompressing stream) in a
+    background thread, so that decompression runs in parallel with the consumer
+    of the stream (the decompressors of the standard library and of the optional
+    packages release the GIL).
+    """
+
+    # The wrapped stream:
+    _stream: typing.BinaryIO
+
+    # Chunks read by the background thread, `None` at the end of the stream or
+    # an exception if reading failed:
+    _chunks: "queue.Queue[typing.Any]"
+
+    # Part of the current chunk not read yet, end of the stream, and exception
+    # raised by the wrapped stream (raised again by the following reads):
+    _current: memoryview
+    _eof: bool
+    _error: typing.Optional[Exception]
+
+    _closed: threading.Event
+    _thread: threading.Thread
+
+    def __init__(self, stream: typing.BinaryIO):
+        """
+        Args:
+            stream: The stream to read, closed with this stream.
+        """
+        super().__init__()
+        self._stream = stream
+        self._chunks = queue.Queue(_QUEUE_SIZE)
+        self._current = memoryview(b"")
+        self._eof = False
+        self._error = None
+        self._closed = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _put(self, item: typing.Any) -> bool:
+        while not self._closed.is_set():
+            try:
+                self._chunks.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _run(self):
+        try:
+            while True:
+                chunk = self._stream.read(_CHUNK_SIZE)
+                if not chunk:
+                    break
+                if not self._put(chunk):
+                    return
+            self._put(None)
+        except Exception as e:
+            self._put(e)
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._current:
+            if self._error is not None:
+                raise self._error
+            if self._eof:
+                return 0
+            item = self._chunks.get()
+            if item is None:
+                self._eof = True
+                return 0
+            if isinstance(item, Exception):
+                self._eof = True
+                self._error = item
+                raise item
+            self._current = memoryview(item)
+        count = min(len(buffer), len(self._current))
+        memoryview(buffer).cast("B")[:count] = self._current[:count]
+        self._current = self._current[count:]
+        return count
+
+    def close(self):
+        if not self.closed:
+            self._closed.set()
+            self._thread.join()
+            self._stream.close()
+        super().close()
+
+
+def _read_vli(data: bytes, position: int) -> typing.Tuple[int, int]:
+    """
+    Read a variable-length integer of the xz format.
+
+    Returns:
+        The integer and the position after it.
+    """
+    value = 0
+    for shift in range(0, 63, 7):
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, position
+    raise ValueError("Invalid xz index.")
+
+
+def _write_vli(value: int) -> bytes:
+    data = bytearray()
+    while value >= 0x80:
+        data.append((value & 0x7F) | 0x80)
+        value >>= 7
+    data.append(value)
+    return bytes(data)
+
+
+class XzBlock(typing.NamedTuple):
+
+    """
+    Block of an xz file.
+    """
+
+    # Flags of the stream containing the block:
+    stream_flags: bytes
+
+    # Offset of the block in the file:
+    offset: int
+
+    # Size of the block without padding, and size of its content:
+    unpadded_size: int
+    uncompressed_size: int
+
+    @property
+    def padded_size(self) -> int:
+        return (self.unpadded_size + 3) & ~3
+
+
+def xz_blocks(fp: typing.BinaryIO) -> typing.List[XzBlock]:
+    """
+    List the blocks of the given xz file, from the indexes at the end of its
+    streams.
+
+    Args:
+        fp: The xz file, opened in binary mode.
+
+    Returns:
+        The blocks of the file, in order.
+
+    Raises:
+        ValueError: If the file is not a valid xz file.
+    """
+    streams: typing.List[typing.List[XzBlock]] = []
+    end = fp.seek(0, io.SEEK_END)
+    while end > 0:
+        if end < 24:
+            raise ValueError("Invalid xz file.")
+
+        # Skip the stream padding:
+        fp.seek(end - 4)
+        if fp.read(4) == b"\0\0\0\0":
+            end -= 4
+            continue
+
+        fp.seek(end - 12)
+        footer = fp.read(12)
+        if footer[10:] != _XZ_FOOTER_MAGIC:
+            raise ValueError("Invalid xz stream footer.")
+        stream_flags = footer[8:10]
+        index_size = (struct.unpack("<I", footer[4:8])[0] + 1) * 4
+        index_start = end - 12 - index_size
+        fp.seek(index_start)
+        index = fp.read(index_size)
+        if not index or index[0] != 0:
+            raise ValueError("Invalid xz index.")
+
+        count, position = _read_vli(index, 1)
+        records = []
+        for _ in range(count):
+            unpadded_size, position = _read_vli(index, position)
+            uncompressed_size, position = _read_vli(index, position)
+            records.append((unpadded_size, uncompressed_size))
+
+        start = index_start - sum((u + 3) & ~3 for u, _ in records) - 12
+        fp.seek(start)
+        header = fp.read(12)
+        if start < 0 or header[:6] != _XZ_HEADER_MAGIC or header[6:8] != stream_flags:
+            raise ValueError("Invalid xz stream header.")
+
+        blocks = []
+        offset = start + 12
+        for unpadded_size, uncompressed_size in records:
+            block = XzBlock(stream_flags, offset, unpadded_size, uncompressed_size)
+            blocks.append(block)
+            offset += block.padded_size
+        streams.append(blocks)
+        end = start
+
+    return [block for blocks in reversed(streams) for block in blocks]
+
+
+def decode_xz_block(block: XzBlock, data: bytes) -> bytes:
+    """
+    Decode a single block of an xz file, by wrapping it into a stream of its own.
+
+    Args:
+        block: The block.
+        data: The content of the block, with its padding.
+
+    Returns:
+        The decompressed content of the block.
+    """
+    flags = block.stream_flags
+    header = _XZ_HEADER_MAGIC + flags + struct.pack("<I", zlib.crc32(flags))
+    index = (
+        b"\0"
+        + _write_vli(1)
+        + _write_vli(block.unpadded_size)
+        + _write_vli(block.uncompressed_size)
+    )
+    index += b"\0" * (-len(index) % 4)
+    index += struct.pack("<I", zlib.crc32(index))
+    backward_size = struct.pack("<I", len(index) // 4 - 1)
+    footer = (
+        struct.pack("<I", zlib.crc32(backward_size + flags))
+        + backward_size
+        + flags
+        + _XZ_FOOTER_MAGIC
+    )
+    return lzma.decompress(header + data + index + footer, format=lzma.FORMAT_XZ)
+
+
+class ParallelXzReader(io.RawIOBase):
+
+    """
+    Read-only stream decompressing a multi-block xz file (e.g., compressed with
+    `xz -T0`), whose blocks are decoded in parallel by a pool of threads.
+    """
+
+    # The compressed file:
+    _fp: typing.BinaryIO
+
+    # Blocks not submitted yet:
+    _blocks: typing.Deque[XzBlock]
+
+    # Blocks being decoded, in order, with their uncompressed size:
+    _pending: typing.Deque[typing.Tuple["concurrent.futures.Future[bytes]", int]]
+
+    # Total uncompressed size of the blocks being decoded:
+    _pending_size: int
+
+    # Part of the current block not read yet:
+    _current: memoryview
+
+    _executor: concurrent.futures.ThreadPoolExecutor
+
+    # Maximum number of blocks decoded at once, the blocks decoded at once are
+    # also limited to `_MAX_PENDING_SIZE` bytes:
+    _window: int
+
+    def __init__(
+        self,
+        fp: typing.BinaryIO,
+        blocks: typing.List[XzBlock],
+        max_workers: typing.Optional[int] = None,
+    ):
+        """
+        Args:
+            fp: The compressed file (not closed with this stream).
+            blocks: The blocks of the file, see `xz_blocks`.
+            max_workers: Maximum number of blocks decoded at once, or `None` to use
+                one thread per CPU.
+        """
+        super().__init__()
+        self._fp = fp
+        self._blocks = collections.deque(blocks)
+        self._pending = collections.deque()
+        self._pending_size = 0
+        self._current = memoryview(b"")
+        self._window = max_workers or os.cpu_count() or 1
+        self._executor = concurrent.futures.ThreadPoolExecutor(self._window)
+
+    def _submit(self):
+        while self._blocks and len(self._pending) < self._window:
+            block = self._blocks[0]
+            if (
+                self._pending
+                and self._pending_size + block.uncompressed_size > _MAX_PENDING_SIZE
+            ):
+                return
+            self._blocks.popleft()
+            self._fp.seek(block.offset)
+            data = self._fp.read(block.padded_size)
+            self._pending.append(
+                (
+                    self._executor.submit(decode_xz_block, block, data),
+                    block.uncompressed_size,
+                )
+            )
+            self._pending_size += block.uncompressed_size
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._current:
+            self._submit()
+            if not self._pending:
+                return 0
+            future, size = self._pending.popleft()
+            self._pending_size -= size
+            self._current = memoryview(future.result())
+        count = min(len(buffer), len(self._current))
+        memoryview(buffer).cast("B")[:count] = self._current[:count]
+        self._current = self._current[count:]
+        return count
+
+    def close(self):
+        if not self.closed:
+            for future, _ in self._pending:
+                future.cancel()
+            self._executor.shutdown()
+        super().close()
+
+
+def open_xz(
+    fp: typing.BinaryIO, max_workers: typing.Optional[int] = None
+) -> typing.BinaryIO:
+    """
+    Open a decompressing stream over the given xz file. The blocks of seekable
+    multi-block files are decoded in parallel, other files are decoded in a
+    background thread.
+
+    Args:
+        fp: The compressed file (not closed with the returned stream).
+        max_workers: Maximum number of blocks decoded at once, or `None` to use
+            one thread per CPU.
+
+    Returns:
+        A readable stream over the decompressed content.
+    """
+    blocks: typing.List[XzBlock] = []
+    if getattr(fp, "seekable", lambda: False)():
+        try:
+            blocks = xz_blocks(fp)
+        except (ValueError, OSError):
+            pass
+        fp.seek(0)
+    if len(blocks) > 1:
+        return ParallelXzReader(fp, blocks, max_workers)  # type: ignore
+    return BackgroundReader(lzma.LZMAFile(fp, "rb"))  # type: ignore
+
+
+def open_zstd(fp: typing.BinaryIO) -> typing.BinaryIO:
+    """
+    Open a decompressing stream over the given Zstandard file, decoded in a
+    background thread. Requires the optional `zstandard` package.
+
+    Args:
+        fp: The compressed file (not closed with the returned stream).
+
+    Returns:
+        A readable stream over the decompressed content.
+    """
+    reader = zstandard.ZstdDecompressor().stream_reader(
+        fp, read_across_frames=True, closefd=False
+    )
+    return BackgroundReader(reader)  # type: ignore
+
+
+def open_lz4(fp: typing.BinaryIO) -> typing.BinaryIO:
+    """
+    Open a decompressing stream over the given LZ4 file, decoded in a background
+    thread. Requires the optional `lz4` package.
+
+    Args:
+        fp: The compressed file (not closed with the returned stream).
+
+    Returns:
+        A readable stream over the decompressed content.
+    """
+    return BackgroundReader(lz4.frame.LZ4FrameFile(fp, "rb"))  # type: ignore
+
+
+# Functions opening a decompressing stream over a compressed stream, by format:
+OPENERS: typing.Dict[str, typing.Callable[[typing.BinaryIO], typing.BinaryIO]] = {
+    "xz": open_xz,
+    "zstd": open_zstd,
+    "lz4": open_lz4,
+}
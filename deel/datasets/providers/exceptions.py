@@ -87,3 +87,37 @@ class DatasetVersionNotFoundError(DatasetNotFoundError, VersionNotFoundError):
         Exception.__init__(
             self, "Dataset {} for version {} not found.".format(name, version)
         )
+
+
+class IntegrityError(IOError):
+
+    """
+    Exception thrown by providers when a downloaded file does not match its
+    expected size or digest.
+    """
+
+    def __init__(self, path: str, reason: str):
+        """
+        Args:
+            path: Path of the corrupted file.
+            reason: Description of the mismatch.
+        """
+        super().__init__("Integrity check failed for {}: {}.".format(path, reason))
+
+
+class LockTimeoutError(TimeoutError):
+
+    """
+    Exception thrown by providers when a dataset version is being retrieved by
+    another process and the retrieval does not finish in time.
+    """
+
+    def __init__(self, path: str, timeout: float):
+        """
+        Args:
+            path: Path of the lock file.
+            timeout: Duration waited for the lock, in seconds.
+        """
+        super().__init__(
+            "Could not acquire lock {} within {} seconds.".format(path, timeout)
+        )
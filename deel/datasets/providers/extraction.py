@@ -0,0 +1,311 @@
+# -*- coding: utf-8 -*-
+# Copyright IRT Antoine de Saint Exupéry et Université Paul Sabatier Toulouse III - All
+# rights reserved. DEEL is a research program operated by IVADO, IRT Saint Exupéry,
+# CRIAQ and ANITI - https://www.deel.ai/
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import concurrent.futures
+import gzip
+import multiprocessing
+import os
+import pathlib
+import sys
+import tarfile
+import threading
+import typing
+import zipfile
+
+from .decompression import OPENERS
+from .tar_index import scan_members
+from .transfer import copy_stream
+
+
+def _extract_zip_members(
+    file: str, names: typing.List[str], path: str
+) -> typing.List[str]:
+    """
+    Extract the given members of a zip archive, in a worker process.
+
+    Returns:
+        The paths of the extracted members, except directories.
+    """
+    outputs = []
+    with zipfile.ZipFile(file, "r") as zp:
+        for name in names:
+            zp.extract(name, path)
+            if not name.endswith("/"):
+                outputs.append(os.path.join(path, name))
+    return outputs
+
+
+def _extract_tar(
+    file: str, path: str, select: typing.Optional[typing.Callable[[str], bool]]
+) -> typing.List[str]:
+    """
+    Extract the selected members of a tar archive, in a worker process.
+
+    Returns:
+        The paths of the extracted members, except directories.
+    """
+    with tarfile.open(file, "r") as tp:
+        return [str(p) for p in scan_members(tp, pathlib.Path(path), select)[1]]
+
+
+def _extract_gz(file: str, target: str) -> typing.List[str]:
+    """
+    Decompress a gzip file, in a worker process.
+
+    Returns:
+        The path of the decompressed file.
+    """
+    with gzip.open(file, "rb") as zp, open(target, "wb") as fp:
+        copy_stream(zp, fp)  # type: ignore
+    return [target]
+
+
+def _extract_compressed(
+    file: str,
+    compression: str,
+    tar: bool,
+    select: typing.Optional[typing.Callable[[str], bool]],
+) -> typing.List[str]:
+    """
+    Extract a compressed tar archive, or decompress a compressed file next to
+    it, in a worker process (see `decompression.OPENERS`).
+
+    Returns:
+        The paths of the extracted members (except directories), or the path of
+        the decompressed file.
+    """
+    with open(file, "rb") as fp, OPENERS[compression](fp) as stream:
+        if tar:
+            with tarfile.open(fileobj=stream, mode="r|") as tp:
+                path = pathlib.Path(file).parent
+                return [str(p) for p in scan_members(tp, path, select)[1]]
+        target = os.path.splitext(file)[0]
+        with open(target, "wb") as output:
+            copy_stream(stream, output)
+    return [target]
+
+
+class ExtractionScheduler(object):
+
+    """
+    Pool of worker processes extracting downloaded archives, so that several
+    archives, and the members of a single zip archive, are extracted in parallel.
+
+    The members of a zip archive are split into contiguous ranges of similar size,
+    each range being extracted by a worker with its own `ZipFile` handle. Tar
+    archives and compressed files are extracted by a single worker.
+
+    The processes are started with the "spawn" method (when available) since
+    downloads run in threads, so scripts using the scheduler must protect their
+    entry point with `if __name__ == "__main__":`.
+    """
+
+    # Minimum size of the members extracted by a single task for zip archives,
+    # in bytes:
+    MIN_RANGE_SIZE: int = 8 << 20
+
+    # Maximum number of worker processes:
+    _max_workers: int
+
+    # The process pool, created when needed:
+    _executor: typing.Optional[concurrent.futures.ProcessPoolExecutor]
+
+    _lock: threading.Lock
+
+    def __init__(self, max_workers: typing.Optional[int] = None):
+        """
+        Args:
+            max_workers: Maximum number of worker processes (bounded by the number
+                of CPUs), or `None` to use one process per CPU. Lower values limit
+                the load on slow disks.
+        """
+        cpu_count = os.cpu_count() or 1
+        if max_workers is None:
+            max_workers = cpu_count
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1.")
+        self._max_workers = min(max_workers, cpu_count)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def max_workers(self) -> int:
+        """
+        Returns: The maximum number of worker processes.
+        """
+        return self._max_workers
+
+    def _submit(
+        self, function: typing.Callable[..., typing.List[str]], *args
+    ) -> "concurrent.futures.Future[typing.List[str]]":
+        with self._lock:
+            if self._executor is None:
+                kwargs: typing.Dict[str, typing.Any] = {}
+                if sys.version_info >= (3, 7):
+                    kwargs["mp_context"] = multiprocessing.get_context("spawn")
+                self._executor = concurrent.futures.ProcessPoolExecutor(
+                    self._max_workers, **kwargs
+                )
+            return self._executor.submit(function, *args)
+
+    @staticmethod
+    def _wait(
+        futures: typing.List["concurrent.futures.Future[typing.List[str]]"],
+    ) -> typing.List[pathlib.Path]:
+        """
+        Wait for the given tasks, cancelling the remaining ones if one fails.
+
+        Returns:
+            The paths returned by the tasks.
+        """
+        try:
+            return [pathlib.Path(p) for future in futures for p in future.result()]
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def _split(
+        self, infos: typing.List[zipfile.ZipInfo]
+    ) -> typing.List[typing.List[str]]:
+        """
+        Split the given members of a zip archive into contiguous ranges of
+        similar compressed size, at most one per worker.
+
+        Returns:
+            The names of the members of each range.
+        """
+        total = sum(info.compress_size for info in infos)
+        count = max(1, min(self._max_workers, total // self.MIN_RANGE_SIZE))
+        ranges: typing.List[typing.List[str]] = [[]]
+        size = 0
+        for info in infos:
+            if ranges[-1] and size >= total * len(ranges) / count:
+                ranges.append([])
+            ranges[-1].append(info.filename)
+            size += info.compress_size
+        return ranges
+
+    def extract_zip(
+        self,
+        file: pathlib.Path,
+        select: typing.Optional[typing.Callable[[str], bool]] = None,
+    ) -> typing.List[pathlib.Path]:
+        """
+        Extract the given zip archive in its folder.
+
+        Args:
+            file: Path to the archive.
+            select: Function indicating if a member (by name) should be extracted,
+                or `None` to extract all the members.
+
+        Returns:
+            The paths of the extracted members, except directories.
+        """
+        with zipfile.ZipFile(file, "r") as zp:
+            infos = [
+                info
+                for info in zp.infolist()
+                if select is None or select(info.filename)
+            ]
+        return self._wait(
+            [
+                self._submit(_extract_zip_members, str(file), names, str(file.parent))
+                for names in self._split(infos)
+            ]
+        )
+
+    def extract_tar(
+        self,
+        file: pathlib.Path,
+        select: typing.Optional[typing.Callable[[str], bool]] = None,
+    ) -> typing.List[pathlib.Path]:
+        """
+        Extract the given tar archive in its folder.
+
+        Args:
+            file: Path to the archive.
+            select: Function indicating if a member (by name) should be extracted,
+                or `None` to extract all the members. The function must be
+                picklable.
+
+        Returns:
+            The paths of the extracted members, except directories.
+
+        Raises:
+            Exception: If a member would be extracted outside of the folder.
+        """
+        return self._wait(
+            [self._submit(_extract_tar, str(file), str(file.parent), select)]
+        )
+
+    def extract_gz(self, file: pathlib.Path) -> typing.List[pathlib.Path]:
+        """
+        Decompress the given gzip file next to it, without its .gz extension.
+
+        Args:
+            file: Path to the compressed file.
+
+        Returns:
+            The path of the decompressed file.
+        """
+        return self._wait(
+            [self._submit(_extract_gz, str(file), str(file.with_suffix("")))]
+        )
+
+    def extract_compressed(
+        self,
+        file: pathlib.Path,
+        compression: str,
+        tar: bool,
+        select: typing.Optional[typing.Callable[[str], bool]] = None,
+    ) -> typing.List[pathlib.Path]:
+        """
+        Extract the given compressed tar archive in its folder, or decompress
+        the given compressed file next to it, without its extension.
+
+        Args:
+            file: Path to the compressed file.
+            compression: Compression of the file (see `decompression.OPENERS`).
+            tar: `True` if the file is a compressed tar archive.
+            select: Function indicating if a member (by name) of a tar archive
+                should be extracted, or `None` to extract all the members. The
+                function must be picklable.
+
+        Returns:
+            The paths of the extracted members (except directories), or the path
+            of the decompressed file.
+
+        Raises:
+            Exception: If a member would be extracted outside of the folder.
+        """
+        return self._wait(
+            [self._submit(_extract_compressed, str(file), compression, tar, select)]
+        )
+
+    def shutdown(self):
+        """
+        Stop the worker processes, new processes are started if needed.
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+# Copyright IRT Antoine de Saint Exupéry et Université Paul Sabatier Toulouse III - All
+# rights reserved. DEEL is a research program operated by IVADO, IRT Saint Exupéry,
+# CRIAQ and ANITI - https://www.deel.ai/
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import os
+import pathlib
+import time
+import typing
+
+from .exceptions import LockTimeoutError
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # type: ignore
+    import msvcrt
+
+# Whether shared locks are supported, on other platforms shared locks are
+# exclusive:
+SHARED_LOCKS: bool = fcntl is not None
+
+
+class FileLock(object):
+
+    """
+    Exclusive lock based on a lock file, shared between processes (and between
+    threads, each acquisition opening the lock file).
+
+    The lock is released by the operating system when the process holding it
+    exits, so that a crashed process never holds it forever. The lock file
+    itself is never removed.
+
+    A shared lock can be held by several owners at once, but not at the same
+    time as an exclusive lock (see `SHARED_LOCKS`).
+    """
+
+    # Interval between two attempts to acquire the lock, in seconds:
+    POLL_INTERVAL: float = 0.1
+
+    # Path to the lock file:
+    _path: pathlib.Path
+
+    # Whether the lock is shared:
+    _shared: bool
+
+    # Descriptor of the lock file while the lock is held:
+    _fd: typing.Optional[int]
+
+    def __init__(self, path: os.PathLike, shared: bool = False):
+        """
+        Args:
+            path: Path to the lock file, created if it does not exist.
+            shared: `True` for a shared lock, `False` for an exclusive lock.
+        """
+        self._path = pathlib.Path(path)
+        self._shared = shared
+        self._fd = None
+
+    @property
+    def path(self) -> pathlib.Path:
+        """
+        Returns:
+            The path to the lock file.
+        """
+        return self._path
+
+    @property
+    def locked(self) -> bool:
+        """
+        Returns:
+            `True` if the lock is held by this object.
+        """
+        return self._fd is not None
+
+    def _try_lock(self, fd: int) -> bool:
+        try:
+            if fcntl is not None:
+                mode = fcntl.LOCK_SH if self._shared else fcntl.LOCK_EX
+                fcntl.flock(fd, mode | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+
+    def acquire(
+        self,
+        timeout: typing.Optional[float] = None,
+        waiting: typing.Optional[typing.Callable[[float], None]] = None,
+    ) -> bool:
+        """
+        Acquire the lock, waiting for it to be released if needed.
+
+        Args:
+            timeout: Maximum duration to wait for the lock, in seconds, or `None`
+                to wait indefinitely.
+            waiting: Function called with the duration waited so far (in seconds)
+                before each attempt, while the lock is held by someone else.
+
+        Returns:
+            `True` if the lock was acquired immediately, `False` if it was held by
+            someone else when this method was called.
+
+        Raises:
+            LockTimeoutError: If the lock could not be acquired within `timeout`
+                seconds.
+        """
+        assert self._fd is None, "The lock is already held."
+
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(str(self._path), os.O_RDWR | os.O_CREAT, 0o666)
+        start = time.monotonic()
+        immediate = True
+        try:
+            while not self._try_lock(fd):
+                immediate = False
+                elapsed = time.monotonic() - start
+                if timeout is not None and elapsed >= timeout:
+                    raise LockTimeoutError(str(self._path), timeout)
+                if waiting is not None:
+                    waiting(elapsed)
+                time.sleep(self.POLL_INTERVAL)
+        except BaseException:
+            os.close(fd)
+            raise
+
+        self._fd = fd
+        return immediate
+
+    def release(self):
+        """
+        Release the lock, if held.
+        """
+        if self._fd is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            else:
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *args):
+        self.release()
@@ -20,19 +20,27 @@
 # LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
+import contextlib
 import ftplib
 import os
+import threading
 import typing
 from pathlib import Path
 
-from tqdm import tqdm
-
 from . import logger
+from .checksum import DEFAULT_ALGORITHM
+from .checksum import Hasher
 from .exceptions import DatasetNotFoundError
 from .exceptions import ProviderNotAvailableError
+from .manifest import Manifest
+from .remote_provider import PartFile
+from .remote_provider import ProgressReader
 from .remote_provider import RemoteFile
 from .remote_provider import RemoteProvider
 from .remote_provider import RemoteSingleFileProvider
+from .selection import Selection
+from .transfer import copy_stream
+from .transfer import Progress
 
 
 class FtpSimpleAuthenticator:
@@ -76,8 +84,8 @@ class FtpRemoteFile(RemoteFile):
     Class representing a remote file for the FTP provider.
     """
 
-    # The FTP client:
-    _client: ftplib.FTP
+    # Function returning the FTP client to use for the current thread:
+    _client_getter: typing.Callable[[], ftplib.FTP]
 
     # Remote path of the file from the ROOT of the FTP server::
     _remote_path: Path
@@ -85,46 +93,128 @@ class FtpRemoteFile(RemoteFile):
     # Local path of the file relative to the dataset folder:
     _local_path: Path
 
-    def __init__(self, client: ftplib.FTP, remote_path: Path, local_path: Path):
+    def __init__(
+        self,
+        client: typing.Union[ftplib.FTP, typing.Callable[[], ftplib.FTP]],
+        remote_path: Path,
+        local_path: Path,
+    ):
         """
         Args:
-            client: The FTP client (used for download).
+            client: The FTP client (used for download), or a function returning
+                the FTP client to use for the calling thread.
             remote_path: Remote path to the dataset file, relative the root of
                 the FTP server..
             local_path: Local path to the file of the dataset, relative to the dataset
                 folder.
         """
-        self._client = client
+        if isinstance(client, ftplib.FTP):
+            self._client_getter = lambda: client  # type: ignore
+        else:
+            self._client_getter = client
         self._remote_path = remote_path
         self._local_path = local_path
 
-    def download(self, local_file: Path):
+    @property
+    def _client(self) -> ftplib.FTP:
+        return self._client_getter()
+
+    def download(self, local_file: Path, hasher: typing.Optional[Hasher] = None):
 
         # Convert the filename to a string:
         filename = self._remote_path.as_posix()
 
-        # Retrive the file size:
-        file_size = self._client.size(filename)
+        # Retrive the file size, if the server supports the SIZE command:
+        file_size = self.size
+
+        # Resume the previous download if the remote file has not changed since,
+        # which cannot be checked without its size:
+        part = PartFile(local_file)
+        validator, offset = None, 0
+        if file_size is not None:
+            validator = self._validator(filename, file_size)
+            offset = part.offset
+            if offset >= file_size or validator is None or validator != part.validator:
+                offset = 0
 
         logger.info("Downloading {}... ".format(local_file))
-        with open(local_file, "wb") as fp:
-
-            # TODO: Remove logging if logger is disabled:
-            pbar = tqdm(
-                total=file_size,
-                desc=self._local_path.parts[-1],
-                unit="bytes",
-                unit_scale=True,
-                unit_divisor=1024,
+        with part.open(offset, validator, hasher) as fp:
+
+            # This is the lower-level version of FTP.retrbinary (the client is
+            # already in binary mode), so that the data connection is read with
+            # large buffers:
+            conn = self._client.transfercmd(
+                "RETR {}".format(filename), rest=offset or None
             )
+            try:
+                # TODO: Remove logging if logger is disabled:
+                with conn.makefile("rb") as stream, Progress(
+                    file_size, self._local_path.parts[-1], offset
+                ) as progress:
+                    copy_stream(stream, fp, progress)
+            finally:
+                conn.close()
+            self._client.voidresp()
+
+        part.commit()
+
+    def _validator(self, filename: str, file_size: int) -> typing.Optional[str]:
+        """
+        Build a validator for the remote file from its modification time and size.
+
+        Args:
+            filename: Remote path of the file.
+            file_size: Size of the remote file.
+
+        Returns:
+            A validator for the remote file, or `None` if the server does not
+            support the MDTM command.
+        """
+        try:
+            mdtm = self._client.sendcmd("MDTM {}".format(filename))
+        except ftplib.error_perm:
+            return None
+        return "{}:{}".format(mdtm.split()[-1], file_size)
 
-            def callback(block):
-                fp.write(block)
-                pbar.update(len(block))
+    @property
+    def size(self) -> typing.Optional[int]:
+        try:
+            return self._client.size(self._remote_path.as_posix())
+        except ftplib.error_perm:
+            return None
 
-            self._client.retrbinary("RETR {}".format(filename), callback)
+    @property
+    def signature(self) -> typing.Optional[str]:
+        filename = self._remote_path.as_posix()
+        try:
+            file_size = self._client.size(filename)
+        except ftplib.error_perm:
+            return None
+        return self._validator(filename, file_size)  # type: ignore
 
-            pbar.close()
+    @property
+    def streamable(self) -> bool:
+        return True
+
+    @contextlib.contextmanager
+    def open(self) -> typing.Iterator[typing.BinaryIO]:
+        client = self._client
+        filename = self._remote_path.as_posix()
+        file_size = client.size(filename)
+
+        logger.info("Streaming {}... ".format(filename))
+
+        # This is the lower-level version of FTP.retrbinary, that gives
+        # us access to the data connection:
+        conn = client.transfercmd("RETR {}".format(filename))
+        try:
+            with ProgressReader(
+                conn.makefile("rb"), file_size, self._local_path.parts[-1]
+            ) as stream:
+                yield stream
+        finally:
+            conn.close()
+        client.voidresp()
 
     @property
     def relative_path(self) -> Path:
@@ -138,9 +228,24 @@ class FtpProvider(RemoteProvider):
     server.
     """
 
-    # The FTP client:
-    _client_alive: bool = False
-    _client: ftplib.FTP
+    # The FTP client, connected on first use (`_client_alive` is `None` until the
+    # connection is attempted):
+    _client_alive: typing.Optional[bool] = None
+    _main_client: typing.Optional[ftplib.FTP] = None
+
+    # Host and login arguments, used to open extra connections for
+    # concurrent downloads:
+    _host: str
+    _login_kwargs: typing.Dict[str, typing.Any]
+
+    # Extra connections for concurrent downloads (one per thread):
+    _thread_clients: threading.local
+    _extra_clients: typing.List[ftplib.FTP]
+    _extra_clients_lock: threading.Lock
+
+    # Connections of the background threads (e.g., refreshing the catalogue
+    # cache), used instead of the main connection in these threads:
+    _background_clients: threading.local
 
     # Remote path to the folder containing the datasets:
     _remote_path: Path
@@ -150,6 +255,19 @@ class FtpProvider(RemoteProvider):
         root_folder: os.PathLike,
         remote_url: str,
         authenticator: typing.Optional[FtpSimpleAuthenticator] = None,
+        max_workers: typing.Optional[int] = None,
+        dedup: typing.Optional[str] = None,
+        delta_sync: typing.Optional[str] = None,
+        revalidate: bool = True,
+        catalogue_ttl: typing.Optional[float] = None,
+        catalogue_max_stale: float = 0,
+        offline_first: bool = False,
+        checksum: typing.Optional[str] = DEFAULT_ALGORITHM,
+        lock_timeout: typing.Optional[float] = None,
+        cache_size: typing.Optional[typing.Union[int, str]] = None,
+        cache_policy: str = "lru",
+        keep_archives: bool = False,
+        extract_workers: typing.Optional[typing.Union[int, str]] = None,
         **kwargs
     ):
         """
@@ -157,9 +275,56 @@ class FtpProvider(RemoteProvider):
             root_folder: Root folder to look-up datasets.
             remote_url: Remote URL of the Ftp server.
             authenticator: Authenticator to use.
+            max_workers: Maximum number of files to download concurrently. Each
+                concurrent download uses its own FTP connection.
+            dedup: Link method of the `BlobStore` used to share files between
+                versions, or `None` to not use a store.
+            delta_sync: Method used to seed unchanged files from the newest local
+                version, or `None` to always download all the files.
+            revalidate: If `True`, a force update only downloads the files that
+                have changed.
+            catalogue_ttl: Time-to-live of the catalogue cache, in seconds, or
+                `None` to not cache the catalogue.
+            catalogue_max_stale: Duration the catalogue cache can be used after
+                its time-to-live while being refreshed, in seconds.
+            offline_first: If `True`, complete local versions are used without
+                contacting the server when an exact version is requested.
+            checksum: Algorithm of the checksum computed while downloading files,
+                or `None` to only check files listed in a published manifest.
+            lock_timeout: Maximum duration to wait for another process retrieving
+                the same version, in seconds, or `None` to wait indefinitely.
+            cache_size: Maximum size of the local versions, managed as a cache, or
+                `None` to keep all the local versions.
+            cache_policy: Eviction policy of the cache (`"lru"` or `"lfu"`).
+            keep_archives: If `True`, zip and uncompressed tar archives are kept
+                and indexed instead of being extracted.
+            extract_workers: Maximum number of processes extracting the downloaded
+                archives in parallel (or `"auto"`), or `None` to extract them in
+                the download threads.
             **kwargs: Extra arguments for the `FTP` constructor.
         """
-        super().__init__(root_folder, remote_url)
+        super().__init__(
+            root_folder,
+            remote_url,
+            max_workers,
+            dedup,
+            delta_sync,
+            revalidate,
+            catalogue_ttl,
+            catalogue_max_stale,
+            offline_first,
+            checksum,
+            lock_timeout,
+            cache_size,
+            cache_policy,
+            keep_archives,
+            extract_workers,
+        )
+
+        self._thread_clients = threading.local()
+        self._extra_clients = []
+        self._extra_clients_lock = threading.Lock()
+        self._background_clients = threading.local()
 
         # Create the FTP client:
         if authenticator is not None:
@@ -174,38 +339,143 @@ class FtpProvider(RemoteProvider):
         parts = remote_url.split("/")
         remote_url = parts[0]
 
-        try:
-            self._client = ftplib.FTP()
-            self._client.connect(remote_url, ftplib.FTP_PORT)
-            self._client.login(**kwargs)
-            self._remote_path = Path(*parts[1:])
-
-            # Switch to binary mode:
-            self._client.sendcmd("type i")
-            self._client_alive = True
-        # Mypy is broken here since ftplib.all_errors is a tuple
-        # of exception objects as far as I am aware, so it should
-        # be fine here:
-        except ftplib.all_errors:  # type: ignore
-            self._client_alive = False
+        self._host = remote_url
+        self._login_kwargs = kwargs
+        self._remote_path = Path(*parts[1:])
+
+    @property
+    def _client(self) -> ftplib.FTP:
+        """
+        Returns:
+            The main FTP client, the connection is opened on first use, or the
+            connection of the current background thread (see `_in_background`).
+        """
+        client = getattr(self._background_clients, "client", None)
+        if client is not None:
+            return client
+        if self._client_alive is None:
+            try:
+                self._main_client = self._connect()
+                self._client_alive = True
+            # Mypy is broken here since ftplib.all_errors is a tuple
+            # of exception objects as far as I am aware, so it should
+            # be fine here:
+            except ftplib.all_errors:  # type: ignore
+                self._client_alive = False
+        return self._main_client  # type: ignore
 
     def __exit__(self, *args):
+        super().__exit__(*args)
+        self._close_extra_clients()
         if self._client_alive:
             self._client_alive = False
-            return self._client.__exit__(*args)
+            return self._main_client.__exit__(*args)  # type: ignore
+
+    def _close_extra_clients(self):
+        """
+        Close the connections of the download threads, once these threads are
+        gone.
+        """
+        with self._extra_clients_lock:
+            extra_clients, self._extra_clients = self._extra_clients, []
+            self._thread_clients = threading.local()
+        for client in extra_clients:
+            client.close()
+
+    def check_health(self) -> bool:
+        self._close_extra_clients()
+
+        # The main connection may have been closed by the server, in which case
+        # it is opened again on next use:
+        if self._client_alive:
+            try:
+                self._main_client.voidcmd("NOOP")  # type: ignore
+            except ftplib.all_errors:  # type: ignore
+                self._main_client.close()  # type: ignore
+                self._client_alive = None
+        else:
+            self._client_alive = None
+        return super().check_health()
+
+    def _connect(self) -> ftplib.FTP:
+        """
+        Open a new connection to the FTP server, in binary mode.
+
+        Returns:
+            A new FTP client, logged in.
+        """
+        client = ftplib.FTP()
+        client.connect(self._host, ftplib.FTP_PORT)
+        client.login(**self._login_kwargs)
+
+        # Switch to binary mode:
+        client.sendcmd("type i")
+        return client
+
+    def _get_client(self) -> ftplib.FTP:
+        """
+        Retrieve the FTP client to use in the current thread.
+
+        A FTP connection cannot be used by multiple threads at once, so
+        each download thread uses its own connection, which is opened on
+        first use and closed once the downloads of the version are done.
+
+        Returns:
+            The FTP client for the current thread.
+        """
+        # A single download thread can safely share the main connection:
+        if self._max_workers == 1:
+            return self._client
+
+        client = getattr(self._thread_clients, "client", None)
+        if client is None:
+            client = self._connect()
+            self._thread_clients.client = client
+            with self._extra_clients_lock:
+                self._extra_clients.append(client)
+        return client
+
+    def _in_background(
+        self, fetch: typing.Callable[[], typing.Any]
+    ) -> typing.Callable[[], typing.Any]:
+        # The main connection cannot be used by the background thread, which
+        # uses its own connection:
+        def run() -> typing.Any:
+            client = self._connect()
+            self._background_clients.client = client
+            try:
+                return fetch()
+            finally:
+                del self._background_clients.client
+                client.close()
+
+        return run
+
+    def _download_files(self, *args, **kwargs) -> Manifest:
+        try:
+            return super()._download_files(*args, **kwargs)
+        finally:
+            # The download threads are gone:
+            self._close_extra_clients()
 
     def _is_available(self) -> bool:
-        return self._client_alive
+        return self._client is not None
 
-    def _list_remote_files(self, name: str, version: str) -> typing.List[RemoteFile]:
+    def _list_remote_files(
+        self, name: str, version: str, selection: typing.Optional[Selection] = None
+    ) -> typing.List[RemoteFile]:
         # Path to the dataset:
         dataset_path = self._remote_path.joinpath(name, version)
 
+        filenames = self._remove_hidden_values(
+            [Path(fpath).name for fpath in self._client.nlst(dataset_path.as_posix())]
+        )
+
         return [
-            FtpRemoteFile(self._client, dataset_path, dataset_path.joinpath())
-            for fpath in self._remove_hidden_values(
-                self._client.nlst(dataset_path.as_posix())
+            FtpRemoteFile(
+                self._get_client, dataset_path.joinpath(filename), Path(filename)
             )
+            for filename in filenames
         ]
 
     def list_datasets(self) -> typing.List[str]:
@@ -261,7 +531,11 @@ class FtpSingleFileProvider(RemoteSingleFileProvider, FtpProvider):
         RemoteSingleFileProvider.__init__(self, root_folder, remote_url, name, version)
         FtpProvider.__init__(self, root_folder, remote_url, authenticator, **kwargs)
 
-    def _list_remote_files(self, name: str, version: str) -> typing.List[RemoteFile]:
+    def _list_remote_files(
+        self, name: str, version: str, selection: typing.Optional[Selection] = None
+    ) -> typing.List[RemoteFile]:
         return [
-            FtpRemoteFile(self._client, self._remote_path, Path(self._remote_path.name))
+            FtpRemoteFile(
+                self._get_client, self._remote_path, Path(self._remote_path.name)
+            )
         ]
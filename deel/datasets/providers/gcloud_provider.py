@@ -39,6 +39,10 @@ class GCloudProvider(LocalProvider):
     def __init__(self, disk: str):
         super().__init__(self._find_gcloud_mount_path(disk))
 
+    def check_health(self) -> bool:
+        # The disk may have been unmounted:
+        return self.root_folder.is_dir()
+
     def _find_gcloud_mount_path(self, disk: str) -> Path:
         """
         -Try to find the GCloud datasets mount path.
@@ -20,17 +20,27 @@
 # LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
+import concurrent.futures
+import contextlib
 import os
 import pathlib
+import threading
 import typing
+import urllib.error
 import urllib.parse
 import urllib.request
 
-from tqdm import tqdm
-
 from . import logger
+from .checksum import hash_file
+from .checksum import Hasher
+from .remote_provider import PartFile
+from .remote_provider import ProgressReader
 from .remote_provider import RemoteFile
 from .remote_provider import RemoteProvider
+from .selection import Selection
+from .transfer import copy_stream
+from .transfer import iter_chunks
+from .transfer import Progress
 
 
 class HttpSimpleAuthenticator:
@@ -68,56 +78,286 @@ class HttpSimpleAuthenticator:
         return self._password
 
 
+def validator_from_headers(headers: typing.Mapping[str, str]) -> typing.Optional[str]:
+    """
+    Retrieve a validator for the content of a HTTP response, suitable for a
+    `If-Range` header.
+
+    Args:
+        headers: Headers of the response.
+
+    Returns:
+        The strong ETag of the response, or its Last-Modified date, or `None` if
+        the response has neither.
+    """
+    etag = headers.get("ETag")
+    if etag is not None and not etag.startswith("W/"):
+        return etag
+    return headers.get("Last-Modified")
+
+
 class HttpRemoteFile(RemoteFile):
 
     """
     Class representing a remote file for the WebDAV provider.
     """
 
+    # Minimum size of a segment when downloading in multiple segments:
+    MIN_SEGMENT_SIZE: int = 1 << 20
+
     # The remote URL of the file::
     _remote_url: str
 
     # Path to the file in the dataset folder:
     _relative_path: pathlib.Path
 
-    def __init__(self, remote_url: str, relative_path: pathlib.Path):
+    # Number of segments to download concurrently:
+    _segments: int
+
+    # Headers of the response to a HEAD request on the file (if retrieved):
+    _head_headers: typing.Optional[typing.Mapping[str, str]]
+
+    def __init__(self, remote_url: str, relative_path: pathlib.Path, segments: int = 1):
         """
         Args:
             remote_url: Remote URL of the file..
             relative_path: Relative path to the file from the dataset
                 folder.
+            segments: Number of byte ranges of the file to download concurrently,
+                if the server supports range requests.
         """
         self._remote_url = remote_url
         self._relative_path = relative_path
+        self._segments = segments
+        self._head_headers = None
 
-    def download(self, local_file: pathlib.Path):
+    def _head(self) -> typing.Mapping[str, str]:
+        """
+        Send a HEAD request for the file, the headers are cached.
 
-        conn = urllib.request.urlopen(self._remote_url)
+        Returns:
+            The headers of the response.
+        """
+        if self._head_headers is None:
+            request = urllib.request.Request(self._remote_url, method="HEAD")
+            with urllib.request.urlopen(request) as conn:
+                self._head_headers = conn.headers
+        return self._head_headers  # type: ignore
+
+    def _segment_ranges(self, file_size: int) -> typing.List[typing.Tuple[int, int]]:
+        """
+        Split the given file size into at most `self._segments` byte ranges of
+        at least `MIN_SEGMENT_SIZE` bytes.
+
+        Args:
+            file_size: Size of the file.
+
+        Returns:
+            The list of (first, last) byte offsets of each range, inclusive.
+        """
+        count = max(1, min(self._segments, file_size // self.MIN_SEGMENT_SIZE))
+        bounds = [file_size * i // count for i in range(count + 1)]
+        return [(bounds[i], bounds[i + 1] - 1) for i in range(count)]
+
+    def _download_segments(
+        self,
+        local_file: pathlib.Path,
+        file_size: int,
+        validator: typing.Optional[str],
+    ) -> bool:
+        """
+        Download the file in multiple byte ranges concurrently, each range being
+        written at its offset in a preallocated file.
+
+        Segmented downloads are not resumable.
+
+        Args:
+            local_file: Local path where the file should be downloaded.
+            file_size: Size of the remote file.
+            validator: Validator of the remote file, used to ensure that all the
+                ranges come from the same version of the file.
+
+        Returns:
+            `True` if the file was downloaded, `False` if the server answered a
+            range request with the whole file (e.g., because the file changed and
+            the validator does not match anymore), in which case the file should
+            be downloaded as a single stream.
+
+        Raises:
+            IOError: If a range is not received completely.
+        """
+        ranges = self._segment_ranges(file_size)
+
+        # Set when a range request is not honoured, to stop the other ranges:
+        restart = threading.Event()
+
+        logger.info("Downloading {} in {} segments... ".format(local_file, len(ranges)))
+        part = PartFile(local_file)
+        with part.open(0, None) as fp, Progress(
+            file_size, local_file.parts[-1]
+        ) as progress:
+            fp.truncate(file_size)
+            fd = fp.fileno()
+
+            def download_range(first: int, last: int):
+                request = urllib.request.Request(self._remote_url)
+                request.add_header("Range", "bytes={}-{}".format(first, last))
+                if validator is not None:
+                    request.add_header("If-Range", validator)
+
+                with urllib.request.urlopen(request) as conn:
+                    if conn.status != 206:
+                        restart.set()
+                        return
+                    offset = first
+                    for chunk in iter_chunks(conn):
+                        if restart.is_set():
+                            return
+                        while chunk:
+                            written = os.pwrite(fd, chunk, offset)  # type: ignore
+                            chunk = chunk[written:]
+                            offset += written
+                            progress.update(written)
+
+                if offset != last + 1:
+                    raise IOError(
+                        "Incomplete range received for {}.".format(self._remote_url)
+                    )
+
+            with concurrent.futures.ThreadPoolExecutor(len(ranges)) as executor:
+                for future in [
+                    executor.submit(download_range, first, last)
+                    for first, last in ranges
+                ]:
+                    future.result()
+
+        if restart.is_set():
+            logger.info(
+                "Range request not honoured for {}, downloading it as a single "
+                "stream.".format(self._remote_url)
+            )
+            part.discard()
+            return False
+
+        part.commit()
+        return True
+
+    def _try_download_segments(self, local_file: pathlib.Path) -> bool:
+        """
+        Download the file in segments if segmented downloads are enabled and
+        supported by the server.
+
+        Args:
+            local_file: Local path where the file should be downloaded.
+
+        Returns:
+            `True` if the file was downloaded, `False` if it should be downloaded
+            as a single stream.
+        """
+        if self._segments <= 1 or not hasattr(os, "pwrite"):
+            return False
+
+        # Servers that do not support (or fail) HEAD requests are downloaded as a
+        # single stream:
+        try:
+            headers = self._head()
+        except urllib.error.URLError as e:
+            logger.info(
+                "HEAD request failed for {}, downloading it as a single stream: "
+                "{}".format(self._remote_url, e)
+            )
+            return False
+        accept_ranges = headers.get("Accept-Ranges", "none")
+        file_size = int(headers.get("Content-Length", 0))
+        validator = validator_from_headers(headers)
+
+        if accept_ranges.lower() != "bytes" or file_size < 2 * self.MIN_SEGMENT_SIZE:
+            return False
+
+        return self._download_segments(local_file, file_size, validator)
+
+    def download(
+        self, local_file: pathlib.Path, hasher: typing.Optional[Hasher] = None
+    ):
+
+        # Segments are written concurrently, so the file is hashed once complete:
+        if self._try_download_segments(local_file):
+            if hasher is not None:
+                hash_file(local_file, hasher)
+            return
+
+        # Resume the previous download if possible, the server will send the
+        # whole file if the If-Range validator does not match anymore:
+        part = PartFile(local_file)
+        offset = part.offset
+        request = urllib.request.Request(self._remote_url)
+        if offset > 0:
+            request.add_header("Range", "bytes={}-".format(offset))
+            request.add_header("If-Range", part.validator)  # type: ignore
+
+        try:
+            conn = urllib.request.urlopen(request)
+        except urllib.error.HTTPError as e:
+            # The partial file is larger than the remote file:
+            if e.code != 416 or offset == 0:
+                raise
+            part.discard()
+            return self.download(local_file, hasher)
+
+        if conn.status != 206:
+            offset = 0
 
         # Retrieve information (size) of the file:
         file_size = int(conn.getheader("Content-Length", 0))
 
         logger.info("Downloading {}... ".format(local_file))
-        with open(local_file, "wb") as fp:
+        with part.open(offset, validator_from_headers(conn.headers), hasher) as fp:
 
             # TODO: Remove logging if logger is disabled:
-            pbar = tqdm(
-                total=None if file_size == 0 else file_size,
-                desc=local_file.parts[-1],
-                unit="bytes",
-                unit_scale=True,
-                unit_divisor=1024,
-            )
-
-            while True:
-                data = conn.read(1024)
-                if not data:
-                    break
-                fp.write(data)
-                pbar.update(len(data))
-            pbar.close()
+            with Progress(
+                None if file_size == 0 else offset + file_size,
+                local_file.parts[-1],
+                offset,
+            ) as progress:
+                copy_stream(conn, fp, progress)
 
         conn.close()
+        part.commit()
+
+    @property
+    def size(self) -> typing.Optional[int]:
+        try:
+            content_length = self._head().get("Content-Length")
+        except urllib.error.URLError:
+            return None
+        return None if content_length is None else int(content_length)
+
+    @property
+    def signature(self) -> typing.Optional[str]:
+        try:
+            headers = self._head()
+        except urllib.error.URLError:
+            return None
+        validator = validator_from_headers(headers)
+        if validator is None:
+            return None
+        return "{}:{}".format(validator, headers.get("Content-Length"))
+
+    @property
+    def streamable(self) -> bool:
+        # A segmented download is faster than a single stream:
+        return self._segments <= 1
+
+    @contextlib.contextmanager
+    def open(self) -> typing.Iterator[typing.BinaryIO]:
+        conn = urllib.request.urlopen(self._remote_url)
+        file_size = int(conn.getheader("Content-Length", 0))
+
+        logger.info("Streaming {}... ".format(self._relative_path))
+        with ProgressReader(
+            conn, None if file_size == 0 else file_size, self._relative_path.name
+        ) as stream:
+            yield stream  # type: ignore
 
     @property
     def relative_path(self) -> pathlib.Path:
@@ -132,12 +372,15 @@ class HttpMultiFilesProvider(RemoteProvider):
     """
 
     # Each remote URL, including credentials:
-    _full_url_list: typing.List[str] = []
+    _full_url_list: typing.List[str]
 
     # Name and version of the dataset corresponding to the remote file:
     _name: str
     _version: str
 
+    # Number of segments to download each file with:
+    _segments: int
+
     def __init__(
         self,
         root_folder: os.PathLike,
@@ -145,6 +388,8 @@ class HttpMultiFilesProvider(RemoteProvider):
         name: str,
         version: str = "1.0.0",
         authenticator: typing.Optional[HttpSimpleAuthenticator] = None,
+        segments: int = 1,
+        **kwargs
     ):
         """
         Args:
@@ -153,10 +398,16 @@ class HttpMultiFilesProvider(RemoteProvider):
             name: Name of the dataset corresponding to the remote file.
             version: Version of the dataset corresponding to the remote file.
             authenticator: Authenticator to use.
+            segments: Number of byte ranges of each file to download concurrently,
+                if the server supports range requests.
+            **kwargs: Extra arguments for `RemoteProvider` (e.g., `max_workers`).
         """
-        super().__init__(root_folder, remote_url_list[0])
+        super().__init__(root_folder, remote_url_list[0], **kwargs)
+
+        self._segments = segments
 
         # Create the WebDAV client:
+        self._full_url_list = []
         for remote_url in remote_url_list:
             if authenticator is not None:
                 remote_url = "{}:{}@{}".format(
@@ -179,10 +430,14 @@ class HttpMultiFilesProvider(RemoteProvider):
                     return False
         return True
 
-    def _list_remote_files(self, name: str, version: str) -> typing.List[RemoteFile]:
+    def _list_remote_files(
+        self, name: str, version: str, selection: typing.Optional[Selection] = None
+    ) -> typing.List[RemoteFile]:
         # Path to the dataset:
         return [
-            HttpRemoteFile(full_url, pathlib.Path(full_url.split("/")[-1]))
+            HttpRemoteFile(
+                full_url, pathlib.Path(full_url.split("/")[-1]), self._segments
+            )
             for full_url in self._full_url_list
         ]
 
@@ -207,6 +462,8 @@ class HttpSingleFileProvider(HttpMultiFilesProvider):
         name: str,
         version: str = "1.0.0",
         authenticator: typing.Optional[HttpSimpleAuthenticator] = None,
+        segments: int = 1,
+        **kwargs
     ):
         """
         Args:
@@ -215,6 +472,10 @@ class HttpSingleFileProvider(HttpMultiFilesProvider):
             name: Name of the dataset corresponding to the remote file.
             version: Version of the dataset corresponding to the remote file.
             authenticator: Authenticator to use.
+            segments: Number of byte ranges of the file to download concurrently,
+                if the server supports range requests. Segmented downloads are
+                disabled by default.
+            **kwargs: Extra arguments for `RemoteProvider`.
         """
         super().__init__(
             root_folder,
@@ -223,4 +484,6 @@ class HttpSingleFileProvider(HttpMultiFilesProvider):
             ],
             name,
             version,
+            segments=segments,
+            **kwargs
         )
@@ -0,0 +1,418 @@
+# -*- coding: utf-8 -*-
+# Copyright IRT Antoine de Saint Exupéry et Université Paul Sabatier Toulouse III - All
+# rights reserved. DEEL is a research program operated by IVADO, IRT Saint Exupéry,
+# CRIAQ and ANITI - https://www.deel.ai/
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import collections
+import concurrent.futures
+import json
+import os
+import pathlib
+import tempfile
+import threading
+import time
+import typing
+
+from . import logger
+from .local_as_provider import LocalFile
+from .manifest import Manifest
+from .manifest import ManifestEntry
+from .remote_provider import FileModifier
+
+
+class LazyFolder(object):
+
+    """
+    Local folder of a dataset version whose files are copied from the source
+    folder of a `LocalAsProvider` the first time they are accessed, see
+    `LocalAsProvider.get_lazy_folder`.
+
+    When a file is accessed (with `open` or `materialize`), the files that
+    follow it in its folder are copied in the background (read-ahead). The
+    accesses are recorded in the metadata folder of the version, and the files
+    accessed by the previous uses of the version are copied in the background
+    when the folder is created (prefetch).
+
+    The copied files are recorded in the progress of the version, so that a
+    later call to `get_folder` only copies the remaining files. Archives are
+    copied as they are, and are extracted by `get_folder`.
+
+    Example:
+        >>> with provider.get_lazy_folder("blink") as folder:
+        ...     with folder.open("valid/labels.csv") as fp:
+        ...         ...
+    """
+
+    # Name of the file containing the access statistics in the metadata folder:
+    ACCESS_FILENAME: str = "access.json"
+
+    # Default number of files read ahead after an accessed file:
+    DEFAULT_READ_AHEAD: int = 8
+
+    # Minimum interval between two saves of the progress, in seconds:
+    _progress_interval: float = 5.0
+
+    # Path to the dataset version in the source folder:
+    _source_path: pathlib.Path
+
+    # Path to the local dataset version:
+    _local_path: pathlib.Path
+
+    # Metadata folder of the local dataset version:
+    _meta_path: pathlib.Path
+
+    # Methods to materialise the files, see `LocalAsProvider.MATERIALIZE_METHODS`:
+    _methods: typing.Tuple[str, ...]
+    _unsupported: typing.Set[str]
+
+    # Modifiers of the provider, files accepted by a modifier are not recorded in
+    # the progress since they are not extracted:
+    _modifiers: typing.Sequence[FileModifier]
+
+    # Number of files read ahead after an accessed file:
+    _read_ahead: int
+
+    # Progress of the version, `None` if the version is complete:
+    _progress: typing.Optional[Manifest]
+    _last_save: float
+
+    # Number of accesses to each file during this use of the folder:
+    _accesses: typing.Counter[str]
+
+    # Materialisation of each file, started or done:
+    _futures: typing.Dict[str, "concurrent.futures.Future[pathlib.Path]"]
+
+    # Sorted files of the source folders, for read-ahead:
+    _listings: typing.Dict[str, typing.List[str]]
+
+    # Background materialisations:
+    _executor: concurrent.futures.ThreadPoolExecutor
+    _background: typing.List[concurrent.futures.Future]
+
+    _lock: threading.Lock
+
+    def __init__(
+        self,
+        source_path: pathlib.Path,
+        local_path: pathlib.Path,
+        meta_path: pathlib.Path,
+        methods: typing.Sequence[str] = ("copy",),
+        modifiers: typing.Sequence[FileModifier] = (),
+        max_workers: int = 4,
+        read_ahead: typing.Optional[int] = None,
+        prefetch: bool = True,
+    ):
+        """
+        Args:
+            source_path: Path to the dataset version in the source folder.
+            local_path: Path to the local dataset version.
+            meta_path: Metadata folder of the local dataset version.
+            methods: Methods to materialise the files, in order of preference.
+            modifiers: Modifiers of the provider.
+            max_workers: Maximum number of files copied at once in the background.
+            read_ahead: Number of files read ahead after an accessed file, or `None`
+                to use `DEFAULT_READ_AHEAD`.
+            prefetch: If `True`, the files accessed by the previous uses of the
+                version are copied in the background.
+        """
+        if read_ahead is None:
+            read_ahead = self.DEFAULT_READ_AHEAD
+        if read_ahead < 0:
+            raise ValueError("read_ahead must be positive.")
+
+        self._source_path = source_path
+        self._local_path = local_path
+        self._meta_path = meta_path
+        self._methods = tuple(methods)
+        self._unsupported = set()
+        self._modifiers = modifiers
+        self._read_ahead = read_ahead
+        self._accesses = collections.Counter()
+        self._futures = {}
+        self._listings = {}
+        self._lock = threading.Lock()
+
+        # A version that exists without progress is complete, otherwise it is
+        # marked as incomplete until `get_folder` copies the remaining files:
+        self._progress = None
+        if Manifest.in_progress(meta_path) or not local_path.exists():
+            self._progress = Manifest.load(meta_path, progress=True) or Manifest()
+            self._progress.save(meta_path, progress=True)
+            Manifest.remove(meta_path)
+            local_path.mkdir(parents=True, exist_ok=True)
+        self._last_save = time.monotonic()
+
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="deel-datasets-lazy"
+        )
+        self._background = []
+
+        if prefetch:
+            previous = self._read_accesses()
+            self._schedule(sorted(previous, key=lambda path: -previous[path]))
+
+    @property
+    def path(self) -> pathlib.Path:
+        """
+        Returns:
+            The path to the local dataset version.
+        """
+        return self._local_path
+
+    def _read_accesses(self) -> typing.Counter[str]:
+        """
+        Returns:
+            The number of accesses to each file recorded by the previous uses of
+            the version.
+        """
+        try:
+            with open(self._meta_path.joinpath(self.ACCESS_FILENAME), "r") as fp:
+                return collections.Counter(
+                    {str(path): int(count) for path, count in json.load(fp).items()}
+                )
+        except (OSError, ValueError, TypeError, AttributeError):
+            return collections.Counter()
+
+    def _write_accesses(self):
+        """
+        Add the accesses of this use of the folder to the recorded ones.
+        """
+        with self._lock:
+            accesses = self._read_accesses() + self._accesses
+            self._accesses.clear()
+        path = self._meta_path.joinpath(self.ACCESS_FILENAME)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w") as fp:
+            json.dump(dict(accesses), fp)
+        os.replace(tmp, path)
+
+    def _relative(self, relative_path: typing.Union[str, os.PathLike]) -> str:
+        """
+        Normalize the given path relative to the dataset version.
+
+        Raises:
+            ValueError: If the path is not inside the dataset version.
+        """
+        path = pathlib.PurePath(relative_path)
+        if path.is_absolute() or ".." in path.parts:
+            raise ValueError("Invalid path in dataset: {}.".format(relative_path))
+        return path.as_posix()
+
+    def _copy(self, relative: str) -> pathlib.Path:
+        """
+        Copy the given file from the source folder, unless it is already in the
+        local folder. Concurrent copies of the same file are shared.
+
+        Args:
+            relative: Path of the file, relative to the dataset version.
+
+        Returns:
+            The local path of the file.
+        """
+        local_file = self._local_path.joinpath(relative)
+        with self._lock:
+            future = self._futures.get(relative)
+            owner = future is None
+            if owner:
+                future = self._futures[relative] = concurrent.futures.Future()
+        if not owner:
+            return future.result()  # type: ignore
+
+        try:
+            # Placeholders are symbolic links and are replaced:
+            if local_file.is_symlink() or not local_file.is_file():
+                source_file = LocalFile(
+                    self._source_path,
+                    self._source_path.joinpath(relative),
+                    self._methods,
+                    self._unsupported,
+                )
+                signature = source_file.signature
+                local_file.parent.mkdir(parents=True, exist_ok=True)
+                fd, tmp = tempfile.mkstemp(
+                    prefix=".{}.".format(local_file.name),
+                    suffix=".tmp",
+                    dir=local_file.parent,
+                )
+                os.close(fd)
+                try:
+                    source_file.download(pathlib.Path(tmp))
+                    os.replace(tmp, local_file)
+                except BaseException:
+                    if os.path.lexists(tmp):
+                        os.unlink(tmp)
+                    raise
+                self._copied(relative, signature, local_file.stat().st_size)
+        except BaseException as e:
+            with self._lock:
+                del self._futures[relative]
+            future.set_exception(e)  # type: ignore
+            raise
+
+        future.set_result(local_file)  # type: ignore
+        return local_file
+
+    def _copied(self, relative: str, signature: typing.Optional[str], size: int):
+        """
+        Record the given copied file in the progress of the version.
+        """
+        if self._progress is None or any(
+            modifier.accept(pathlib.Path(relative)) for modifier in self._modifiers
+        ):
+            return
+        with self._lock:
+            self._progress.add(
+                ManifestEntry(relative, signature, {relative: size}, size)
+            )
+            if time.monotonic() - self._last_save > self._progress_interval:
+                self._progress.save(self._meta_path, progress=True)
+                self._last_save = time.monotonic()
+
+    def _copy_in_background(self, relative: str):
+        try:
+            self._copy(relative)
+        except OSError as e:
+            logger.debug("Failed to read {} ahead: {}".format(relative, e))
+
+    def _schedule(self, relatives: typing.Iterable[str]):
+        """
+        Copy the given files in the background, if they are not already copied.
+        """
+        for relative in relatives:
+            if relative not in self._futures:
+                self._background.append(
+                    self._executor.submit(self._copy_in_background, relative)
+                )
+
+    def _following(self, relative: str) -> typing.List[str]:
+        """
+        Find the files to read ahead after the given one.
+
+        Args:
+            relative: Path of a file, relative to the dataset version.
+
+        Returns:
+            The `_read_ahead` files following the given one in its folder.
+        """
+        parent = pathlib.PurePosixPath(relative).parent.as_posix()
+        with self._lock:
+            listing = self._listings.get(parent)
+        if listing is None:
+            with os.scandir(self._source_path.joinpath(parent)) as entries:
+                listing = sorted(
+                    pathlib.PurePosixPath(parent, entry.name).as_posix()
+                    for entry in entries
+                    if not entry.is_dir()
+                )
+            with self._lock:
+                self._listings[parent] = listing
+        try:
+            index = listing.index(relative)
+        except ValueError:
+            return []
+        return listing[index + 1 : index + 1 + self._read_ahead]
+
+    def materialize(
+        self, relative_path: typing.Union[str, os.PathLike]
+    ) -> pathlib.Path:
+        """
+        Copy the given file to the local folder if it is not already there, and
+        read the following files ahead.
+
+        Args:
+            relative_path: Path of the file, relative to the dataset version.
+
+        Returns:
+            The local path of the file.
+
+        Raises:
+            FileNotFoundError: If the file does not exist in the source folder.
+            ValueError: If the path is not inside the dataset version.
+        """
+        relative = self._relative(relative_path)
+        local_file = self._copy(relative)
+        with self._lock:
+            self._accesses[relative] += 1
+        if self._read_ahead > 0:
+            self._schedule(self._following(relative))
+        return local_file
+
+    def open(
+        self, relative_path: typing.Union[str, os.PathLike], mode: str = "rb"
+    ) -> typing.IO[typing.Any]:
+        """
+        Open the given file, copying it to the local folder first if needed,
+        see `materialize`.
+
+        Args:
+            relative_path: Path of the file, relative to the dataset version.
+            mode: Mode to open the file.
+
+        Returns:
+            The opened file.
+        """
+        return open(self.materialize(relative_path), mode)
+
+    def make_placeholders(self) -> pathlib.Path:
+        """
+        Create symbolic links to the source files for the files that are not in
+        the local folder yet, so that the local folder contains all the files of
+        the version. Placeholders are replaced when their file is accessed through
+        this folder, and must not be written to.
+
+        Returns:
+            The path to the local dataset version.
+        """
+        folders = [self._source_path]
+        while folders:
+            with os.scandir(folders.pop()) as entries:
+                for entry in entries:
+                    source_file = pathlib.Path(entry.path)
+                    if entry.is_dir():
+                        folders.append(source_file)
+                        continue
+                    local_file = self._local_path.joinpath(
+                        source_file.relative_to(self._source_path)
+                    )
+                    if not os.path.lexists(local_file):
+                        local_file.parent.mkdir(parents=True, exist_ok=True)
+                        os.symlink(source_file.absolute(), local_file)
+        return self._local_path
+
+    def close(self):
+        """
+        Stop the background copies, and save the progress of the version and the
+        access statistics.
+        """
+        for future in self._background:
+            future.cancel()
+        self._executor.shutdown(wait=True)
+        self._background = []
+        if self._progress is not None:
+            with self._lock:
+                self._progress.save(self._meta_path, progress=True)
+        self._write_accesses()
+
+    def __enter__(self) -> "LazyFolder":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -20,24 +20,55 @@
 # LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
+import errno
 import os
 import pathlib
-import shutil
 import typing
 
 from tqdm import tqdm
 
+from . import logger
+from .blob_store import reflink
+from .checksum import hash_file
+from .checksum import Hasher
+from .checksum import HashingWriter
 from .exceptions import DatasetNotFoundError
 from .remote_provider import RemoteFile
 from .remote_provider import RemoteProvider
+from .selection import Selection
+from .transfer import copy_file
+from .transfer import copy_stream
+
+if typing.TYPE_CHECKING:
+    from .lazy_folder import LazyFolder  # noqa: F401
 
 # from .remote_provider import RemoteFile andRemoteProvider
 
 
+# Errors indicating that a materialisation method is not supported between the
+# source and the local folders (rather than for a single file):
+_UNSUPPORTED_ERRNOS: typing.FrozenSet[int] = frozenset(
+    {
+        errno.EXDEV,
+        errno.EPERM,
+        errno.EINVAL,
+        errno.ENOTTY,
+        errno.ENOSYS,
+        getattr(errno, "EOPNOTSUPP", errno.EINVAL),
+        getattr(errno, "ENOTSUP", errno.EINVAL),
+    }
+)
+
+
 class LocalFile(RemoteFile):
 
     """
     Representing a local file as local provider file.
+
+    The file is materialised in the local folder using the first of its methods
+    (see `LocalAsProvider.MATERIALIZE_METHODS`) that succeeds. A method that is
+    not supported between the source and the local folders is added to the
+    shared set of unsupported methods, so that it is not tried for other files.
     """
 
     # Path to the local provider directory:
@@ -46,13 +77,44 @@ class LocalFile(RemoteFile):
     # Path to the file (relative to local provider directory):
     _file_path: pathlib.Path
 
-    # Size of the file:
-    _size: int
+    # Size and modification time (in nanoseconds) of the file, retrieved when
+    # first needed:
+    _size: typing.Optional[int]
+    _mtime_ns: typing.Optional[int]
 
-    def __init__(self, dataset_path: os.PathLike, source_path: os.PathLike):
+    # Methods to materialise the file, in order of preference:
+    _methods: typing.Tuple[str, ...]
+
+    # Methods known to be unsupported, shared between files:
+    _unsupported: typing.Set[str]
+
+    def __init__(
+        self,
+        dataset_path: os.PathLike,
+        source_path: os.PathLike,
+        methods: typing.Sequence[str] = ("copy",),
+        unsupported: typing.Optional[typing.Set[str]] = None,
+    ):
+        """
+        Args:
+            dataset_path: Path to the dataset version in the source folder.
+            source_path: Path to the file in the source folder.
+            methods: Methods to materialise the file, in order of preference.
+            unsupported: Set of methods known to be unsupported, shared between
+                files and updated by `download`.
+        """
         self._dataset_path = pathlib.Path(dataset_path)
         self._file_path = pathlib.Path(source_path).relative_to(self._dataset_path)
-        self._size = self.source_path.stat().st_size
+        self._size = None
+        self._mtime_ns = None
+        self._methods = tuple(methods)
+        self._unsupported = set() if unsupported is None else unsupported
+
+    def _stat(self):
+        if self._size is None:
+            stat = self.source_path.stat()
+            self._size = stat.st_size
+            self._mtime_ns = stat.st_mtime_ns
 
     @property
     def source_path(self) -> pathlib.Path:
@@ -68,16 +130,71 @@ class LocalFile(RemoteFile):
         Returns:
             The size of the file, in bytes.
         """
-        return self._size
+        self._stat()
+        return self._size  # type: ignore
 
-    def download(self, local_file: pathlib.Path):
+    def download(
+        self, local_file: pathlib.Path, hasher: typing.Optional[Hasher] = None
+    ):
         """
-        Copy this file from the local provider directory to the local path.
+        Materialise this file from the local provider directory to the local path,
+        using the first of its methods that succeeds.
 
         Args:
-            local_file: Local path where the file should be copied.
+            local_file: Local path where the file should be materialised.
+            hasher: Hash object to update with the content of the file, if any.
         """
-        shutil.copyfile(self.source_path, local_file)
+        # An existing file is replaced rather than overwritten, since it may be a
+        # link to the source file:
+        if os.path.lexists(local_file):
+            os.unlink(local_file)
+
+        for method in self._methods:
+            if method == "copy":
+                break
+            if method in self._unsupported:
+                continue
+            try:
+                if method == "symlink":
+                    os.symlink(self.source_path.absolute(), local_file)
+                elif method == "hardlink":
+                    os.link(self.source_path, local_file)
+                else:
+                    reflink(self.source_path, local_file)
+            except OSError as e:
+                if e.errno in _UNSUPPORTED_ERRNOS:
+                    logger.info(
+                        "Materialisation method '{}' is not supported for {}, "
+                        "falling back to the next method: {}".format(
+                            method, self.source_path, e
+                        )
+                    )
+                    self._unsupported.add(method)
+                continue
+
+            if hasher is not None:
+                hash_file(local_file, hasher)
+            return
+
+        # Without checksum, the content does not go through user space:
+        if hasher is None:
+            copy_file(self.source_path, local_file)
+            return
+
+        with open(self.source_path, "rb") as sp, open(local_file, "wb") as fp:
+            copy_stream(sp, HashingWriter(fp, hasher))  # type: ignore
+
+    @property
+    def signature(self) -> typing.Optional[str]:
+        self._stat()
+        return "{}:{}".format(self._size, self._mtime_ns)
+
+    @property
+    def streamable(self) -> bool:
+        return True
+
+    def open(self) -> typing.ContextManager[typing.BinaryIO]:
+        return open(self.source_path, "rb")
 
     @property
     def relative_path(self) -> pathlib.Path:
@@ -94,20 +211,96 @@ class LocalAsProvider(RemoteProvider):
     """
     The `LocalAsProvider` is a `Provider` associated to a local source of
     datasets.
+
+    Files are materialised in the local folder by copying them, or by linking
+    them to the source files (see `MATERIALIZE_METHODS`). The method is selected
+    per file, and the next method is used for a file when a method fails.
+
+    Since the source is local, files are not hashed by default: links are
+    created without reading the source files, and copies do not go through
+    user space. Files are still hashed when the source publishes a manifest
+    with digests, or when a `checksum` algorithm is given.
     """
 
+    # Available methods to materialise files in the local folder:
+    #   - symlink: symbolic link to the source file, the source must remain
+    #     available;
+    #   - hardlink: hard link to the source file, on the same filesystem only, the
+    #     local files must not be modified in place since they share the content
+    #     of the source files;
+    #   - reflink: copy-on-write clone of the source file, on filesystems that
+    #     support it (e.g., Btrfs or XFS);
+    #   - copy: copy of the file, without going through user space when possible.
+    MATERIALIZE_METHODS: typing.Tuple[str, ...] = (
+        "symlink",
+        "hardlink",
+        "reflink",
+        "copy",
+    )
+
+    # Methods tried, in order, with the "auto" materialisation:
+    AUTO_MATERIALIZE: typing.Tuple[str, ...] = ("reflink", "hardlink", "copy")
+
+    # Default number of files copied concurrently, local copies are limited by
+    # the latency of each file rather than by the bandwidth:
+    DEFAULT_MAX_WORKERS: int = 16
+
     # Local source path of dataset:
     _source_path: pathlib.Path
     _pbar: tqdm
 
-    def __init__(self, root_folder: os.PathLike, source_folder: os.PathLike):
+    # Methods to materialise files, in order of preference, always ending with
+    # "copy":
+    _materialize: typing.Tuple[str, ...]
+
+    # Methods found to be unsupported between the source and the local folders:
+    _unsupported: typing.Set[str]
+
+    def __init__(
+        self,
+        root_folder: os.PathLike,
+        source_folder: os.PathLike,
+        materialize: typing.Union[str, typing.Sequence[str]] = "copy",
+        checksum: typing.Optional[str] = None,
+        **kwargs
+    ):
         """
         Args:
             root_folder: Root folder to look-up datasets.
             source_folder: local source directory of datasets.
+            materialize: Method to materialise files in the local folder (see
+                `MATERIALIZE_METHODS`), a list of methods to try in order, or
+                "auto" for `AUTO_MATERIALIZE`. Files are copied when no other
+                method succeeds.
+            checksum: Algorithm of the checksums recorded in the local manifest,
+                or `None` to only check the digests published by the source.
+            **kwargs: Extra arguments for `RemoteProvider` (e.g., `max_workers`).
+
+        Raises:
+            ValueError: If a materialisation method is invalid, or if symbolic
+                links are used with deduplication.
         """
+        if materialize == "auto":
+            materialize = self.AUTO_MATERIALIZE
+        elif isinstance(materialize, str):
+            materialize = (materialize,)
+        for method in materialize:
+            if method not in self.MATERIALIZE_METHODS:
+                raise ValueError("Invalid materialisation '{}'.".format(method))
+        if "symlink" in materialize and kwargs.get("dedup") is not None:
+            raise ValueError("Symbolic links cannot be used with deduplication.")
+        self._materialize = tuple(materialize)
+        if "copy" not in self._materialize:
+            self._materialize += ("copy",)
+        self._unsupported = set()
+
         self._source_path = pathlib.Path(source_folder)
-        super().__init__(root_folder, self._source_path.absolute().as_posix())
+        super().__init__(
+            root_folder,
+            self._source_path.absolute().as_posix(),
+            checksum=checksum,
+            **kwargs
+        )
 
     def _is_available(self) -> bool:
         """
@@ -118,13 +311,17 @@ class LocalAsProvider(RemoteProvider):
         """
         return self._source_path.exists()
 
-    def _list_remote_files(self, name: str, version: str) -> typing.List[RemoteFile]:
+    def _list_remote_files(
+        self, name: str, version: str, selection: typing.Optional[Selection] = None
+    ) -> typing.List[RemoteFile]:
         """
         List the the local source files for the given dataset version.
 
         Args:
             name: Name of the dataset.
             version: Version of the dataset.
+            selection: Selection of the files, the folders that cannot contain
+                selected files are not listed.
 
         Returns:
             A list of files for the local source dataset version, that can be copied
@@ -133,19 +330,36 @@ class LocalAsProvider(RemoteProvider):
         # Path to the dataset:
         dataset_path = self._source_path.joinpath(name, version)
 
-        return [
-            LocalFile(dataset_path, fpath)
-            for fpath in dataset_path.rglob("*")
-            if not fpath.is_dir()
-        ]
+        # The type of the entries is known without retrieving their status, which
+        # is only retrieved when needed, concurrently:
+        files: typing.List[RemoteFile] = []
+        folders = [dataset_path]
+        while folders:
+            with os.scandir(folders.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        if selection is None or selection.may_contain(
+                            os.path.relpath(entry.path, dataset_path).replace(
+                                os.sep, "/"
+                            )
+                        ):
+                            folders.append(pathlib.Path(entry.path))
+                    else:
+                        files.append(
+                            LocalFile(
+                                dataset_path,
+                                entry.path,
+                                self._materialize,
+                                self._unsupported,
+                            )
+                        )
+        return files
 
     def _before_downloads(self, files: typing.List[RemoteFile]):
         # Compute the total volume of data to copy and initialize
-        # a proper TQDM bar:
-        total_file_size = 0
-        for rfile in files:
-            assert isinstance(rfile, LocalFile)
-            total_file_size += rfile.size
+        # a proper TQDM bar, the sizes are retrieved concurrently:
+        with self._make_executor() as executor:
+            total_file_size = sum(executor.map(lambda rfile: rfile.size, files))
 
         self._pbar = tqdm(
             total=total_file_size,
@@ -162,6 +376,56 @@ class LocalAsProvider(RemoteProvider):
         assert isinstance(file, LocalFile)
         self._pbar.update(file.size)
 
+    def get_lazy_folder(
+        self,
+        name: str,
+        version: str = "latest",
+        placeholders: bool = False,
+        read_ahead: typing.Optional[int] = None,
+        prefetch: bool = True,
+    ) -> "LazyFolder":
+        """
+        Retrieve the given dataset version without copying its files, which are
+        copied the first time they are accessed through the returned folder.
+
+        Args:
+            name: Name of the dataset.
+            version: Version selector for the dataset.
+            placeholders: If `True`, the files that are not copied yet are
+                represented by symbolic links to the source files in the local
+                folder, see `LazyFolder.make_placeholders`.
+            read_ahead: Number of files read ahead after an accessed file, or `None`
+                to use `LazyFolder.DEFAULT_READ_AHEAD`.
+            prefetch: If `True`, the files accessed by the previous uses of the
+                version are copied in the background.
+
+        Returns:
+            The lazy folder of the dataset version, which should be closed when
+            not used anymore.
+
+        Raises:
+            DatasetNotFoundError: If the dataset does not exist in the source
+                folder.
+            DatasetVersionNotFoundError: If the given version was not found.
+        """
+        from .lazy_folder import LazyFolder
+
+        version = self._get_remote_version(name, version)
+        folder = LazyFolder(
+            self._source_path.joinpath(name, version),
+            self._make_folder(name, version),
+            self._make_meta_folder(name, version),
+            # Symbolic links would be taken for placeholders:
+            [method for method in self._materialize if method != "symlink"],
+            self.modifiers,
+            self._max_workers,
+            read_ahead,
+            prefetch,
+        )
+        if placeholders:
+            folder.make_placeholders()
+        return folder
+
     def list_datasets(self) -> typing.List[str]:
         return self._remove_hidden_values(
             [f.name.strip("/") for f in self._source_path.iterdir()]
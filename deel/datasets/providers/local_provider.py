@@ -25,9 +25,11 @@ import pathlib
 import shutil
 import typing
 
+from .blob_store import BlobStore
 from .exceptions import DatasetNotFoundError
 from .exceptions import DatasetVersionNotFoundError
 from .exceptions import VersionNotFoundError
+from .manifest import Manifest
 from .provider import Provider
 
 
@@ -38,6 +40,12 @@ class LocalProvider(Provider):
     a local location (a folder).
     """
 
+    # Name of the folder containing the metadata of the versions:
+    META_FOLDER: str = ".meta"
+
+    # Name of the folder containing the versions being downloaded:
+    STAGING_FOLDER: str = ".staging"
+
     # The root folder where datasets should be looked-up:
     _root_folder: pathlib.Path
 
@@ -103,10 +111,43 @@ class LocalProvider(Provider):
             folder = folder.joinpath(version)
         return folder
 
+    def _make_meta_folder(self, name: str, version: str) -> pathlib.Path:
+        """
+        Create the path for the metadata folder of the given dataset version,
+        without checking if it exists or not.
+
+        Metadata folders are stored in a hidden `.meta` folder inside the dataset
+        folder, so that they are not considered as versions.
+
+        Args:
+            name: Name of the dataset.
+            version: Version of the dataset.
+
+        Returns:
+            A path to the folder containing the metadata of the given version.
+        """
+        return self._make_folder(name).joinpath(self.META_FOLDER, version)
+
+    def _make_staging_folder(self, name: str, version: str) -> pathlib.Path:
+        """
+        Create the path for the folder where the given dataset version is
+        downloaded before being moved into place, without checking if it exists
+        or not.
+
+        Args:
+            name: Name of the dataset.
+            version: Version of the dataset.
+
+        Returns:
+            A path to the staging folder of the given version.
+        """
+        return self._make_folder(name).joinpath(self.STAGING_FOLDER, version)
+
     def _list_versions(self, path: pathlib.Path) -> typing.List[str]:
         """
         List the available versions for the dataset under the
-        given path.
+        given path. Versions whose download is in progress (or was
+        interrupted) are not listed.
 
         Args:
             path: Path to a dataset folder.
@@ -114,7 +155,12 @@ class LocalProvider(Provider):
         Returns:
             A list of versions for the given folder.
         """
-        return self._remove_hidden_values([c.name for c in path.iterdir()])
+        meta_path = path.joinpath(self.META_FOLDER)
+        return [
+            version
+            for version in self._remove_hidden_values([c.name for c in path.iterdir()])
+            if not Manifest.in_progress(meta_path.joinpath(version))
+        ]
 
     def list_datasets(self) -> typing.List[str]:
         if not self._root_folder.exists():
@@ -133,6 +179,9 @@ class LocalProvider(Provider):
         If after deleting this dataset, there are no versions remaining,
         the dataset folder is also removed, unless `keep_dataset` is `True`.
 
+        If the root folder contains a `BlobStore`, the blobs that are not
+        referenced anymore are also removed.
+
         Args:
             name: Name of the dataset to delete.
             version: Version of the dataset to delete.
@@ -142,6 +191,18 @@ class LocalProvider(Provider):
         path = self._make_folder(name, version)
         shutil.rmtree(path)
 
+        for hidden_path in (
+            self._make_meta_folder(name, version),
+            self._make_staging_folder(name, version),
+        ):
+            if hidden_path.exists():
+                shutil.rmtree(hidden_path)
+                if not any(hidden_path.parent.iterdir()):
+                    hidden_path.parent.rmdir()
+
+        if BlobStore.exists(self._root_folder):
+            BlobStore(self._root_folder).release(name, version)
+
         if not keep_dataset and not self.list_versions(name):
             self._make_folder(name).rmdir()
 
@@ -0,0 +1,425 @@
+# -*- coding: utf-8 -*-
+# Copyright IRT Antoine de Saint Exupéry et Université Paul Sabatier Toulouse III - All
+# rights reserved. DEEL is a research program operated by IVADO, IRT Saint Exupéry,
+# CRIAQ and ANITI - https://www.deel.ai/
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import json
+import os
+import pathlib
+import typing
+
+
+class ManifestEntry(object):
+
+    """
+    Entry of a `Manifest`, describing a remote file of a dataset version and
+    the local files it produced.
+    """
+
+    # Path of the remote file, relative to the dataset version:
+    _relative_path: str
+
+    # Signature of the remote file content (see `RemoteFile.signature`):
+    _signature: typing.Optional[str]
+
+    # Local files produced by the remote file, relative to the version folder,
+    # with their sizes:
+    _outputs: typing.Optional[typing.Dict[str, int]]
+
+    # Size of the remote file:
+    _size: typing.Optional[int]
+
+    # Digest of the remote file, formatted as `"<algorithm>:<value>"` (or simply
+    # `"<value>"` for SHA-256, see `checksum.format_digest`):
+    _digest: typing.Optional[str]
+
+    # Indicates if only some of the outputs of the remote file were produced:
+    _partial: bool
+
+    def __init__(
+        self,
+        relative_path: str,
+        signature: typing.Optional[str] = None,
+        outputs: typing.Optional[typing.Dict[str, int]] = None,
+        size: typing.Optional[int] = None,
+        digest: typing.Optional[str] = None,
+        partial: bool = False,
+    ):
+        """
+        Args:
+            relative_path: Path of the remote file, relative to the dataset version.
+            signature: Signature of the remote file, or `None` if unknown.
+            outputs: Paths of the local files produced from the remote file (e.g.,
+                the members of an archive), relative to the version folder, with
+                their sizes, or `None` if unknown.
+            size: Size of the remote file, or `None` if unknown.
+            digest: Digest of the remote file, formatted as `"<algorithm>:<value>"`
+                (or simply `"<value>"` for SHA-256, see `checksum.split_digest`), or
+                `None` if unknown.
+            partial: `True` if only the selected members of the remote file (e.g.,
+                an archive) were extracted, see `Selection`.
+        """
+        self._relative_path = relative_path
+        self._signature = signature
+        self._outputs = outputs
+        self._size = size
+        self._digest = digest
+        self._partial = partial
+
+    @property
+    def relative_path(self) -> str:
+        """
+        Returns: The path of the remote file, relative to the dataset version.
+        """
+        return self._relative_path
+
+    @property
+    def signature(self) -> typing.Optional[str]:
+        """
+        Returns: The signature of the remote file, if known.
+        """
+        return self._signature
+
+    @property
+    def outputs(self) -> typing.Optional[typing.Dict[str, int]]:
+        """
+        Returns: The local files produced by the remote file with their sizes,
+        if known.
+        """
+        return self._outputs
+
+    @property
+    def size(self) -> typing.Optional[int]:
+        """
+        Returns: The size of the remote file, if known.
+        """
+        return self._size
+
+    @property
+    def digest(self) -> typing.Optional[str]:
+        """
+        Returns: The digest of the remote file, formatted as `"<algorithm>:<value>"`
+        (or simply `"<value>"` for SHA-256), if known.
+        """
+        return self._digest
+
+    @property
+    def partial(self) -> bool:
+        """
+        Returns: `True` if only some of the outputs of the remote file were
+        produced.
+        """
+        return self._partial
+
+    def check_outputs(self, folder: pathlib.Path) -> bool:
+        """
+        Check that the outputs of this entry are present in the given folder,
+        with the expected sizes.
+
+        Args:
+            folder: The folder of the dataset version.
+
+        Returns:
+            `True` if all the outputs are present with the expected sizes, `False`
+            otherwise or if the outputs are unknown.
+        """
+        if self._outputs is None:
+            return False
+        for output, size in self._outputs.items():
+            try:
+                if folder.joinpath(output).stat().st_size != size:
+                    return False
+            except OSError:
+                return False
+        return True
+
+    def to_dict(self) -> typing.Dict[str, typing.Any]:
+        return {
+            "path": self._relative_path,
+            "signature": self._signature,
+            "outputs": self._outputs,
+            "size": self._size,
+            "digest": self._digest,
+            "partial": self._partial,
+        }
+
+    @classmethod
+    def from_dict(cls, data: typing.Dict[str, typing.Any]) -> "ManifestEntry":
+        return cls(
+            data["path"],
+            data.get("signature"),
+            data.get("outputs"),
+            data.get("size"),
+            data.get("digest"),
+            data.get("partial", False),
+        )
+
+
+class Manifest(object):
+
+    """
+    A `Manifest` describes a dataset version: the remote files it was downloaded
+    from (with their sizes and digests when known), and the local files each of
+    them produced.
+
+    Manifests are stored in the metadata folder of the version (see
+    `LocalProvider._make_meta_folder`). The manifest is written once the version
+    is completely downloaded, and the progress of a download is kept in a
+    separate file until then, so that the presence of this file indicates that
+    the version is incomplete.
+
+    The manifest of a partial version (see `Selection`) only lists the selected
+    remote files.
+
+    A remote may also publish a manifest in a version folder (see
+    `REMOTE_FILENAME`), using the same format, in which case the sizes and digests
+    of the files it lists are checked after the download.
+    """
+
+    # Name of the manifest file in the metadata folder:
+    FILENAME: str = "manifest.json"
+
+    # Name of the file tracking the progress of a download in the metadata folder:
+    PROGRESS_FILENAME: str = "progress.json"
+
+    # Name of the manifest published by a remote in a version folder:
+    REMOTE_FILENAME: str = ".manifest.json"
+
+    # Version of the manifest format:
+    FORMAT_VERSION: int = 2
+
+    # Entries of the manifest, by relative path:
+    _entries: typing.Dict[str, ManifestEntry]
+
+    def __init__(self, entries: typing.Iterable[ManifestEntry] = ()):
+        """
+        Args:
+            entries: Entries of the manifest.
+        """
+        self._entries = {}
+        for entry in entries:
+            self.add(entry)
+
+    @property
+    def entries(self) -> typing.List[ManifestEntry]:
+        """
+        Returns: The entries of this manifest.
+        """
+        return list(self._entries.values())
+
+    def add(self, entry: ManifestEntry):
+        """
+        Add (or replace) an entry to this manifest.
+
+        Args:
+            entry: The entry to add.
+        """
+        self._entries[entry.relative_path] = entry
+
+    def get(self, relative_path: str) -> typing.Optional[ManifestEntry]:
+        """
+        Args:
+            relative_path: Path of a remote file, relative to the dataset version.
+
+        Returns:
+            The entry for the given remote file, or `None` if there is none.
+        """
+        return self._entries.get(relative_path)
+
+    def unchanged_entry(
+        self, relative_path: str, signature: typing.Optional[str]
+    ) -> typing.Optional[ManifestEntry]:
+        """
+        Retrieve the entry of the given remote file if it has not changed since
+        this manifest was written.
+
+        Args:
+            relative_path: Path of the remote file, relative to the dataset version.
+            signature: Current signature of the remote file.
+
+        Returns:
+            The entry of the remote file, or `None` if the file is not in this
+            manifest, if it has changed, if it cannot be compared or if its outputs
+            are unknown or partial.
+        """
+        entry = self.get(relative_path)
+        if (
+            signature is None
+            or entry is None
+            or entry.signature != signature
+            or entry.outputs is None
+            or entry.partial
+        ):
+            return None
+        return entry
+
+    def outputs(self) -> typing.Optional[typing.Set[str]]:
+        """
+        Returns:
+            The local files produced by all the remote files of this manifest,
+            or `None` if the outputs of some remote files are unknown.
+        """
+        outputs: typing.Set[str] = set()
+        for entry in self._entries.values():
+            if entry.outputs is None:
+                return None
+            outputs.update(entry.outputs)
+        return outputs
+
+    def changes(
+        self, other: "Manifest"
+    ) -> typing.Tuple[typing.List[str], typing.List[str], typing.List[str]]:
+        """
+        Compare the remote files of this manifest with the ones of a newer
+        manifest.
+
+        Args:
+            other: The newer manifest.
+
+        Returns:
+            The sorted lists of remote files that were added, modified and removed
+            in `other`. Files without signature are considered modified.
+        """
+        added, modified, removed = [], [], []
+        for relative_path, entry in other._entries.items():
+            if relative_path not in self._entries:
+                added.append(relative_path)
+            elif (
+                entry.signature is None
+                or self._entries[relative_path].signature != entry.signature
+            ):
+                modified.append(relative_path)
+        for relative_path in self._entries:
+            if relative_path not in other._entries:
+                removed.append(relative_path)
+        return sorted(added), sorted(modified), sorted(removed)
+
+    @classmethod
+    def exists(cls, folder: pathlib.Path) -> bool:
+        """
+        Check if a manifest exists in the given metadata folder. Since manifests
+        are written once a version is completely downloaded, this indicates that
+        the version is complete.
+
+        Args:
+            folder: The metadata folder of a dataset version.
+
+        Returns:
+            `True` if a manifest exists in the given folder.
+        """
+        return folder.joinpath(cls.FILENAME).exists()
+
+    @classmethod
+    def in_progress(cls, folder: pathlib.Path) -> bool:
+        """
+        Check if the download of a dataset version is in progress (or was
+        interrupted), in O(1).
+
+        Args:
+            folder: The metadata folder of a dataset version.
+
+        Returns:
+            `True` if the version is incomplete.
+        """
+        return folder.joinpath(cls.PROGRESS_FILENAME).exists()
+
+    @classmethod
+    def read(cls, path: pathlib.Path) -> typing.Optional["Manifest"]:
+        """
+        Read a manifest file.
+
+        Args:
+            path: Path to the manifest file.
+
+        Returns:
+            The manifest, or `None` if the file does not exist or is not a valid
+            manifest.
+        """
+        try:
+            with open(path, "r") as fp:
+                data = json.load(fp)
+            if data.get("version", cls.FORMAT_VERSION) != cls.FORMAT_VERSION:
+                return None
+            return cls(ManifestEntry.from_dict(entry) for entry in data["files"])
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            return None
+
+    def write(self, path: pathlib.Path):
+        """
+        Write this manifest to the given file. The manifest is written to a
+        temporary file first, so that a valid manifest is never partially written.
+
+        Args:
+            path: Path to the manifest file.
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w") as fp:
+            json.dump(
+                {
+                    "version": self.FORMAT_VERSION,
+                    "files": [entry.to_dict() for entry in self.entries],
+                },
+                fp,
+            )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(
+        cls, folder: pathlib.Path, progress: bool = False
+    ) -> typing.Optional["Manifest"]:
+        """
+        Load the manifest stored in the given metadata folder.
+
+        Args:
+            folder: The metadata folder of a dataset version.
+            progress: If `True`, load the progress of the download instead.
+
+        Returns:
+            The manifest, or `None` if there is no (valid) manifest in the folder.
+        """
+        return cls.read(
+            folder.joinpath(cls.PROGRESS_FILENAME if progress else cls.FILENAME)
+        )
+
+    def save(self, folder: pathlib.Path, progress: bool = False):
+        """
+        Save this manifest in the given metadata folder.
+
+        Args:
+            folder: The metadata folder of a dataset version.
+            progress: If `True`, save this manifest as the progress of the download.
+        """
+        self.write(
+            folder.joinpath(self.PROGRESS_FILENAME if progress else self.FILENAME)
+        )
+
+    @classmethod
+    def remove(cls, folder: pathlib.Path, progress: bool = False):
+        """
+        Remove the manifest in the given metadata folder, if any.
+
+        Args:
+            folder: The metadata folder of a dataset version.
+            progress: If `True`, remove the progress of the download instead.
+        """
+        path = folder.joinpath(cls.PROGRESS_FILENAME if progress else cls.FILENAME)
+        if path.exists():
+            path.unlink()
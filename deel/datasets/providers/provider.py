@@ -70,6 +70,27 @@ class Provider(abc.ABC):
     def __exit__(self, type, value, traceback):
         pass
 
+    def release_all(self):
+        """
+        Release all the versions retrieved with this provider, e.g., when it is
+        returned to a `ProviderPool`. Providers that hold resources for the versions
+        they retrieve (e.g., pins of a cache) release them.
+        """
+        pass
+
+    def check_health(self) -> bool:
+        """
+        Check that this provider can be used again after being idle, e.g., before
+        it is reused by a `ProviderPool`. Broken connections are re-opened when
+        possible, and the state kept for a single use (e.g., listings of the
+        remote) is reset.
+
+        Returns:
+            `True` if this provider can be used again, `False` if it should be
+            closed and replaced.
+        """
+        return True
+
     def get_version(self, version: str, versions: typing.List[str]) -> str:
         """
         Retrieve the version from the list of `versions` that best match
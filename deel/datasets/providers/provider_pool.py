@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+# Copyright IRT Antoine de Saint Exupéry et Université Paul Sabatier Toulouse III - All
+# rights reserved. DEEL is a research program operated by IVADO, IRT Saint Exupéry,
+# CRIAQ and ANITI - https://www.deel.ai/
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import atexit
+import contextlib
+import os
+import threading
+import time
+import typing
+
+from . import logger
+from .provider import Provider
+
+
+class ProviderPool(object):
+
+    """
+    Pool of live providers, shared by the threads of a process, so that the
+    connections of the providers (e.g., FTP logins, WebDAV sessions) and their
+    setup (e.g., mount point lookups) are reused across loads.
+
+    Providers are identified by a key (e.g., their configuration). A leased
+    provider is used by a single lease at once: concurrent leases of the same key
+    use different providers, which are all kept in the pool once released.
+
+    Before an idle provider is leased again, its health is checked (see
+    `Provider.check_health`), and broken providers are replaced. Providers idle for
+    more than `idle_timeout` seconds are closed by a background timer (or by the
+    next use of the pool), as are all the idle providers when the process exits.
+    """
+
+    # Default duration after which idle providers are closed, in seconds:
+    DEFAULT_IDLE_TIMEOUT: float = 300.0
+
+    # Default maximum number of idle providers kept for each key:
+    DEFAULT_MAX_IDLE: int = 4
+
+    # Duration after which idle providers are closed, in seconds:
+    _idle_timeout: float
+
+    # Maximum number of idle providers kept for each key:
+    _max_idle: int
+
+    # Idle providers for each key, with the time they were released, the most
+    # recently released last:
+    _idle: typing.Dict[typing.Hashable, typing.List[typing.Tuple[Provider, float]]]
+
+    # Timer closing the expired providers, running while providers are idle:
+    _timer: typing.Optional[threading.Timer]
+
+    # Process owning the providers, the providers inherited from a parent process
+    # are never used nor closed since their connections are shared with the parent:
+    _pid: int
+
+    _lock: threading.Lock
+
+    def __init__(
+        self,
+        idle_timeout: typing.Optional[float] = None,
+        max_idle: typing.Optional[int] = None,
+    ):
+        """
+        Args:
+            idle_timeout: Duration after which idle providers are closed, in
+                seconds, or `None` to use `DEFAULT_IDLE_TIMEOUT`.
+            max_idle: Maximum number of idle providers kept for each key, or `None`
+                to use `DEFAULT_MAX_IDLE`.
+        """
+        self._idle_timeout = (
+            self.DEFAULT_IDLE_TIMEOUT if idle_timeout is None else idle_timeout
+        )
+        self._max_idle = self.DEFAULT_MAX_IDLE if max_idle is None else max_idle
+        self._idle = {}
+        self._timer = None
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _close(provider: Provider):
+        try:
+            provider.__exit__(None, None, None)
+        except Exception as e:
+            logger.warning("Failed to close provider {}: {}".format(provider, e))
+
+    def _expire(self) -> typing.List[Provider]:
+        """
+        Remove the providers that are idle for too long (or inherited from a parent
+        process) from the pool. Must be called with the lock held.
+
+        Returns:
+            The providers to close.
+        """
+        if self._pid != os.getpid():
+            self._idle = {}
+            self._timer = None
+            self._pid = os.getpid()
+            return []
+
+        expired: typing.List[Provider] = []
+        deadline = time.monotonic() - self._idle_timeout
+        for key in list(self._idle):
+            expired.extend(p for p, t in self._idle[key] if t <= deadline)
+            self._idle[key] = [(p, t) for p, t in self._idle[key] if t > deadline]
+            if not self._idle[key]:
+                del self._idle[key]
+        return expired
+
+    def _schedule(self):
+        """
+        Start the timer closing the expired providers at the expiry of the oldest
+        idle provider, if not started yet. Must be called with the lock held.
+        """
+        if self._timer is not None or not self._idle:
+            return
+        oldest = min(t for entries in self._idle.values() for _, t in entries)
+        self._timer = threading.Timer(
+            max(oldest + self._idle_timeout - time.monotonic(), 0), self._on_timer
+        )
+        self._timer.name = "deel-datasets-pool"
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _on_timer(self):
+        """
+        Close the expired providers, and schedule the next expiry.
+        """
+        with self._lock:
+            if self._timer is not threading.current_thread():
+                return
+            self._timer = None
+            expired = self._expire()
+            self._schedule()
+        for provider in expired:
+            self._close(provider)
+
+    def _acquire(
+        self, key: typing.Hashable, factory: typing.Callable[[], Provider]
+    ) -> Provider:
+        """
+        Retrieve a healthy idle provider for the given key, or create a new one.
+        """
+        while True:
+            with self._lock:
+                expired = self._expire()
+                idle = self._idle.get(key)
+                provider = idle.pop()[0] if idle else None
+            for expired_provider in expired:
+                self._close(expired_provider)
+
+            if provider is None:
+                provider = factory()
+                provider.__enter__()
+                return provider
+
+            try:
+                healthy = provider.check_health()
+            except Exception as e:
+                logger.info("Health check of {} failed: {}".format(provider, e))
+                healthy = False
+            if healthy:
+                return provider
+            self._close(provider)
+
+    def _release(self, key: typing.Hashable, provider: Provider):
+        """
+        Put the given provider back in the pool, or close it if there are
+        already enough idle providers for the key. The versions retrieved with
+        the provider are released (see `Provider.release_all`).
+        """
+        try:
+            provider.release_all()
+        except Exception as e:
+            logger.warning("Failed to release versions of {}: {}".format(provider, e))
+        with self._lock:
+            expired = self._expire()
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self._max_idle:
+                idle.append((provider, time.monotonic()))
+            else:
+                expired.append(provider)
+            self._schedule()
+        for expired_provider in expired:
+            self._close(expired_provider)
+
+    @contextlib.contextmanager
+    def lease(
+        self, key: typing.Hashable, factory: typing.Callable[[], Provider]
+    ) -> typing.Iterator[Provider]:
+        """
+        Lease a provider for the given key, returned to the pool when the context
+        exits.
+
+        Example:
+            >>> with pool.lease(key, lambda: make_provider(...)) as provider:
+            ...     path = provider.get_folder("blink")
+
+        Args:
+            key: Key identifying the provider, e.g., its configuration.
+            factory: Function creating a provider for the key, called when there is
+                no healthy idle provider for the key.
+
+        Returns:
+            A context manager returning the provider, entered.
+        """
+        provider = self._acquire(key, factory)
+        try:
+            yield provider
+        finally:
+            self._release(key, provider)
+
+    def clear(self):
+        """
+        Close all the idle providers. Leased providers are still returned to the
+        pool.
+        """
+        with self._lock:
+            idle = [] if self._pid != os.getpid() else self._idle.values()
+            providers = [p for entries in idle for p, _ in entries]
+            self._idle = {}
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        for provider in providers:
+            self._close(provider)
+
+
+# The pool shared by the whole process, used by `Dataset.load`:
+PROVIDER_POOL: ProviderPool = ProviderPool()
+
+atexit.register(PROVIDER_POOL.clear)
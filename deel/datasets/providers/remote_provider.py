@@ -21,21 +21,53 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 import abc
+import concurrent.futures
+import functools
 import gzip
+import json
 import os
 import pathlib
+import re
 import shutil
 import tarfile
+import time
 import typing
 import zipfile
 
-from tqdm import tqdm
-
 from . import logger
+from .archive_folder import archive_format
+from .archive_folder import build_index
+from .blob_store import BlobStore
+from .catalogue_cache import CatalogueCache
+from .checksum import ALGORITHMS
+from .checksum import DEFAULT_ALGORITHM
+from .checksum import digests_conflict
+from .checksum import format_digest
+from .checksum import hash_file
+from .checksum import Hasher
+from .checksum import HashingReader
+from .checksum import HashingWriter
+from .checksum import new_hasher
+from .checksum import split_digest
+from .dataset_cache import DatasetCache
+from .decompression import lz4
+from .decompression import OPENERS
+from .decompression import zstandard
 from .exceptions import DatasetNotFoundError
 from .exceptions import DatasetVersionNotFoundError
+from .exceptions import IntegrityError
 from .exceptions import VersionNotFoundError
+from .extraction import ExtractionScheduler
+from .file_lock import FileLock
 from .local_provider import LocalProvider
+from .manifest import Manifest
+from .manifest import ManifestEntry
+from .selection import MemberSelector
+from .selection import Selection
+from .tar_index import is_block_compressed
+from .tar_index import scan_members
+from .transfer import copy_stream
+from .transfer import Progress
 
 
 class FileModifier(abc.ABC):
@@ -56,33 +88,162 @@ class FileModifier(abc.ABC):
         """
         pass
 
-    def apply(self, file: pathlib.Path):
+    def apply(self, file: pathlib.Path) -> typing.Optional[typing.List[pathlib.Path]]:
         """
         Apply this modifier to the given file.
 
         Args:
             file: The file to apply the modifier to.
 
+        Returns:
+            The list of files resulting from the modification (e.g., the files
+            extracted from an archive), or `None` if unknown.
+
         Raises:
             FileNotFoundError: If the file does not exists.
         """
         pass
 
+    def accept_stream(self, file: pathlib.Path) -> bool:
+        """
+        Check if this modifier can be applied to the content of the given
+        file while it is being downloaded, i.e., without the file being
+        written to the disk first.
+
+        This is only checked for files that are accepted by `accept`.
+
+        Args:
+            file: The file to check (this file does not exist).
+
+        Returns: True if the modifier can be applied to a stream, False otherwize.
+        """
+        return False
+
+    def apply_stream(
+        self, stream: typing.BinaryIO, file: pathlib.Path
+    ) -> typing.Optional[typing.List[pathlib.Path]]:
+        """
+        Apply this modifier to the content of the given file, read from
+        the given stream. The file itself is never created.
+
+        Args:
+            stream: Readable (non-seekable) stream over the content of the file.
+            file: The local path the file would have been downloaded to.
+
+        Returns:
+            The list of files resulting from the modification, or `None` if
+            unknown.
+        """
+        raise NotImplementedError()
+
+    def with_scheduler(self, scheduler: ExtractionScheduler) -> "FileModifier":
+        """
+        Create a modifier equivalent to this one that applies itself to
+        downloaded files using the given scheduler, if possible.
+
+        Args:
+            scheduler: The scheduler to extract archives with.
+
+        Returns:
+            A new modifier, or this modifier if it cannot use a scheduler.
+        """
+        return self
+
+    def extracts_members(self, file: pathlib.Path) -> bool:
+        """
+        Check if this modifier extracts the members of the given file (e.g., an
+        archive) next to it, in which case the members can be selected with
+        `with_select`.
+
+        This is only checked for files that are accepted by `accept`.
+
+        Args:
+            file: The file to check.
+
+        Returns: True if the modifier extracts members of the file, False otherwize.
+        """
+        return False
+
+    def with_select(self, select: typing.Callable[[str], bool]) -> "FileModifier":
+        """
+        Create a modifier equivalent to this one that only extracts the selected
+        members of the files.
+
+        Args:
+            select: Function indicating if a member (by name) should be extracted,
+                picklable if the modifier uses a scheduler.
+
+        Returns:
+            A new modifier, or this modifier if it cannot select members.
+        """
+        return self
+
 
 class ZipExtractor(FileModifier):
 
     """
     Modifier that unzip files and delete them afterwards.
+
+    Zip archives cannot be extracted from a stream since their central
+    directory is at the end of the file.
     """
 
+    # Scheduler extracting the archives in parallel, if any:
+    _scheduler: typing.Optional[ExtractionScheduler]
+
+    # Function indicating if a member (by name) should be extracted, `None` to
+    # extract all the members:
+    _select: typing.Optional[typing.Callable[[str], bool]]
+
+    def __init__(
+        self,
+        scheduler: typing.Optional[ExtractionScheduler] = None,
+        select: typing.Optional[typing.Callable[[str], bool]] = None,
+    ):
+        """
+        Args:
+            scheduler: Scheduler extracting the archives in parallel, or `None`
+                to extract them in the current thread.
+            select: Function indicating if a member (by name) should be extracted,
+                or `None` to extract all the members (must be picklable when
+                a scheduler is used).
+        """
+        self._scheduler = scheduler
+        self._select = select
+
+    def with_scheduler(self, scheduler: ExtractionScheduler) -> "ZipExtractor":
+        return ZipExtractor(scheduler, self._select)
+
+    def extracts_members(self, file: pathlib.Path) -> bool:
+        return True
+
+    def with_select(self, select: typing.Callable[[str], bool]) -> "ZipExtractor":
+        return ZipExtractor(self._scheduler, select)
+
     def accept(self, file: pathlib.Path) -> bool:
         return file.suffix == ".zip"
 
-    def apply(self, file: pathlib.Path):
+    def apply(self, file: pathlib.Path) -> typing.List[pathlib.Path]:
+        if self._scheduler is not None:
+            outputs = self._scheduler.extract_zip(file, self._select)
+            file.unlink()
+            return outputs
+
         # Extract using zipfile then unlink:
         with zipfile.ZipFile(file, "r") as zp:
-            zp.extractall(file.parent)
+            infos = [
+                info
+                for info in zp.infolist()
+                if self._select is None or self._select(info.filename)
+            ]
+            zp.extractall(file.parent, infos)
+            outputs = [
+                file.parent.joinpath(info.filename)
+                for info in infos
+                if not info.is_dir()
+            ]
         file.unlink()
+        return outputs
 
 
 class TarZExtractor(FileModifier):
@@ -95,6 +256,40 @@ class TarZExtractor(FileModifier):
     methods.
     """
 
+    # Function indicating if a member (by name) should be extracted, `None` to
+    # extract all the members:
+    _select: typing.Optional[typing.Callable[[str], bool]]
+
+    # Scheduler extracting the downloaded archives in parallel, if any:
+    _scheduler: typing.Optional[ExtractionScheduler]
+
+    def __init__(
+        self,
+        select: typing.Optional[typing.Callable[[str], bool]] = None,
+        scheduler: typing.Optional[ExtractionScheduler] = None,
+    ):
+        """
+        Args:
+            select: Function indicating if a member (by name) should be extracted,
+                or `None` to extract all the members (must be picklable when
+                a scheduler is used).
+            scheduler: Scheduler extracting the downloaded archives in parallel,
+                or `None` to extract them in the current thread. Archives
+                extracted while being downloaded are always extracted in the
+                current thread.
+        """
+        self._select = select
+        self._scheduler = scheduler
+
+    def with_scheduler(self, scheduler: ExtractionScheduler) -> "TarZExtractor":
+        return TarZExtractor(self._select, scheduler)
+
+    def extracts_members(self, file: pathlib.Path) -> bool:
+        return True
+
+    def with_select(self, select: typing.Callable[[str], bool]) -> "TarZExtractor":
+        return TarZExtractor(select, self._scheduler)
+
     def accept(self, file: pathlib.Path) -> bool:
         # We accept .tgz, .tar and .tar.gz
         return file.suffix in [".tgz", ".tbz2", ".txz", ".tar"] or (
@@ -103,30 +298,49 @@ class TarZExtractor(FileModifier):
             and file.suffixes[-1] in [".gz", ".bz2", ".xz"]
         )
 
-    def apply(self, file: pathlib.Path):
+    def _extract(
+        self, tp: tarfile.TarFile, path: pathlib.Path
+    ) -> typing.List[pathlib.Path]:
+        """
+        Extract the selected members of the given archive in the given folder.
+
+        Members are checked and extracted one at a time, in a single pass (see
+        `tar_index.scan_members`), so that this also works for archives opened
+        in stream mode.
+
+        Args:
+            tp: The archive to extract.
+            path: The folder where the members should be extracted.
+
+        Returns:
+            The paths of the extracted members, except directories.
+
+        Raises:
+            Exception: If a member would be extracted outside of `path`.
+        """
+        return scan_members(tp, path, self._select)[1]
+
+    def apply(self, file: pathlib.Path) -> typing.List[pathlib.Path]:
+        if self._scheduler is not None:
+            outputs = self._scheduler.extract_tar(file, self._select)
+            file.unlink()
+            return outputs
+
         # Extract using tarfile then unlink:
         with tarfile.open(file, "r") as tp:
-            def is_within_directory(directory, target):
-                
-                abs_directory = os.path.abspath(directory)
-                abs_target = os.path.abspath(target)
-            
-                prefix = os.path.commonprefix([abs_directory, abs_target])
-                
-                return prefix == abs_directory
-            
-            def safe_extract(tar, path=".", members=None, *, numeric_owner=False):
-            
-                for member in tar.getmembers():
-                    member_path = os.path.join(path, member.name)
-                    if not is_within_directory(path, member_path):
-                        raise Exception("Attempted Path Traversal in Tar File")
-            
-                tar.extractall(path, members, numeric_owner=numeric_owner) 
-                
-            
-            safe_extract(tp, file.parent)
+            outputs = self._extract(tp, file.parent)
         file.unlink()
+        return outputs
+
+    def accept_stream(self, file: pathlib.Path) -> bool:
+        return True
+
+    def apply_stream(
+        self, stream: typing.BinaryIO, file: pathlib.Path
+    ) -> typing.List[pathlib.Path]:
+        # Use the stream mode of tarfile, with transparent compression:
+        with tarfile.open(fileobj=stream, mode="r|*") as tp:
+            return self._extract(tp, file.parent)
 
 
 class GzExtractor(FileModifier):
@@ -136,31 +350,454 @@ class GzExtractor(FileModifier):
     them afterwards.
     """
 
-    # Size of the buffer to use for extraction:
-    _buffer_size = 4096
+    # Scheduler decompressing the downloaded files in parallel, if any:
+    _scheduler: typing.Optional[ExtractionScheduler]
+
+    def __init__(self, scheduler: typing.Optional[ExtractionScheduler] = None):
+        """
+        Args:
+            scheduler: Scheduler decompressing the downloaded files in parallel,
+                or `None` to decompress them in the current thread. Files
+                decompressed while being downloaded are always decompressed in
+                the current thread.
+        """
+        self._scheduler = scheduler
+
+    def with_scheduler(self, scheduler: ExtractionScheduler) -> "GzExtractor":
+        return GzExtractor(scheduler)
 
     def accept(self, file: pathlib.Path) -> bool:
         return file.suffix == ".gz" and file.with_suffix("").suffix != ".tar"
 
-    def apply(self, file: pathlib.Path):
+    def _extract(self, zp: gzip.GzipFile, file: pathlib.Path):
+        """
+        Write the decompressed content of the given gzip file next to the
+        given file, without its .gz extension.
+
+        Args:
+            zp: The gzip file to decompress.
+            file: Path to the compressed file.
+        """
+        with open(file.with_suffix(""), "wb") as fp, Progress(
+            None, "Extracting " + file.name
+        ) as progress:
+            copy_stream(zp, fp, progress)  # type: ignore
+
+    def apply(self, file: pathlib.Path) -> typing.List[pathlib.Path]:
+        if self._scheduler is not None:
+            outputs = self._scheduler.extract_gz(file)
+            file.unlink()
+            return outputs
 
         # Extract the content using gzip then remove the file:
-        with gzip.open(file, "rb") as zp, open(file.with_suffix(""), "wb") as fp:
-            pbar = tqdm(
-                desc="Extracting " + file.name,
-                unit="bytes",
-                unit_scale=True,
-                unit_divisor=1024,
+        with gzip.open(file, "rb") as zp:
+            self._extract(zp, file)  # type: ignore
+
+        file.unlink()
+        return [file.with_suffix("")]
+
+    def accept_stream(self, file: pathlib.Path) -> bool:
+        return True
+
+    def apply_stream(
+        self, stream: typing.BinaryIO, file: pathlib.Path
+    ) -> typing.List[pathlib.Path]:
+        with gzip.GzipFile(fileobj=stream, mode="rb") as zp:
+            self._extract(zp, file)
+        return [file.with_suffix("")]
+
+
+class DecompressingExtractor(FileModifier):
+
+    """
+    Base class of the modifiers that decompress files with a multithreaded
+    decoder (see the `decompression` module). Compressed tar archives are
+    extracted, other files (e.g., `data.csv.xz`) are decompressed next to them,
+    without their extension (e.g., `data.csv`). Compressed files are deleted
+    afterwards.
+    """
+
+    # Compression of the files (see `decompression.OPENERS`):
+    COMPRESSION: str = ""
+
+    # Extension of the compressed files:
+    SUFFIX: str = ""
+
+    # Other extensions of the compressed tar archives (e.g., ".tzst"):
+    TAR_SUFFIXES: typing.Tuple[str, ...] = ()
+
+    # Function indicating if a member (by name) of a tar archive should be
+    # extracted, `None` to extract all the members:
+    _select: typing.Optional[typing.Callable[[str], bool]]
+
+    # Scheduler extracting the downloaded files in parallel, if any:
+    _scheduler: typing.Optional[ExtractionScheduler]
+
+    def __init__(
+        self,
+        select: typing.Optional[typing.Callable[[str], bool]] = None,
+        scheduler: typing.Optional[ExtractionScheduler] = None,
+    ):
+        """
+        Args:
+            select: Function indicating if a member (by name) of a tar archive
+                should be extracted, or `None` to extract all the members (must
+                be picklable when a scheduler is used).
+            scheduler: Scheduler extracting the downloaded files in parallel, or
+                `None` to extract them in the current thread. Files extracted
+                while being downloaded are always extracted in the current thread.
+        """
+        self._select = select
+        self._scheduler = scheduler
+
+    def available(self) -> bool:
+        """
+        Returns: `True` if the decoder of this modifier is available (some
+        require optional packages).
+        """
+        return True
+
+    def _open(self, fp: typing.BinaryIO) -> typing.BinaryIO:
+        """
+        Open a decompressing stream over the given compressed stream.
+
+        Args:
+            fp: The compressed stream (not closed with the returned stream).
+
+        Returns:
+            A readable stream over the decompressed content.
+        """
+        return OPENERS[self.COMPRESSION](fp)
+
+    def _is_tar(self, file: pathlib.Path) -> bool:
+        return file.suffix in self.TAR_SUFFIXES or (
+            file.suffix == self.SUFFIX and file.with_suffix("").suffix == ".tar"
+        )
+
+    def accept(self, file: pathlib.Path) -> bool:
+        return self.available() and (
+            file.suffix == self.SUFFIX or file.suffix in self.TAR_SUFFIXES
+        )
+
+    def extracts_members(self, file: pathlib.Path) -> bool:
+        return self._is_tar(file)
+
+    def with_scheduler(
+        self, scheduler: ExtractionScheduler
+    ) -> "DecompressingExtractor":
+        return type(self)(self._select, scheduler)
+
+    def with_select(
+        self, select: typing.Callable[[str], bool]
+    ) -> "DecompressingExtractor":
+        return type(self)(select, self._scheduler)
+
+    def _extract(
+        self, stream: typing.BinaryIO, file: pathlib.Path
+    ) -> typing.List[pathlib.Path]:
+        """
+        Extract the decompressed content of the given file.
+
+        Args:
+            stream: Readable stream over the decompressed content.
+            file: Path to the compressed file.
+
+        Returns:
+            The paths of the extracted files, except directories.
+        """
+        if self._is_tar(file):
+            with tarfile.open(fileobj=stream, mode="r|") as tp:
+                return scan_members(tp, file.parent, self._select)[1]
+
+        with open(file.with_suffix(""), "wb") as fp, Progress(
+            None, "Extracting " + file.name
+        ) as progress:
+            copy_stream(stream, fp, progress)
+        return [file.with_suffix("")]
+
+    def apply(self, file: pathlib.Path) -> typing.List[pathlib.Path]:
+        if self._scheduler is not None:
+            outputs = self._scheduler.extract_compressed(
+                file, self.COMPRESSION, self._is_tar(file), self._select
             )
-            while True:
-                data = zp.read(self._buffer_size)
-                if not data:
-                    break
-                fp.write(data)
-                pbar.update(len(data))
-            pbar.close()
+            file.unlink()
+            return outputs
 
+        with open(file, "rb") as fp, self._open(fp) as stream:  # type: ignore
+            outputs = self._extract(stream, file)
         file.unlink()
+        return outputs
+
+    def accept_stream(self, file: pathlib.Path) -> bool:
+        return True
+
+    def apply_stream(
+        self, stream: typing.BinaryIO, file: pathlib.Path
+    ) -> typing.List[pathlib.Path]:
+        with self._open(stream) as reader:  # type: ignore
+            return self._extract(reader, file)
+
+
+class ZstdExtractor(DecompressingExtractor):
+
+    """
+    Modifier that extract files from Zstandard archives (.zst, .tar.zst and
+    .tzst), decoded in a background thread. Requires the optional `zstandard`
+    package, files are left as they are otherwise.
+    """
+
+    COMPRESSION = "zstd"
+    SUFFIX = ".zst"
+    TAR_SUFFIXES = (".tzst",)
+
+    def available(self) -> bool:
+        return zstandard is not None
+
+
+class Lz4Extractor(DecompressingExtractor):
+
+    """
+    Modifier that extract files from LZ4 archives (.lz4, .tar.lz4 and .tlz4),
+    decoded in a background thread. Requires the optional `lz4` package, files
+    are left as they are otherwise.
+    """
+
+    COMPRESSION = "lz4"
+    SUFFIX = ".lz4"
+    TAR_SUFFIXES = (".tlz4",)
+
+    def available(self) -> bool:
+        return lz4 is not None
+
+
+class XzExtractor(DecompressingExtractor):
+
+    """
+    Modifier that extract files from xz archives (.xz, .tar.xz and .txz). The
+    blocks of downloaded multi-block archives (e.g., compressed with `xz -T0`)
+    are decoded in parallel, other archives are decoded in a background thread.
+    """
+
+    COMPRESSION = "xz"
+    SUFFIX = ".xz"
+    TAR_SUFFIXES = (".txz",)
+
+
+class ArchiveIndexer(FileModifier):
+
+    """
+    Modifier that keeps zip, uncompressed tar and block-compressed tar archives
+    instead of extracting them, and writes the index of their members next to
+    them (see `archive_folder.build_index`), so that members can be read directly
+    from the archives with an `archive_folder.ArchiveFolder`.
+
+    Other compressed tar archives cannot be read at random and are extracted.
+    """
+
+    # Scheduler extracting the archives that are not kept, if any:
+    _scheduler: typing.Optional[ExtractionScheduler]
+
+    # Function indicating if a member (by name) of the archives that are not kept
+    # should be extracted, `None` to extract all the members:
+    _select: typing.Optional[typing.Callable[[str], bool]]
+
+    def __init__(
+        self,
+        scheduler: typing.Optional[ExtractionScheduler] = None,
+        select: typing.Optional[typing.Callable[[str], bool]] = None,
+    ):
+        """
+        Args:
+            scheduler: Scheduler extracting the archives that are not kept, or
+                `None` to extract them in the current thread.
+            select: Function indicating if a member (by name) of the archives
+                that are not kept should be extracted, or `None` to extract all
+                the members. Kept archives are kept whole.
+        """
+        self._scheduler = scheduler
+        self._select = select
+
+    def with_scheduler(self, scheduler: ExtractionScheduler) -> "ArchiveIndexer":
+        return ArchiveIndexer(scheduler, self._select)
+
+    def extracts_members(self, file: pathlib.Path) -> bool:
+        return True
+
+    def with_select(self, select: typing.Callable[[str], bool]) -> "ArchiveIndexer":
+        return ArchiveIndexer(self._scheduler, select)
+
+    def accept(self, file: pathlib.Path) -> bool:
+        return archive_format(file) is not None
+
+    def apply(self, file: pathlib.Path) -> typing.List[pathlib.Path]:
+        if archive_format(file) == "tar.gz" and not is_block_compressed(file):
+            return TarZExtractor(self._select, self._scheduler).apply(file)
+        return [file, build_index(file)]
+
+
+class ProgressReader(object):
+
+    """
+    Minimal read-only stream that wraps another stream and reports the
+    number of bytes read to a progress bar. The progress bar is closed
+    with the stream.
+    """
+
+    # The wrapped stream:
+    _stream: typing.BinaryIO
+
+    # The progress bar:
+    _progress: Progress
+
+    def __init__(self, stream: typing.BinaryIO, total: typing.Optional[int], desc: str):
+        """
+        Args:
+            stream: The stream to wrap.
+            total: Total number of bytes that will be read, if known.
+            desc: Description of the progress bar.
+        """
+        self._stream = stream
+        self._progress = Progress(total, desc)
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._stream.read(size)
+        self._progress.update(len(data))
+        return data
+
+    def close(self):
+        self._progress.close()
+        self._stream.close()
+
+    def __enter__(self) -> "ProgressReader":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class PartFile(object):
+
+    """
+    Partial download of a file, used to resume interrupted downloads.
+
+    The content downloaded so far is stored next to the final file, with an extra
+    `.part` suffix, so that its size is the offset to resume from. A `.part.json`
+    file stores a validator (e.g., an ETag) identifying the remote content, and a
+    partial file without validator is never resumed.
+    """
+
+    # Suffix of partial files:
+    SUFFIX: str = ".part"
+
+    # Final path of the file:
+    _local_file: pathlib.Path
+
+    def __init__(self, local_file: pathlib.Path):
+        """
+        Args:
+            local_file: Final path of the file being downloaded.
+        """
+        self._local_file = local_file
+
+    @property
+    def path(self) -> pathlib.Path:
+        """
+        Returns: The path of the partial file.
+        """
+        return self._local_file.with_name(self._local_file.name + self.SUFFIX)
+
+    @property
+    def _meta_path(self) -> pathlib.Path:
+        return self._local_file.with_name(self._local_file.name + self.SUFFIX + ".json")
+
+    @property
+    def validator(self) -> typing.Optional[str]:
+        """
+        Returns:
+            The validator of the remote content the partial file corresponds to, or
+            `None` if there is no valid partial file.
+        """
+        try:
+            with open(self._meta_path, "r") as fp:
+                return json.load(fp)["validator"]  # type: ignore
+        except (OSError, ValueError, KeyError):
+            return None
+
+    @property
+    def offset(self) -> int:
+        """
+        Returns:
+            The number of bytes that can be resumed from the partial file, i.e.,
+            0 if there is no valid partial file.
+        """
+        if self.validator is None or not self.path.exists():
+            return 0
+        return self.path.stat().st_size
+
+    def open(
+        self,
+        offset: int,
+        validator: typing.Optional[str],
+        hasher: typing.Optional[Hasher] = None,
+    ) -> typing.BinaryIO:
+        """
+        Open the partial file for writing, starting at the given offset.
+
+        Args:
+            offset: Offset to start writing at, either 0 or `self.offset`.
+            validator: Validator of the remote content, or `None` if the remote
+                does not provide any, in which case the download will not be
+                resumable.
+            hasher: Hash object to update with the content of the file, if any.
+                When resuming, the content already downloaded is hashed first.
+
+        Returns:
+            The partial file, opened for writing.
+        """
+        if offset == 0:
+            self.discard()
+            if validator is not None:
+                with open(self._meta_path, "w") as mp:
+                    json.dump({"validator": validator}, mp)
+            fp = open(self.path, "wb")
+        else:
+            if hasher is not None:
+                hash_file(self.path, hasher, offset)
+            fp = open(self.path, "ab")
+        if hasher is None:
+            return fp
+        return HashingWriter(fp, hasher)  # type: ignore
+
+    def commit(self):
+        """
+        Move the partial file to its final location.
+        """
+        os.replace(self.path, self._local_file)
+        if self._meta_path.exists():
+            self._meta_path.unlink()
+
+    def discard(self):
+        """
+        Remove the partial file, if any.
+        """
+        for path in (self.path, self._meta_path):
+            if path.exists():
+                path.unlink()
+
+    @classmethod
+    def is_part_file(cls, file: pathlib.Path) -> bool:
+        """
+        Check if the given file is a partial file (or its metadata).
+
+        Args:
+            file: The file to check.
+
+        Returns:
+            `True` if the given file belongs to a partial download.
+        """
+        return file.name.endswith(cls.SUFFIX) or file.name.endswith(
+            cls.SUFFIX + ".json"
+        )
 
 
 class RemoteFile(object):
@@ -170,15 +807,59 @@ class RemoteFile(object):
     """
 
     @abc.abstractmethod
-    def download(self, local_file: pathlib.Path):
+    def download(
+        self, local_file: pathlib.Path, hasher: typing.Optional[Hasher] = None
+    ):
         """
         Download this file from the remote storage to the local path.
 
         Args:
             local_file: Local path where the file should be downloaded.
+            hasher: Hash object (see `checksum.new_hasher`) to update with the
+                content of the file as it is written, if any.
         """
         pass
 
+    @property
+    def size(self) -> typing.Optional[int]:
+        """
+        Returns:
+            The size of this file in bytes, or `None` if not available.
+        """
+        return None
+
+    @property
+    def signature(self) -> typing.Optional[str]:
+        """
+        Retrieve a signature of the content of this remote file, from metadata
+        that are much cheaper to obtain than the file itself (e.g., its size and
+        ETag). Two different contents should not have the same signature.
+
+        Returns:
+            The signature of this file, or `None` if not available.
+        """
+        return None
+
+    @property
+    def streamable(self) -> bool:
+        """
+        Returns:
+            `True` if this file can be read as a stream using `open`.
+        """
+        return False
+
+    def open(self) -> typing.ContextManager[typing.BinaryIO]:
+        """
+        Open a readable stream over the content of this remote file.
+
+        Only available if `streamable` is `True`. The stream is not seekable
+        and should be used as a context manager.
+
+        Returns:
+            A context manager returning a readable stream.
+        """
+        raise NotImplementedError()
+
     @property
     @abc.abstractmethod
     def relative_path(self) -> pathlib.Path:
@@ -198,26 +879,227 @@ class RemoteProvider(LocalProvider):
     If a dataset is not found locally (or a force download is required), the
     provider will first downloads all the files corresponding to the given dataset,
     and then extract all archived files (.zip, .gz, .tgz) in the local folder.
+
+    Only the first modifier accepting a file is applied to it. When both the remote
+    file and the modifier support it (see `RemoteFile.open` and
+    `FileModifier.accept_stream`), archives are extracted while being downloaded,
+    without being written to the local folder.
+
+    Zip and uncompressed tar archives can also be kept instead of being extracted
+    (see `ArchiveIndexer`), their members are then read directly from the archives
+    through an `archive_folder.ArchiveFolder`.
+
+    When a force update of a local version is required, the version is revalidated
+    (unless disabled): only the remote files whose signature has changed since the
+    version was downloaded (see `RemoteFile.signature`) are downloaded again.
     """
 
     # Remote server URL:
     _remote_url: str
 
-    # List of modifiers to apply to the files:
+    # List of modifiers to apply to the files, compressed tar archives are
+    # extracted by the decompressing extractors (with their multithreaded
+    # decoders) before `TarZExtractor`, all of them can use a scheduler:
     modifiers: typing.List[FileModifier] = [
         ZipExtractor(),
+        ZstdExtractor(),
+        Lz4Extractor(),
+        XzExtractor(),
         TarZExtractor(),
         GzExtractor(),
     ]
 
-    def __init__(self, root_folder: os.PathLike, remote_url: str):
+    # Size of the reads used to consume the end of streamed files:
+    _drain_size: int = 65536
+
+    # Default number of files downloaded concurrently:
+    DEFAULT_MAX_WORKERS: int = 4
+
+    # Number of files downloaded concurrently:
+    _max_workers: int
+
+    # Store used to deduplicate files between versions (if any):
+    _store: typing.Optional[BlobStore]
+
+    # Available methods to seed unchanged files for delta synchronisation:
+    DELTA_SYNC_METHODS: typing.Tuple[typing.Optional[str], ...] = (
+        None,
+        "copy",
+        "hardlink",
+    )
+
+    # Method to seed unchanged files for delta synchronisation (if enabled):
+    _delta_sync: typing.Optional[str]
+
+    # Revalidate local versions instead of downloading them again on force update:
+    _revalidate: bool
+
+    # Cache of the remote catalogue (if enabled):
+    _catalogue_cache: typing.Optional[CatalogueCache]
+
+    # Regex matching exact versions (as opposed to wildcards or "latest"):
+    EXACT_VERSION_REGEX: typing.Pattern = re.compile("[0-9]+[.][0-9]+[.][0-9]+")
+
+    # Use complete local versions without contacting the remote:
+    _offline_first: bool
+
+    # Minimum interval between two saves of the progress of a download, in seconds:
+    _progress_interval: float = 5.0
+
+    # Algorithm of the checksum of downloaded files, if any:
+    _checksum: typing.Optional[str]
+
+    # Number of times a file that does not match its expected digest is
+    # downloaded again:
+    _integrity_retries: int = 2
+
+    # Name of the folder containing the lock files of the versions, in the root
+    # folder:
+    LOCK_FOLDER: str = ".locks"
+
+    # Maximum duration to wait for another process retrieving the same version,
+    # in seconds (`None` to wait indefinitely):
+    _lock_timeout: typing.Optional[float]
+
+    # Interval between two reports of the progress of another process retrieving
+    # the same version, in seconds:
+    _lock_report_interval: float = 10.0
+
+    # Size-limited cache of the local versions (if enabled):
+    _cache: typing.Optional[DatasetCache]
+
+    # Keep zip and uncompressed tar archives instead of extracting them:
+    _keep_archives: bool
+
+    # Scheduler extracting the downloaded archives in worker processes (if enabled):
+    _scheduler: typing.Optional[ExtractionScheduler]
+
+    def __init__(
+        self,
+        root_folder: os.PathLike,
+        remote_url: str,
+        max_workers: typing.Optional[int] = None,
+        dedup: typing.Optional[str] = None,
+        delta_sync: typing.Optional[str] = None,
+        revalidate: bool = True,
+        catalogue_ttl: typing.Optional[float] = None,
+        catalogue_max_stale: float = 0,
+        offline_first: bool = False,
+        checksum: typing.Optional[str] = DEFAULT_ALGORITHM,
+        lock_timeout: typing.Optional[float] = None,
+        cache_size: typing.Optional[typing.Union[int, str]] = None,
+        cache_policy: str = "lru",
+        keep_archives: bool = False,
+        extract_workers: typing.Optional[typing.Union[int, str]] = None,
+    ):
+        """
+        Args:
+            root_folder: Root folder to look-up datasets.
+            remote_url: Remote URL of the WebDAV server.
+            max_workers: Maximum number of files to download concurrently, or
+                `None` to use `DEFAULT_MAX_WORKERS`.
+            dedup: If not `None`, downloaded files are stored in a `BlobStore`
+                in the root folder, shared by all versions, and this indicates
+                the link method to use (`"hardlink"` or `"reflink"`).
+            delta_sync: If not `None`, a new version of a dataset is seeded from the
+                newest local version by only downloading the remote files that have
+                changed, and this indicates how unchanged files are seeded (`"copy"`
+                or `"hardlink"`).
+            revalidate: If `True`, a force update of a local version only downloads
+                the remote files that have changed, otherwise the whole version is
+                downloaded again.
+            catalogue_ttl: If not `None`, the datasets and versions on the remote
+                are cached in the root folder, and this indicates the duration
+                (in seconds) the cached values can be used without contacting the
+                remote.
+            catalogue_max_stale: Duration (in seconds) after `catalogue_ttl` during
+                which cached values are still used, while being refreshed in the
+                background.
+            offline_first: If `True`, an exact version that is complete locally is
+                used without contacting the remote.
+            checksum: Algorithm of the checksum computed while downloading files
+                (see `checksum.ALGORITHMS`), or `None` to only compute checksums
+                of files with a digest in the manifest published by the remote.
+            lock_timeout: Maximum duration to wait for another process (or thread)
+                retrieving the same version, in seconds, or `None` to wait
+                indefinitely.
+            cache_size: If not `None`, the local versions are managed as a
+                `DatasetCache`, and this indicates the maximum size of the cache
+                (in bytes, or as a string with a unit, e.g., `"500G"`).
+            cache_policy: Eviction policy of the cache (`"lru"` or `"lfu"`).
+            keep_archives: If `True`, zip and uncompressed tar archives are kept and
+                indexed instead of being extracted, see `ArchiveIndexer`.
+            extract_workers: If not `None`, the downloaded archives are extracted
+                in parallel by an `ExtractionScheduler`, and this indicates the
+                maximum number of worker processes (bounded by the number of CPUs),
+                or `"auto"` to use one process per CPU.
+        """
+        super().__init__(root_folder)
+        self._remote_url = remote_url
+
+        if max_workers is None:
+            max_workers = self.DEFAULT_MAX_WORKERS
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1.")
+        self._max_workers = max_workers
+
+        self._store = None
+        if dedup is not None:
+            self._store = BlobStore(self.root_folder, link=dedup)
+
+        if delta_sync not in self.DELTA_SYNC_METHODS:
+            raise ValueError("Invalid delta synchronisation '{}'.".format(delta_sync))
+        self._delta_sync = delta_sync
+        self._revalidate = revalidate
+        self._offline_first = offline_first
+
+        if checksum is not None:
+            new_hasher(checksum)
+        self._checksum = checksum
+        self._lock_timeout = lock_timeout
+
+        self._keep_archives = keep_archives
+        if keep_archives:
+            self.modifiers = [ArchiveIndexer()] + self.modifiers
+
+        self._scheduler = None
+        if extract_workers is not None:
+            self._scheduler = ExtractionScheduler(
+                None if extract_workers == "auto" else int(extract_workers)
+            )
+            self.modifiers = [
+                modifier.with_scheduler(self._scheduler) for modifier in self.modifiers
+            ]
+
+        self._cache = None
+        if cache_size is not None:
+            self._cache = DatasetCache(
+                self.local_provider(), self._make_lock, cache_size, cache_policy
+            )
+
+        self._catalogue_cache = None
+        if catalogue_ttl is not None:
+            self._catalogue_cache = CatalogueCache(
+                self.root_folder,
+                self._catalogue_id(),
+                catalogue_ttl,
+                catalogue_max_stale,
+            )
+
+    def __exit__(self, *args):
+        if self._catalogue_cache is not None:
+            self._catalogue_cache.wait()
+        if self._scheduler is not None:
+            self._scheduler.shutdown()
+        self.release_all()
+        return super().__exit__(*args)
+
+    def _catalogue_id(self) -> str:
         """
-        Args:
-            root_folder: Root folder to look-up datasets.
-            remote_url: Remote URL of the WebDAV server.
+        Returns:
+            An identifier of the remote, used to find the catalogue cache.
         """
-        super().__init__(root_folder)
-        self._remote_url = remote_url
+        return "{}:{}".format(type(self).__name__, self._remote_url)
 
     @property
     def remote_url(self) -> str:
@@ -226,6 +1108,21 @@ class RemoteProvider(LocalProvider):
         """
         return self._remote_url
 
+    @property
+    def max_workers(self) -> int:
+        """
+        Returns: The maximum number of files downloaded concurrently.
+        """
+        return self._max_workers
+
+    @property
+    def keep_archives(self) -> bool:
+        """
+        Returns: `True` if zip and uncompressed tar archives are kept instead of
+        being extracted.
+        """
+        return self._keep_archives
+
     def local_provider(self) -> LocalProvider:
         """
         Create and returns a `LocalProvider` corresponding to the local
@@ -248,13 +1145,18 @@ class RemoteProvider(LocalProvider):
         pass
 
     @abc.abstractmethod
-    def _list_remote_files(self, name: str, version: str) -> typing.List[RemoteFile]:
+    def _list_remote_files(
+        self, name: str, version: str, selection: typing.Optional[Selection] = None
+    ) -> typing.List[RemoteFile]:
         """
         List the remote files for the given dataset version.
 
         Args:
             name: Name of the dataset.
             version: Version of the dataset.
+            selection: Selection of the files to download, if any. The folders that
+                cannot contain selected files do not need to be listed, the files
+                that are not selected are skipped by the caller.
 
         Returns:
             A list of files for the remote dataset version, that can be downloaded
@@ -262,13 +1164,88 @@ class RemoteProvider(LocalProvider):
         """
         pass
 
-    def _get_remote_version(self, name: str, version: str = "latest") -> str:
+    def _list_catalogue(self) -> typing.Dict[str, typing.List[str]]:
+        """
+        List all the datasets available on the remote with their versions.
+
+        The default implementation lists the versions of each dataset one after
+        the other. Child classes should override this method if they can list
+        the versions more efficiently.
+
+        Returns:
+            A mapping from the remote datasets to their versions.
+        """
+        return {name: self.list_versions(name) for name in self.list_datasets()}
+
+    def _list_remote_versions(self, name: str) -> typing.List[str]:
+        """
+        List the versions of the given remote dataset.
+
+        Args:
+            name: Name of the dataset.
+
+        Returns:
+            The versions of the given remote dataset.
+
+        Raises:
+            DatasetNotFoundError: If the remote is not available or the dataset
+                was not found.
+        """
+        if self._is_available() and name in self.list_datasets():
+            return self.list_versions(name)
+        raise DatasetNotFoundError(name)
+
+    def list_catalogue(self) -> typing.Dict[str, typing.List[str]]:
+        """
+        List all the datasets available on the remote with their versions,
+        using the catalogue cache if enabled.
+
+        Returns:
+            A mapping from the remote datasets to their versions.
+        """
+        if self._catalogue_cache is None:
+            return self._list_catalogue()
+        return self._catalogue_cache.lookup(
+            "datasets",
+            self._list_catalogue,
+            self._in_background(self._list_catalogue),
+        )
+
+    def _in_background(
+        self, fetch: typing.Callable[[], typing.Any]
+    ) -> typing.Callable[[], typing.Any]:
+        """
+        Adapt the given function retrieving values from the remote so that it can
+        run in a background thread (e.g., to refresh the catalogue cache) while
+        this provider is used by other threads.
+
+        Args:
+            fetch: Function retrieving values from the remote.
+
+        Returns:
+            A function equivalent to `fetch`, which can run in a background
+            thread.
+        """
+        return fetch
+
+    def invalidate_catalogue(self):
+        """
+        Remove the cached catalogue of the remote, if any.
+        """
+        if self._catalogue_cache is not None:
+            self._catalogue_cache.invalidate()
+
+    def _get_remote_version(
+        self, name: str, version: str = "latest", use_cache: bool = True
+    ) -> str:
         """
         Retrieve the remote version corresponding to the given dataset.
 
         Args:
             name: Name of the dataset.
             version: Version selector for the dataset.
+            use_cache: If `False`, the versions are always retrieved from the remote
+                (and the catalogue cache is updated).
 
         Returns:
             The remote version corresponding to this dataset.
@@ -280,13 +1257,18 @@ class RemoteProvider(LocalProvider):
         """
 
         # List of remote versions:
-        remote_versions: typing.List[str] = []
-
-        # Check the remote client and list the versions:
-        if self._is_available() and name in self.list_datasets():
-            remote_versions = self.list_versions(name)
+        if self._catalogue_cache is None:
+            remote_versions = self._list_remote_versions(name)
         else:
-            raise DatasetNotFoundError(name)
+            key = "versions/{}".format(name)
+            if use_cache:
+                fetch = functools.partial(self._list_remote_versions, name)
+                remote_versions = self._catalogue_cache.lookup(
+                    key, fetch, self._in_background(fetch)
+                )
+            else:
+                remote_versions = self._list_remote_versions(name)
+                self._catalogue_cache.set(key, remote_versions)
 
         try:
             return self.get_version(version, remote_versions)
@@ -315,18 +1297,649 @@ class RemoteProvider(LocalProvider):
         """
         Call back method at the end of each dataset file downloading
         Can be used to increments tqdm progression.
+
+        This method is always called from the thread that called `get_folder`,
+        even when files are downloaded concurrently.
+
         Args:
             local_file_path: local path to downloaded file
         """
         pass
 
+    def _clear_folder(
+        self,
+        path: pathlib.Path,
+        keep: typing.AbstractSet[pathlib.Path] = frozenset(),
+    ):
+        """
+        Remove the content of the given dataset version folder, except the
+        partial files of interrupted downloads that may be resumed.
+
+        Args:
+            path: The folder to clear.
+            keep: Files that should not be removed.
+        """
+        for child in path.iterdir():
+            if child.is_dir() and not child.is_symlink():
+                self._clear_folder(child, keep)
+                if not any(child.iterdir()):
+                    child.rmdir()
+            elif not PartFile.is_part_file(child) and child not in keep:
+                child.unlink()
+
+    def _make_executor(self) -> concurrent.futures.Executor:
+        """
+        Create the executor used to download the files of a dataset version.
+
+        By default, a pool of `max_workers` threads is used since downloads
+        are I/O bound. Child classes can override this method to use another
+        kind of executor.
+
+        Returns:
+            A new executor for the downloads.
+        """
+        return concurrent.futures.ThreadPoolExecutor(
+            max_workers=self._max_workers, thread_name_prefix="deel-datasets"
+        )
+
+    def _find_delta_source(
+        self, name: str, version: str
+    ) -> typing.Optional[typing.Tuple[pathlib.Path, Manifest]]:
+        """
+        Find the local version to seed the given version from, for delta
+        synchronisation.
+
+        Args:
+            name: Name of the dataset.
+            version: Version of the dataset being downloaded.
+
+        Returns:
+            The folder and manifest of the newest local version of the dataset
+            (other than `version`) that has a manifest, or `None` if there is none.
+        """
+        path = self._make_folder(name)
+        if not path.exists():
+            return None
+
+        for local_version in sorted(self._list_versions(path), reverse=True):
+            if local_version == version:
+                continue
+            manifest = Manifest.load(self._make_meta_folder(name, local_version))
+            if manifest is not None:
+                return self._make_folder(name, local_version), manifest
+
+        return None
+
+    def _seed_files(
+        self, source: pathlib.Path, target: pathlib.Path, entry: ManifestEntry
+    ) -> bool:
+        """
+        Seed the outputs of the given manifest entry from another local version
+        of the dataset.
+
+        Args:
+            source: Folder of the version to seed from.
+            target: Folder of the version to seed.
+            entry: The entry whose outputs should be seeded.
+
+        Returns:
+            `True` if the files were seeded, `False` if some files are missing
+            in the source folder or do not have the expected size.
+        """
+        if not entry.check_outputs(source):
+            return False
+
+        # The files are already there when revalidating a version:
+        if source == target:
+            return True
+
+        for output in entry.outputs:  # type: ignore
+            target_file = target.joinpath(output)
+            target_file.parent.mkdir(parents=True, exist_ok=True)
+            if self._delta_sync == "hardlink":
+                try:
+                    os.link(source.joinpath(output), target_file)
+                    continue
+                except OSError:
+                    pass
+            shutil.copy2(source.joinpath(output), target_file)
+
+        return True
+
+    def _check_integrity(
+        self,
+        remote_file: RemoteFile,
+        expected: typing.Optional[ManifestEntry],
+        size: int,
+        digest: typing.Optional[str],
+        outputs: typing.List[pathlib.Path],
+    ):
+        """
+        Check that a downloaded file matches its expected size and digest. The
+        files produced by the download are removed if it does not.
+
+        Args:
+            remote_file: The downloaded file.
+            expected: The entry of the file in the manifest published by the remote,
+                if any.
+            size: Number of bytes downloaded.
+            digest: Digest of the bytes downloaded, if computed.
+            outputs: The files produced by the download.
+
+        Raises:
+            IntegrityError: If the file does not match.
+        """
+        if expected is None:
+            return
+
+        reason = None
+        if expected.size is not None and size != expected.size:
+            reason = "expected {} bytes, got {}".format(expected.size, size)
+        elif digests_conflict(digest, expected.digest):
+            reason = "digest mismatch"
+
+        if reason is not None:
+            for output in outputs:
+                if output.is_file():
+                    output.unlink()
+            raise IntegrityError(remote_file.relative_path.as_posix(), reason)
+
+    def _fetch_file(
+        self,
+        remote_file: RemoteFile,
+        local_file: pathlib.Path,
+        expected: typing.Optional[ManifestEntry],
+        select: typing.Optional[typing.Callable[[str], bool]] = None,
+    ) -> typing.Tuple[
+        typing.Optional[typing.List[pathlib.Path]], int, typing.Optional[str]
+    ]:
+        """
+        Download a single remote file and apply the modifiers to it, computing its
+        checksum as it is downloaded.
+
+        Args:
+            remote_file: The file to download.
+            local_file: Local path of the file.
+            expected: Entry of the file in the manifest published by the remote,
+                if any.
+            select: Function indicating if a member (by name) of the file should be
+                extracted, or `None` to extract all the members.
+
+        Returns:
+            The files produced by the download (or `None` if unknown), the number
+            of bytes downloaded and the digest of the file (if computed).
+
+        Raises:
+            IntegrityError: If the downloaded file does not match `expected`.
+        """
+
+        # The algorithm of the published digest has precedence, if available:
+        algorithm = self._checksum
+        if expected is not None and expected.digest is not None:
+            if split_digest(expected.digest)[0] in ALGORITHMS:
+                algorithm = split_digest(expected.digest)[0]
+        hasher = None if algorithm is None else new_hasher(algorithm)
+
+        def digest() -> typing.Optional[str]:
+            return None if hasher is None else format_digest(algorithm, hasher)
+
+        os.makedirs(local_file.parent, exist_ok=True)
+
+        # Only the first modifier accepting the file is applied:
+        modifier = next((m for m in self.modifiers if m.accept(local_file)), None)
+        if modifier is not None and select is not None:
+            modifier = modifier.with_select(select)
+
+        # If the modifier can consume the file as it is downloaded, the file
+        # is never written to the disk (unless a previous download of the file
+        # can be resumed), the stream is hashed as it is consumed:
+        if (
+            modifier is not None
+            and modifier.accept_stream(local_file)
+            and remote_file.streamable
+            and PartFile(local_file).offset == 0
+        ):
+            with remote_file.open() as stream:
+                reader = HashingReader(stream, hasher)
+                outputs = modifier.apply_stream(reader, local_file)
+
+                # Consume trailing data (e.g., tar padding), some
+                # protocols require the transfer to be complete:
+                while reader.read(self._drain_size):
+                    pass
+            self._check_integrity(
+                remote_file, expected, reader.size, digest(), outputs or []
+            )
+            return outputs, reader.size, digest()
+
+        # Download the file:
+        remote_file.download(local_file, hasher)
+        size = local_file.stat().st_size
+        self._check_integrity(remote_file, expected, size, digest(), [local_file])
+
+        # Apply the modifier:
+        outputs: typing.Optional[typing.List[pathlib.Path]] = [local_file]
+        if modifier is not None:
+            outputs = modifier.apply(local_file)
+
+        return outputs, size, digest()
+
+    def _download_file(
+        self,
+        remote_file: RemoteFile,
+        local_path: pathlib.Path,
+        delta_source: typing.Optional[typing.Tuple[pathlib.Path, Manifest]] = None,
+        expected: typing.Optional[ManifestEntry] = None,
+        select: typing.Optional[typing.Callable[[str], bool]] = None,
+    ) -> typing.Tuple[pathlib.Path, ManifestEntry]:
+        """
+        Download a single remote file and apply the modifiers to it. A file that
+        does not match `expected` is downloaded again, at most `_integrity_retries`
+        times.
+
+        This method may be called concurrently from multiple threads.
+
+        Args:
+            remote_file: The file to download.
+            local_path: Local path to the dataset version folder.
+            delta_source: Folder and manifest of a local version to seed the file
+                from if it has not changed, if any.
+            expected: Entry of the file in the manifest published by the remote, if
+                any, used to check the downloaded file.
+            select: Function indicating if a member (by name) of the file should be
+                extracted, or `None` to extract all the members. The entry of a
+                file whose members are selected is partial.
+
+        Returns:
+            The local path of the downloaded file, and the manifest entry for
+            the file.
+
+        Raises:
+            IntegrityError: If the downloaded file never matches `expected`.
+        """
+
+        # The local file:
+        local_file = local_path.joinpath(remote_file.relative_path)
+        relative_path = remote_file.relative_path.as_posix()
+
+        # The signature is retrieved before the download, so that changes during
+        # the download are detected by the next synchronisation:
+        signature = remote_file.signature
+
+        # Expected size and digest of the file:
+        size, digest = remote_file.size, None
+        if expected is not None:
+            size = expected.size if expected.size is not None else size
+            digest = expected.digest
+
+        # Seed the file from another version if it has not changed:
+        if delta_source is not None:
+            seed = delta_source[1].unchanged_entry(relative_path, signature)
+            if seed is not None and digests_conflict(seed.digest, digest):
+                seed = None
+            if seed is not None and self._seed_files(delta_source[0], local_path, seed):
+                return local_file, ManifestEntry(
+                    relative_path, signature, seed.outputs, size, digest or seed.digest
+                )
+
+            # When revalidating, the previous outputs of the file are removed instead
+            # of being overwritten since they may be linked from other versions:
+            previous_entry = delta_source[1].get(relative_path)
+            if delta_source[0] == local_path and previous_entry is not None:
+                for output in previous_entry.outputs or {}:
+                    output_path = local_path.joinpath(output)
+                    if output_path.is_file():
+                        output_path.unlink()
+
+        for attempt in range(self._integrity_retries + 1):
+            try:
+                outputs, size, digest = self._fetch_file(
+                    remote_file, local_file, expected, select
+                )
+                break
+            except IntegrityError as e:
+                if attempt == self._integrity_retries:
+                    raise
+                logger.warning("{} Downloading the file again.".format(e))
+                PartFile(local_file).discard()
+
+        return local_file, ManifestEntry(
+            relative_path,
+            signature,
+            None
+            if outputs is None
+            else {
+                output.relative_to(local_path).as_posix(): output.stat().st_size
+                for output in outputs
+            },
+            size,
+            digest,
+            select is not None,
+        )
+
+    def _select_files(
+        self, files: typing.List[RemoteFile], selection: Selection
+    ) -> typing.Tuple[
+        typing.List[RemoteFile], typing.Dict[str, typing.Callable[[str], bool]]
+    ]:
+        """
+        Find the remote files to download for the given selection.
+
+        Files whose members are extracted (see `FileModifier.extracts_members`)
+        are downloaded if some of their members can be selected, and only these
+        members are extracted. Other modified files are downloaded if the file
+        they produce (e.g., the decompressed file) can be selected, see
+        `Selection.members`. Excluding a modified file by its own name excludes
+        its outputs.
+
+        Args:
+            files: The remote files of the version.
+            selection: The selection of the local files.
+
+        Returns:
+            The files to download, and the functions indicating the members to
+            extract from the files (by relative path) whose members are not all
+            selected.
+        """
+        selected: typing.List[RemoteFile] = []
+        selects: typing.Dict[str, typing.Callable[[str], bool]] = {}
+        for remote_file in files:
+            path = remote_file.relative_path
+            modifier = next((m for m in self.modifiers if m.accept(path)), None)
+            if modifier is None:
+                if selection.matches(path.as_posix()):
+                    selected.append(remote_file)
+                continue
+            members = selection.members(path.as_posix())
+            if members is None:
+                continue
+            if modifier.extracts_members(path):
+                if not members.everything:
+                    selects[path.as_posix()] = MemberSelector(
+                        members, path.parent.as_posix()
+                    )
+            elif not members.matches(path.with_suffix("").as_posix()):
+                continue
+            selected.append(remote_file)
+        return selected, selects
+
+    def _download_files(
+        self,
+        files: typing.List[RemoteFile],
+        local_path: pathlib.Path,
+        delta_source: typing.Optional[typing.Tuple[pathlib.Path, Manifest]] = None,
+        published: typing.Optional[Manifest] = None,
+        meta_path: typing.Optional[pathlib.Path] = None,
+        selects: typing.Mapping[str, typing.Callable[[str], bool]] = {},
+    ) -> Manifest:
+        """
+        Download the given files into the given local folder, using the executor
+        from `_make_executor`.
+
+        The `_before_downloads`, `_file_downloaded` and `_after_downloads` callbacks
+        are all called from the current thread. If a download fails, pending downloads
+        are cancelled and the exception is propagated once running downloads are
+        finished.
+
+        Args:
+            files: The files to download.
+            local_path: Local path to the dataset version folder.
+            delta_source: Folder and manifest of a local version to seed unchanged
+                files from, if any.
+            published: Manifest published by the remote, if any. The largest files
+                are downloaded first, and files are checked against it.
+            meta_path: Metadata folder of the version, if the progress of the
+                download should be saved (regularly, and if a download fails).
+            selects: Functions indicating the members to extract from the files
+                (by relative path) whose members are selected, see `_select_files`.
+
+        Returns:
+            The manifest of the downloaded files.
+        """
+
+        def expected(remote_file: RemoteFile) -> typing.Optional[ManifestEntry]:
+            if published is None:
+                return None
+            return published.get(remote_file.relative_path.as_posix())
+
+        # Start with the largest files so that the downloads end together:
+        if published is not None:
+            files = sorted(
+                files, key=lambda f: -((expected(f) or ManifestEntry("")).size or 0)
+            )
+
+        # The progress starts from the current content of the folder, if known:
+        progress = Manifest()
+        if delta_source is not None and delta_source[0] == local_path:
+            progress = Manifest(delta_source[1].entries)
+        last_save = time.monotonic()
+
+        manifest = Manifest()
+
+        self._before_downloads(files)
+
+        futures: typing.Dict[concurrent.futures.Future, RemoteFile] = {}
+        try:
+            with self._make_executor() as executor:
+                for remote_file in files:
+                    future = executor.submit(
+                        self._download_file,
+                        remote_file,
+                        local_path,
+                        delta_source,
+                        expected(remote_file),
+                        selects.get(remote_file.relative_path.as_posix()),
+                    )
+                    futures[future] = remote_file
+                try:
+                    for future in concurrent.futures.as_completed(futures):
+                        local_file, entry = future.result()
+                        manifest.add(entry)
+                        progress.add(entry)
+                        self._file_downloaded(futures[future], local_file)
+                        if (
+                            meta_path is not None
+                            and time.monotonic() - last_save > self._progress_interval
+                        ):
+                            progress.save(meta_path, progress=True)
+                            last_save = time.monotonic()
+                except BaseException:
+                    for future in futures:
+                        future.cancel()
+                    raise
+        except BaseException:
+            # Save the files downloaded so far, including the ones finished after
+            # the failure, so that the download can be resumed:
+            if meta_path is not None:
+                for future in futures:
+                    if (
+                        future.done()
+                        and not future.cancelled()
+                        and future.exception() is None
+                    ):
+                        progress.add(future.result()[1])
+                progress.save(meta_path, progress=True)
+            raise
+
+        self._after_downloads(local_path)
+
+        return manifest
+
+    def _report_changes(
+        self, name: str, version: str, previous: Manifest, manifest: Manifest
+    ):
+        """
+        Report the changes found when revalidating a local dataset version.
+
+        Args:
+            name: Name of the dataset.
+            version: Version of the dataset.
+            previous: Manifest of the version before the revalidation.
+            manifest: Manifest of the version after the revalidation.
+        """
+        added, modified, removed = previous.changes(manifest)
+        logger.info(
+            "Revalidated {}:{}: {} unchanged, {} modified, {} added, "
+            "{} removed.".format(
+                name,
+                version,
+                len(manifest.entries) - len(added) - len(modified),
+                len(modified),
+                len(added),
+                len(removed),
+            )
+        )
+        for label, relative_paths in (
+            ("Modified", modified),
+            ("Added", added),
+            ("Removed", removed),
+        ):
+            for relative_path in relative_paths:
+                logger.info("  {}: {}".format(label, relative_path))
+
+    def verify(self, name: str, version: str) -> typing.Optional[typing.List[str]]:
+        """
+        Check the local files of the given dataset version against its manifest,
+        without contacting the remote.
+
+        Args:
+            name: Name of the dataset.
+            version: Exact version of the dataset.
+
+        Returns:
+            The paths of the remote files whose local outputs are missing or do not
+            have the expected size, or `None` if the version has no manifest (e.g.,
+            it was not downloaded completely).
+        """
+        manifest = Manifest.load(self._make_meta_folder(name, version))
+        if manifest is None:
+            return None
+
+        local_path = self._make_folder(name, version)
+        with self._make_executor() as executor:
+            valid = executor.map(
+                lambda entry: entry.check_outputs(local_path), manifest.entries
+            )
+            return [
+                entry.relative_path
+                for entry, ok in zip(manifest.entries, valid)
+                if not ok
+            ]
+
     def get_folder(
         self,
         name: str,
         version: str = "latest",
         force_update: bool = False,
         returns_version: bool = False,
+        offline_first: typing.Optional[bool] = None,
+        selection: typing.Optional[Selection] = None,
+    ) -> typing.Union[pathlib.Path, typing.Tuple[pathlib.Path, str]]:
+        """
+        Retrieve the folder of the given dataset version, downloading it from
+        the remote if necessary.
+
+        If a selection is given, only the selected files are downloaded (and
+        extracted from the archives), and the version is marked as partial. A
+        partial version is topped up, without downloading its files again, when
+        files that it does not contain are requested.
+
+        When the local versions are managed as a cache, the returned version is
+        pinned until it is released (see `release` and `release_all`), the provider
+        is closed or the process exits, and the least used versions are removed if
+        the cache exceeds its maximum size.
+
+        Args:
+            name: Name of the dataset.
+            version: Version of the dataset.
+            force_update: Force the update of the local dataset if possible.
+            returns_version: Returns the actual version of the dataset.
+            offline_first: If `True`, an exact version (e.g., `"1.0.1"`) that is
+                complete locally is returned without contacting the remote. If
+                `None`, the `offline_first` option of this provider is used.
+            selection: Selection of the files to retrieve, or `None` to retrieve
+                the whole version.
+
+        Returns:
+            The path to the local dataset folder, and the actual version if
+            `returns_version` is `True`.
+
+        Raises:
+            DatasetNotFoundError: If the dataset was not found locally or remotely.
+            DatasetVersionNotFoundError: If the given version was not found.
+        """
+        path, exact_version = self._get_folder(  # type: ignore
+            name, version, force_update, True, offline_first, selection
+        )
+
+        if self._cache is not None:
+            # A version removed from the cache before being pinned is retrieved
+            # again:
+            self._cache.pin(name, exact_version)
+            if not path.exists():
+                path, exact_version = self._get_folder(  # type: ignore
+                    name, exact_version, False, True, offline_first, selection
+                )
+            self._cache.record_access(name, exact_version)
+            self._cache.evict(keep={(name, exact_version)})
+
+        if returns_version:
+            return path, exact_version
+        else:
+            return path
+
+    def release(self, name: str, version: str):
+        """
+        Release the given version retrieved with `get_folder`, when the local
+        versions are managed as a cache: the version is unpinned and may then be
+        removed from the cache. Versions are pinned once per provider, a version
+        retrieved several times is released by the first call.
+
+        Args:
+            name: Name of the dataset.
+            version: Exact version of the dataset (see `returns_version` of
+                `get_folder`).
+        """
+        if self._cache is not None:
+            self._cache.unpin(name, version)
+
+    def release_all(self):
+        """
+        Release all the versions retrieved with `get_folder`, when the local
+        versions are managed as a cache. Called when this provider is closed.
+        """
+        if self._cache is not None:
+            self._cache.unpin_all()
+
+    def _get_folder(
+        self,
+        name: str,
+        version: str,
+        force_update: bool,
+        returns_version: bool,
+        offline_first: typing.Optional[bool],
+        selection: typing.Optional[Selection] = None,
     ) -> typing.Union[pathlib.Path, typing.Tuple[pathlib.Path, str]]:
+        """
+        Retrieve the folder of the given dataset version, see `get_folder`.
+        """
+
+        if offline_first is None:
+            offline_first = self._offline_first
+
+        # Use the local version if it is complete, without contacting the remote:
+        if (
+            offline_first
+            and not force_update
+            and self.EXACT_VERSION_REGEX.fullmatch(version)
+            and Manifest.exists(self._make_meta_folder(name, version))
+            and self._covers(self._make_meta_folder(name, version), selection)
+        ):
+            local_exact_path = self._make_folder(name, version)
+            if returns_version:
+                return local_exact_path, version
+            else:
+                return local_exact_path
 
         # Find the local path (if any):
         local_path: typing.Optional[pathlib.Path] = None
@@ -337,7 +1950,9 @@ class RemoteProvider(LocalProvider):
         except DatasetNotFoundError:
             pass
         try:
-            remote_version = self._get_remote_version(name, version)
+            remote_version = self._get_remote_version(
+                name, version, use_cache=not force_update
+            )
         except DatasetNotFoundError as e:
 
             # Remote version not found, and there is no local path, we throw:
@@ -356,45 +1971,282 @@ class RemoteProvider(LocalProvider):
         # Create the local folder using the exact version:
         local_exact_path = self._make_folder(name, remote_version)
 
-        # If the local path is exact and a force update is not required,
-        # we simply return:
-        if local_path == local_exact_path and not force_update:
+        # If the local path is exact (and contains the selected files) and a force
+        # update is not required, we simply return:
+        meta_path = self._make_meta_folder(name, remote_version)
+        if (
+            local_path == local_exact_path
+            and not force_update
+            and self._covers(meta_path, selection)
+        ):
             if returns_version:
                 return local_exact_path, remote_version
             else:
                 return local_exact_path
 
-        if local_exact_path.exists():
-            shutil.rmtree(local_exact_path, ignore_errors=True)
-        local_exact_path.mkdir(parents=True, exist_ok=True)
+        # Wait for the catalogue refreshes, so that the remote is not accessed
+        # concurrently:
+        if self._catalogue_cache is not None:
+            self._catalogue_cache.wait()
 
-        # List the files in the remote folder:
-        files = self._list_remote_files(name, remote_version)
+        # A single process retrieves a version at once, the others wait for it and
+        # use the version it retrieved:
+        manifest_mtime = self._manifest_mtime(meta_path)
+        lock = self._make_lock(name, remote_version)
+        lock.acquire(self._lock_timeout, self._make_lock_reporter(name, remote_version))
+        try:
+            retrieved = (
+                local_exact_path.exists()
+                and Manifest.exists(meta_path)
+                and self._covers(meta_path, selection)
+                and (
+                    not force_update
+                    or self._manifest_mtime(meta_path) != manifest_mtime
+                )
+            )
+            if not retrieved:
+                self._download_version(name, remote_version, force_update, selection)
+        finally:
+            lock.release()
 
-        # Download all the files and apply the modifier:
-        self._before_downloads(files)
-        for remote_file in files:
+        if returns_version:
+            return local_exact_path, remote_version
+        else:
+            return local_exact_path
+
+    def _covers(
+        self, meta_path: pathlib.Path, selection: typing.Optional[Selection]
+    ) -> bool:
+        """
+        Check if the given local dataset version contains the given selection.
+
+        Args:
+            meta_path: The metadata folder of the version.
+            selection: The selection of the files, or `None` for the whole version.
 
-            # The local file:
-            local_file = local_exact_path.joinpath(remote_file.relative_path)
+        Returns:
+            `True` if the version is not partial, or if it is partial and contains
+            the selected files.
+        """
+        retrieved = Selection.load(meta_path)
+        return retrieved is None or (
+            selection is not None and retrieved.covers(selection)
+        )
 
-            os.makedirs(local_file.parent, exist_ok=True)
+    def _make_lock(self, name: str, version: str) -> FileLock:
+        """
+        Create the lock for the retrieval of the given dataset version. Lock files
+        are stored in the hidden `LOCK_FOLDER` of the root folder, and are never
+        removed.
 
-            # Download the file:
-            remote_file.download(local_file)
+        Args:
+            name: Name of the dataset.
+            version: Version of the dataset.
 
-            # Apply the modifiers:
-            for modifier in self.modifiers:
-                if modifier.accept(local_file):
-                    modifier.apply(local_file)
+        Returns:
+            The lock for the given dataset version (not acquired).
+        """
+        return FileLock(
+            self.root_folder.joinpath(self.LOCK_FOLDER, name, "{}.lock".format(version))
+        )
 
-            self._file_downloaded(remote_file, local_file)
-        self._after_downloads(local_exact_path)
+    def _manifest_mtime(self, meta_path: pathlib.Path) -> typing.Optional[int]:
+        """
+        Retrieve the modification time of the manifest in the given metadata
+        folder, to find if a version was retrieved by another process.
 
-        if returns_version:
-            return local_exact_path, remote_version
-        else:
-            return local_exact_path
+        Args:
+            meta_path: The metadata folder of a dataset version.
+
+        Returns:
+            The modification time of the manifest, in nanoseconds, or `None` if
+            there is no manifest.
+        """
+        try:
+            return meta_path.joinpath(Manifest.FILENAME).stat().st_mtime_ns
+        except OSError:
+            return None
+
+    def _make_lock_reporter(
+        self, name: str, version: str
+    ) -> typing.Callable[[float], None]:
+        """
+        Create a function that reports the progress of another process retrieving
+        the given dataset version, while waiting for it.
+
+        Args:
+            name: Name of the dataset.
+            version: Version of the dataset.
+
+        Returns:
+            A function to pass to `FileLock.acquire`.
+        """
+        meta_path = self._make_meta_folder(name, version)
+        last_report: typing.List[typing.Optional[float]] = [None]
+
+        def report(elapsed: float):
+            if (
+                last_report[0] is not None
+                and elapsed - last_report[0] < self._lock_report_interval
+            ):
+                return
+            last_report[0] = elapsed
+            progress = Manifest.load(meta_path, progress=True)
+            logger.info(
+                "Waiting for another process to retrieve {} {} ({} files "
+                "retrieved, waiting for {:.0f}s).".format(
+                    name,
+                    version,
+                    0 if progress is None else len(progress.entries),
+                    elapsed,
+                )
+            )
+
+        return report
+
+    def _download_version(
+        self,
+        name: str,
+        version: str,
+        force_update: bool,
+        selection: typing.Optional[Selection] = None,
+    ):
+        """
+        Download the given dataset version. A version that is not in the local
+        folder is downloaded in the hidden `STAGING_FOLDER` of the dataset, and
+        moved into place once complete. Existing versions (incomplete, partial or
+        revalidated) are updated in place.
+
+        This method must be called with the lock of the version held.
+
+        Args:
+            name: Name of the dataset.
+            version: Exact version of the dataset on the remote.
+            force_update: `True` if the update was required, in which case the
+                changes are reported.
+            selection: Selection of the files to download, or `None` to download
+                the whole version. The files of a partial version are kept, so the
+                selection is merged with the one of the version.
+        """
+        local_exact_path = self._make_folder(name, version)
+        meta_path = self._make_meta_folder(name, version)
+        local_path = local_exact_path
+        if not local_exact_path.exists():
+            local_path = self._make_staging_folder(name, version)
+
+        # A partial version is topped up with the selected files, a complete
+        # version stays complete:
+        retrieved = Selection.load(meta_path) if local_path.exists() else None
+        if selection is not None:
+            if retrieved is not None:
+                selection = retrieved.union(selection)
+            elif local_exact_path.exists() and not Manifest.in_progress(meta_path):
+                selection = None
+        if selection is not None and selection.everything:
+            selection = None
+
+        # Resume an interrupted download, top up a partial version, or revalidate
+        # the local version if possible, otherwise everything is downloaded again:
+        previous = None
+        if local_path.exists():
+            previous = Manifest.load(meta_path, progress=True)
+            if previous is None and (self._revalidate or retrieved is not None):
+                previous = Manifest.load(meta_path)
+            if previous is not None and previous.outputs() is None:
+                previous = None
+
+        # The version is marked as incomplete until all the files are downloaded:
+        (previous or Manifest()).save(meta_path, progress=True)
+        Manifest.remove(meta_path)
+        if local_path.exists() and previous is None:
+            self._clear_folder(local_path)
+        local_path.mkdir(parents=True, exist_ok=True)
+
+        # The selection is kept with the progress, so that it is merged with the
+        # next one if the download is interrupted:
+        if selection is not None:
+            selection.save(meta_path)
+
+        # List the files in the remote folder, only the selected files if possible:
+        files = self._list_remote_files(name, version, selection)
+
+        # Retrieve the manifest published by the remote, if any:
+        published = None
+        for remote_file in files:
+            if remote_file.relative_path.as_posix() == Manifest.REMOTE_FILENAME:
+                remote_file.download(meta_path.joinpath(Manifest.REMOTE_FILENAME))
+                published = Manifest.read(meta_path.joinpath(Manifest.REMOTE_FILENAME))
+                files = [f for f in files if f is not remote_file]
+                break
+
+        # Skip the files that are not selected:
+        selects: typing.Dict[str, typing.Callable[[str], bool]] = {}
+        if selection is not None:
+            files, selects = self._select_files(files, selection)
+
+        # Make room for the version in the cache, if its size is known:
+        if self._cache is not None and published is not None:
+            self._cache.evict(
+                sum(
+                    (
+                        published.get(f.relative_path.as_posix()) or ManifestEntry("")
+                    ).size
+                    or 0
+                    for f in files
+                ),
+                {(name, version)},
+            )
+
+        # Find the local version to seed unchanged files from:
+        delta_source = None
+        if previous is not None:
+            delta_source = (local_path, previous)
+        elif self._delta_sync is not None:
+            delta_source = self._find_delta_source(name, version)
+
+        # Download all the files and apply the modifier:
+        manifest = self._download_files(
+            files, local_path, delta_source, published, meta_path, selects
+        )
+
+        # Remove the files that are not produced by the remote files anymore:
+        if previous is not None:
+            outputs = manifest.outputs()
+            if outputs is not None:
+                self._clear_folder(
+                    local_path,
+                    {local_path.joinpath(output) for output in outputs},
+                )
+            if force_update:
+                self._report_changes(name, version, previous, manifest)
+
+        # Move the staged version into place:
+        if local_path != local_exact_path:
+            os.rename(local_path, local_exact_path)
+            if not any(local_path.parent.iterdir()):
+                local_path.parent.rmdir()
+
+        if selection is None:
+            Selection.remove(meta_path)
+        manifest.save(meta_path)
+        Manifest.remove(meta_path, progress=True)
+
+        # Share the files with the other versions, the files downloaded as they
+        # are whose SHA-256 digest is known are not hashed again:
+        if self._store is not None:
+            digests = {}
+            for entry in manifest.entries:
+                if entry.digest is None or entry.outputs != {
+                    entry.relative_path: entry.size
+                }:
+                    continue
+                algorithm, value = split_digest(entry.digest)
+                if algorithm == BlobStore.ALGORITHM:
+                    digests[entry.relative_path] = value
+            with self._make_executor() as executor:
+                self._store.add_folder(
+                    name, version, local_exact_path, executor, digests
+                )
 
 
 class RemoteSingleFileProvider(RemoteProvider):
@@ -419,6 +2271,7 @@ class RemoteSingleFileProvider(RemoteProvider):
         remote_url: str,
         name: str,
         version: str = "1.0.0",
+        max_workers: typing.Optional[int] = None,
     ):
         """
         Args:
@@ -426,8 +2279,9 @@ class RemoteSingleFileProvider(RemoteProvider):
             remote_url: Remote URL of the WebDAV server.
             name: Name of the dataset corresponding to the remote file.
             version: Version of the dataset corresponding to the remote file.
+            max_workers: Maximum number of files to download concurrently.
         """
-        super().__init__(root_folder, remote_url)
+        super().__init__(root_folder, remote_url, max_workers=max_workers)
 
         self._name = name
         self._version = version
@@ -0,0 +1,395 @@
+# -*- coding: utf-8 -*-
+# Copyright IRT Antoine de Saint Exupéry et Université Paul Sabatier Toulouse III - All
+# rights reserved. DEEL is a research program operated by IVADO, IRT Saint Exupéry,
+# CRIAQ and ANITI - https://www.deel.ai/
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import json
+import os
+import pathlib
+import posixpath
+import re
+import typing
+
+# A pattern split into components, `"**"` or the regex of a single component:
+_Parts = typing.Tuple[typing.Union[str, typing.Pattern], ...]
+
+# A rule of a selection, i.e., its include and exclude patterns:
+_Rule = typing.Tuple[typing.Tuple[str, ...], typing.Tuple[str, ...]]
+
+
+def _split_path(path: str) -> typing.List[str]:
+    return [name for name in path.split("/") if name and name != "."]
+
+
+def _translate(part: str) -> typing.Pattern:
+    """
+    Translate a component of a glob pattern into a regular expression. `*`
+    and `?` do not match `/`.
+    """
+    regex, i = "", 0
+    while i < len(part):
+        c = part[i]
+        if c == "*":
+            regex += "[^/]*"
+        elif c == "?":
+            regex += "[^/]"
+        elif c == "[" and part.find("]", i + 2) >= 0:
+            j = part.find("]", i + 2)
+            content = part[i + 1 : j].replace("\\", "\\\\")
+            if content.startswith("!"):
+                content = "^" + content[1:]
+            regex += "[" + content + "]"
+            i = j
+        else:
+            regex += re.escape(c)
+        i += 1
+    return re.compile(regex)
+
+
+def _compile(pattern: str) -> _Parts:
+    return tuple(
+        part if part == "**" else _translate(part) for part in _split_path(pattern)
+    )
+
+
+def _rebase(
+    patterns: typing.Tuple[str, ...], names: typing.List[str], folder: str
+) -> typing.Tuple[str, ...]:
+    """
+    Add to the given patterns those going through the given archive (e.g.,
+    `"data.tar.gz/test"`) rebased onto the folder of the archive (e.g.,
+    `"test"`), where its members are extracted.
+
+    Args:
+        patterns: The patterns, relative to the version folder.
+        names: The components of the path of the archive.
+        folder: Path of the folder of the archive, relative to the version folder.
+
+    Returns:
+        The patterns, with the rebased ones.
+    """
+    rebased = set(patterns)
+    for pattern in patterns:
+        parts = _split_path(pattern)
+        if len(parts) > len(names) and all(
+            part != "**" and _translate(part).fullmatch(name) is not None
+            for part, name in zip(parts, names)
+        ):
+            rebased.add("/".join(_split_path(folder) + parts[len(names) :]))
+    return tuple(sorted(rebased))
+
+
+def _match(parts: _Parts, names: typing.List[str], below: bool = False) -> bool:
+    """
+    Check if the given pattern matches the given path or one of its parents.
+
+    Args:
+        parts: The components of the pattern.
+        names: The components of the path.
+        below: If `True`, also check if the pattern can match a path inside the
+            given path.
+
+    Returns:
+        `True` if the pattern matches.
+    """
+    if not parts:
+        return True
+    if not names:
+        return below or all(part == "**" for part in parts)
+    if parts[0] == "**":
+        return _match(parts[1:], names, below) or _match(parts, names[1:], below)
+    return parts[0].fullmatch(names[0]) is not None and _match(  # type: ignore
+        parts[1:], names[1:], below
+    )
+
+
+class Selection(object):
+
+    """
+    A `Selection` is a subset of the files of a dataset version, selected by
+    glob patterns on their paths relative to the version folder.
+
+    `*` and `?` match inside a single component of a path, and `**` matches any
+    number of components. A pattern matching a folder matches all the files in
+    the folder, e.g., `"test"` selects `"test/images/0001.png"`.
+
+    A file is selected if it matches one of the include patterns (or if there is
+    no include pattern) and none of the exclude patterns. Selections can be merged
+    (see `union`), a file is then selected if it is selected by one of the merged
+    selections.
+    """
+
+    # Name of the file marking a version as partial in its metadata folder:
+    FILENAME: str = "selection.json"
+
+    # Include and exclude patterns of the merged selections:
+    _rules: typing.Tuple[_Rule, ...]
+
+    # Compiled patterns of the rules:
+    _compiled: typing.List[typing.Tuple[typing.List[_Parts], typing.List[_Parts]]]
+
+    def __init__(
+        self,
+        include: typing.Union[None, str, typing.Iterable[str]] = None,
+        exclude: typing.Union[None, str, typing.Iterable[str]] = None,
+    ):
+        """
+        Args:
+            include: Patterns of the files to select, or `None` to select all the
+                files that are not excluded.
+            exclude: Patterns of the files to not select.
+        """
+
+        def normalize(patterns) -> typing.Tuple[str, ...]:
+            if patterns is None:
+                return ()
+            if isinstance(patterns, str):
+                patterns = [patterns]
+            return tuple(sorted({"/".join(_split_path(p)) for p in patterns}))
+
+        self._set_rules(((normalize(include), normalize(exclude)),))
+
+    def _set_rules(self, rules: typing.Iterable[_Rule]):
+        self._rules = tuple(sorted(set(rules)))
+        self._compiled = [
+            ([_compile(p) for p in include], [_compile(p) for p in exclude])
+            for include, exclude in self._rules
+        ]
+
+    @classmethod
+    def _from_rules(cls, rules: typing.Iterable[_Rule]) -> "Selection":
+        selection = cls.__new__(cls)
+        selection._set_rules(rules)
+        return selection
+
+    @property
+    def rules(self) -> typing.Tuple[_Rule, ...]:
+        """
+        Returns: The include and exclude patterns of the merged selections.
+        """
+        return self._rules
+
+    @property
+    def everything(self) -> bool:
+        """
+        Returns: `True` if this selection selects all the files.
+        """
+        return ((), ()) in self._rules
+
+    def matches(self, path: str) -> bool:
+        """
+        Check if the given file is selected.
+
+        Args:
+            path: Path of the file, relative to the version folder.
+
+        Returns:
+            `True` if the file is selected.
+        """
+        names = _split_path(path)
+        return any(
+            (not include or any(_match(p, names) for p in include))
+            and not any(_match(p, names) for p in exclude)
+            for include, exclude in self._compiled
+        )
+
+    def may_contain(self, folder: str) -> bool:
+        """
+        Check if files in the given folder can be selected, e.g., to avoid listing
+        the folder.
+
+        Args:
+            folder: Path of the folder, relative to the version folder.
+
+        Returns:
+            `False` if no file in the folder is selected, `True` otherwise.
+        """
+        names = _split_path(folder)
+        return any(
+            (not include or any(_match(p, names, below=True) for p in include))
+            and not any(_match(p, names) for p in exclude)
+            for include, exclude in self._compiled
+        )
+
+    def members(self, archive: str) -> typing.Optional["Selection"]:
+        """
+        Find the selection of the members of the given archive, whose members are
+        extracted next to it. The archive itself may be selected, in which case
+        all its members are, except the excluded ones. Patterns going through the
+        archive (e.g., `"data.tar.gz/test"`) apply to its members.
+
+        Args:
+            archive: Path of the archive, relative to the version folder.
+
+        Returns:
+            The selection of the members (by their path relative to the version
+            folder), or `None` if no member can be selected.
+        """
+        names = _split_path(archive)
+        folder = posixpath.dirname(archive)
+        rules: typing.List[_Rule] = []
+        for rule, (include, exclude) in zip(self._rules, self._compiled):
+            if any(_match(p, names) for p in exclude):
+                continue
+            excluded = _rebase(rule[1], names, folder)
+            if include and not any(_match(p, names) for p in include):
+                if Selection._from_rules([rule]).may_contain(folder):
+                    rules.append((_rebase(rule[0], names, folder), excluded))
+            else:
+                rules.append(((), excluded))
+        if not rules:
+            return None
+        return Selection._from_rules(rules)
+
+    def union(self, other: "Selection") -> "Selection":
+        """
+        Merge this selection with another one.
+
+        Args:
+            other: The selection to merge with this one.
+
+        Returns:
+            A selection of the files selected by either selection.
+        """
+        if self.everything or other.everything:
+            return Selection()
+        return Selection._from_rules(self._rules + other._rules)
+
+    def covers(self, other: "Selection") -> bool:
+        """
+        Check if all the files selected by another selection are selected by this
+        one. Only merged selections are compared, not the patterns themselves.
+
+        Args:
+            other: The other selection.
+
+        Returns:
+            `True` if this selection covers `other`.
+        """
+        return self.everything or set(other._rules) <= set(self._rules)
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Selection) and self._rules == other._rules
+
+    def __hash__(self) -> int:
+        return hash(self._rules)
+
+    def __repr__(self) -> str:
+        return "Selection({})".format(
+            ", ".join(
+                "include={}, exclude={}".format(list(include), list(exclude))
+                for include, exclude in self._rules
+            )
+        )
+
+    def __getstate__(self) -> typing.Tuple[_Rule, ...]:
+        return self._rules
+
+    def __setstate__(self, rules: typing.Tuple[_Rule, ...]):
+        self._set_rules(rules)
+
+    @classmethod
+    def load(cls, folder: pathlib.Path) -> typing.Optional["Selection"]:
+        """
+        Load the selection stored in the given metadata folder.
+
+        Args:
+            folder: The metadata folder of a dataset version.
+
+        Returns:
+            The selection of the version, or `None` if the version is not partial
+            (or if the selection is not valid).
+        """
+        try:
+            with open(folder.joinpath(cls.FILENAME), "r") as fp:
+                data = json.load(fp)
+            return cls._from_rules(
+                (tuple(rule["include"]), tuple(rule["exclude"]))
+                for rule in data["rules"]
+            )
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def save(self, folder: pathlib.Path):
+        """
+        Save this selection in the given metadata folder, marking the version as
+        partial.
+
+        Args:
+            folder: The metadata folder of a dataset version.
+        """
+        folder.mkdir(parents=True, exist_ok=True)
+        path = folder.joinpath(self.FILENAME)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w") as fp:
+            json.dump(
+                {
+                    "rules": [
+                        {"include": list(include), "exclude": list(exclude)}
+                        for include, exclude in self._rules
+                    ]
+                },
+                fp,
+            )
+        os.replace(tmp, path)
+
+    @classmethod
+    def remove(cls, folder: pathlib.Path):
+        """
+        Remove the selection in the given metadata folder, if any, marking the
+        version as complete.
+
+        Args:
+            folder: The metadata folder of a dataset version.
+        """
+        path = folder.joinpath(cls.FILENAME)
+        if path.exists():
+            path.unlink()
+
+
+class MemberSelector(object):
+
+    """
+    Function indicating if a member (by name) of an archive should be extracted,
+    according to a `Selection`. Members are extracted next to the archive, so
+    their names are relative to the folder of the archive.
+
+    Selectors can be pickled, e.g., to be used by an `ExtractionScheduler`.
+    """
+
+    # Selection of the members, by their path relative to the version folder:
+    _selection: Selection
+
+    # Path of the folder of the archive, relative to the version folder:
+    _folder: str
+
+    def __init__(self, selection: Selection, folder: str):
+        """
+        Args:
+            selection: Selection of the members, by their path relative to the
+                version folder.
+            folder: Path of the folder of the archive, relative to the version
+                folder.
+        """
+        self._selection = selection
+        self._folder = folder
+
+    def __call__(self, name: str) -> bool:
+        return self._selection.matches(posixpath.join(self._folder, name))
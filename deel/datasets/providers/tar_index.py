@@ -0,0 +1,465 @@
+# -*- coding: utf-8 -*-
+# Copyright IRT Antoine de Saint Exupéry et Université Paul Sabatier Toulouse III - All
+# rights reserved. DEEL is a research program operated by IVADO, IRT Saint Exupéry,
+# CRIAQ and ANITI - https://www.deel.ai/
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import bisect
+import io
+import os
+import pathlib
+import struct
+import tarfile
+import typing
+import zlib
+
+# Size of the reads of compressed archives, in bytes:
+_READ_SIZE: int = 1 << 16
+
+
+class TarMember(typing.NamedTuple):
+
+    """
+    Member of a tar archive, with its offsets in the uncompressed archive.
+    """
+
+    # Name of the member:
+    name: str
+
+    # Offset of the header of the member:
+    header_offset: int
+
+    # Offset of the content of the member:
+    data_offset: int
+
+    # Size of the content of the member:
+    size: int
+
+
+class GzipBlockReader(io.RawIOBase):
+
+    """
+    Read-only stream decompressing a gzip file made of one or more gzip members
+    (blocks), which records the offsets of the blocks in the compressed and
+    uncompressed files. Reading can start at the beginning of any block.
+    """
+
+    # The compressed file:
+    _fp: typing.BinaryIO
+
+    # Decompressor of the current block, `None` between blocks:
+    _decompressor: typing.Optional[typing.Any]
+
+    # Compressed data read but not consumed yet:
+    _input: bytes
+
+    # Offsets of the unconsumed input in the compressed file, and of the next
+    # decompressed byte in the uncompressed file:
+    _compressed_offset: int
+    _uncompressed_offset: int
+
+    # Uncompressed and compressed offsets of the blocks read:
+    blocks: typing.List[typing.Tuple[int, int]]
+
+    def __init__(
+        self,
+        fp: typing.BinaryIO,
+        compressed_offset: int = 0,
+        uncompressed_offset: int = 0,
+    ):
+        """
+        Args:
+            fp: The compressed file, positioned at the beginning of a block.
+            compressed_offset: Offset of the block in the compressed file.
+            uncompressed_offset: Offset of the block in the uncompressed file.
+        """
+        super().__init__()
+        self._fp = fp
+        self._decompressor = None
+        self._input = b""
+        self._compressed_offset = compressed_offset
+        self._uncompressed_offset = uncompressed_offset
+        self.blocks = []
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while True:
+            if not self._input:
+                self._input = self._fp.read(_READ_SIZE)
+                if not self._input:
+                    if self._decompressor is not None:
+                        raise EOFError(
+                            "Compressed file ended before the end of a block."
+                        )
+                    return 0
+
+            if self._decompressor is None:
+                # Trailing zeros after the last block are ignored:
+                if not self._input.strip(b"\0"):
+                    self._compressed_offset += len(self._input)
+                    self._input = b""
+                    continue
+                self.blocks.append((self._uncompressed_offset, self._compressed_offset))
+                self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+            decompressor = self._decompressor
+            data = decompressor.decompress(self._input, len(buffer))
+            remaining = decompressor.unconsumed_tail or decompressor.unused_data
+            self._compressed_offset += len(self._input) - len(remaining)
+            self._input = remaining
+            if decompressor.eof:
+                self._decompressor = None
+            if data:
+                memoryview(buffer).cast("B")[: len(data)] = data
+                self._uncompressed_offset += len(data)
+                return len(data)
+
+    def read_exactly(self, size: int) -> bytes:
+        """
+        Read exactly the given number of bytes.
+
+        Raises:
+            EOFError: If the file ends before.
+        """
+        buffer = bytearray(size)
+        view = memoryview(buffer)
+        count = 0
+        while count < size:
+            read = self.readinto(view[count:])
+            if not read:
+                raise EOFError("Compressed file ended before the end of a member.")
+            count += read
+        return bytes(buffer)
+
+
+def is_block_compressed(archive: pathlib.Path) -> bool:
+    """
+    Check if the given file is a block-compressed gzip file (BGZF, as produced
+    by `bgzip`), whose blocks are small gzip members. Only the header of the first
+    block is read.
+
+    Args:
+        archive: Path to the file.
+
+    Returns:
+        `True` if the file is a BGZF file.
+    """
+    with open(archive, "rb") as fp:
+        header = fp.read(18)
+    # Gzip header with extra field (FEXTRA) containing a "BC" subfield:
+    return (
+        len(header) == 18
+        and header[:4] == b"\x1f\x8b\x08\x04"
+        and header[12:14] == b"BC"
+        and header[14:16] == b"\x02\x00"
+    )
+
+
+def scan_members(
+    tp: tarfile.TarFile,
+    path: typing.Optional[pathlib.Path] = None,
+    select: typing.Optional[typing.Callable[[str], bool]] = None,
+) -> typing.Tuple[typing.List[TarMember], typing.List[pathlib.Path]]:
+    """
+    Iterate over the members of the given archive, in a single pass, checking
+    that they stay inside the folder of the archive, recording the offsets of
+    the regular files and extracting the selected members.
+
+    This also works for archives opened in stream mode.
+
+    Args:
+        tp: The archive.
+        path: The folder where the members should be extracted, or `None` to
+            not extract members.
+        select: Function indicating if a member (by name) should be extracted,
+            or `None` to extract all the members.
+
+    Returns:
+        The regular files of the archive, and the paths of the extracted members
+        except directories, under `path`.
+
+    Raises:
+        Exception: If a member would be extracted outside of `path`.
+    """
+    root = os.path.abspath(path if path is not None else os.curdir)
+    members: typing.List[TarMember] = []
+    outputs: typing.List[pathlib.Path] = []
+    for member in tp:
+        member_path = os.path.abspath(os.path.join(root, member.name))
+        if os.path.commonpath([root, member_path]) != root:
+            raise Exception("Attempted Path Traversal in Tar File")
+        if member.isreg() and not member.issparse():
+            members.append(
+                TarMember(member.name, member.offset, member.offset_data, member.size)
+            )
+        if path is None or (select is not None and not select(member.name)):
+            continue
+        tp.extract(member, root)
+        if not member.isdir():
+            # The outputs are under the given path, even if it is relative:
+            outputs.append(pathlib.Path(path, os.path.relpath(member_path, root)))
+    return members, outputs
+
+
+class TarIndex(object):
+
+    """
+    Index of the members of a tar archive, uncompressed or block-compressed (see
+    `is_block_compressed`), recording the name, header offset, data offset and
+    size of each regular file, so that a member can be read with a single seek
+    (and the decompression of a single block for block-compressed archives).
+
+    The index is saved in a compact binary file.
+    """
+
+    # Magic number of the index files:
+    MAGIC: bytes = b"DTARIDX1"
+
+    # Formats of the header, the blocks and the members in the index files:
+    _HEADER: struct.Struct = struct.Struct("<8sQBII")
+    _BLOCK: struct.Struct = struct.Struct("<QQ")
+    _MEMBER: struct.Struct = struct.Struct("<QQQH")
+
+    # Size of the indexed archive, used to detect outdated indexes:
+    _archive_size: int
+
+    # Regular files of the archive:
+    _entries: typing.List[TarMember]
+
+    # Uncompressed and compressed offsets of the blocks, `None` if the archive is
+    # not compressed:
+    _blocks: typing.Optional[typing.List[typing.Tuple[int, int]]]
+
+    # Data offset and size of the members, by name:
+    _members: typing.Dict[str, typing.Tuple[int, int]]
+
+    def __init__(
+        self,
+        archive_size: int,
+        entries: typing.List[TarMember],
+        blocks: typing.Optional[typing.List[typing.Tuple[int, int]]] = None,
+    ):
+        """
+        Args:
+            archive_size: Size of the indexed archive, in bytes.
+            entries: Regular files of the archive.
+            blocks: Uncompressed and compressed offsets of the blocks of a
+                block-compressed archive, or `None` if the archive is not
+                compressed.
+        """
+        self._archive_size = archive_size
+        self._entries = entries
+        self._blocks = blocks
+        self._members = {
+            entry.name: (entry.data_offset, entry.size) for entry in entries
+        }
+
+    @property
+    def format(self) -> str:
+        """
+        Returns: The format of the archive (`"tar"`).
+        """
+        return "tar"
+
+    @property
+    def compressed(self) -> bool:
+        """
+        Returns: `True` if the archive is block-compressed.
+        """
+        return self._blocks is not None
+
+    @property
+    def entries(self) -> typing.List[TarMember]:
+        """
+        Returns: The regular files of the archive.
+        """
+        return self._entries
+
+    @property
+    def members(self) -> typing.Dict[str, typing.Tuple[int, int]]:
+        """
+        Returns: The data offset and size of the members, by name.
+        """
+        return self._members
+
+    @staticmethod
+    def build(archive: pathlib.Path) -> "TarIndex":
+        """
+        Build the index of the given archive, in a single pass. Only the headers
+        of uncompressed archives are read.
+
+        Args:
+            archive: Path to the archive, uncompressed or block-compressed.
+
+        Returns:
+            The index of the archive.
+
+        Raises:
+            Exception: If a member would be outside of the folder of the archive.
+        """
+        compressed = is_block_compressed(archive)
+        with open(archive, "rb") as fp:
+            if compressed:
+                reader = GzipBlockReader(fp)  # type: ignore
+                with tarfile.open(fileobj=reader, mode="r|") as tp:
+                    entries, _ = scan_members(tp)
+                    # Consume the end of the archive to record all the blocks:
+                    while reader.read(_READ_SIZE):
+                        pass
+            else:
+                with tarfile.open(fileobj=fp, mode="r:") as tp:
+                    entries, _ = scan_members(tp)
+
+        return TarIndex(
+            archive.stat().st_size, entries, reader.blocks if compressed else None
+        )
+
+    @staticmethod
+    def load(path: pathlib.Path, archive: pathlib.Path) -> typing.Optional["TarIndex"]:
+        """
+        Load the index of the given archive from the given file.
+
+        Args:
+            path: Path to the index file.
+            archive: Path to the archive.
+
+        Returns:
+            The index of the archive, or `None` if the index does not exist, is
+            invalid or is outdated.
+        """
+        try:
+            data = path.read_bytes()
+            (
+                magic,
+                archive_size,
+                compressed,
+                n_blocks,
+                n_members,
+            ) = TarIndex._HEADER.unpack_from(data)
+            if magic != TarIndex.MAGIC or archive_size != archive.stat().st_size:
+                return None
+            offset = TarIndex._HEADER.size
+            blocks = None
+            if compressed:
+                end = offset + n_blocks * TarIndex._BLOCK.size
+                blocks = list(TarIndex._BLOCK.iter_unpack(data[offset:end]))
+                offset = end
+            entries = []
+            for _ in range(n_members):
+                header_offset, data_offset, size, length = TarIndex._MEMBER.unpack_from(
+                    data, offset
+                )
+                offset += TarIndex._MEMBER.size
+                name = data[offset : offset + length].decode("utf-8")
+                offset += length
+                entries.append(TarMember(name, header_offset, data_offset, size))
+            return TarIndex(archive_size, entries, blocks)
+        except (OSError, ValueError, struct.error):
+            return None
+
+    def save(self, path: pathlib.Path) -> pathlib.Path:
+        """
+        Save this index to the given file.
+
+        Args:
+            path: Path to the index file.
+
+        Returns:
+            The path to the index file.
+        """
+        blocks = self._blocks or []
+        parts = [
+            self._HEADER.pack(
+                self.MAGIC,
+                self._archive_size,
+                self._blocks is not None,
+                len(blocks),
+                len(self._entries),
+            )
+        ]
+        parts.extend(self._BLOCK.pack(*block) for block in blocks)
+        for entry in self._entries:
+            name = entry.name.encode("utf-8")
+            parts.append(
+                self._MEMBER.pack(
+                    entry.header_offset, entry.data_offset, entry.size, len(name)
+                )
+            )
+            parts.append(name)
+
+        tmp = path.with_name("{}.{}.tmp".format(path.name, os.getpid()))
+        with open(tmp, "wb") as fp:
+            fp.write(b"".join(parts))
+        os.replace(tmp, path)
+        return path
+
+    def read(self, fp: typing.BinaryIO, name: str) -> bytes:
+        """
+        Read the content of the given member.
+
+        Args:
+            fp: The archive, opened in binary mode.
+            name: Name of the member.
+
+        Returns:
+            The content of the member.
+
+        Raises:
+            KeyError: If the member is not in the archive.
+        """
+        offset, size = self._members[name]
+        if self._blocks is None:
+            fp.seek(offset)
+            return fp.read(size)
+
+        # Decompress from the block containing the beginning of the member:
+        index = bisect.bisect_right(self._blocks, (offset, float("inf"))) - 1
+        uncompressed_offset, compressed_offset = self._blocks[index]
+        fp.seek(compressed_offset)
+        reader = GzipBlockReader(fp, compressed_offset, uncompressed_offset)
+        reader.read_exactly(offset - uncompressed_offset)
+        return reader.read_exactly(size)
+
+    def extract(
+        self, archive: pathlib.Path, names: typing.Iterable[str], path: pathlib.Path
+    ) -> typing.List[pathlib.Path]:
+        """
+        Extract the given members of the given archive, reading only these members.
+
+        Args:
+            archive: Path to the archive.
+            names: Names of the members to extract.
+            path: The folder where the members should be extracted.
+
+        Returns:
+            The paths of the extracted members.
+
+        Raises:
+            KeyError: If a member is not in the archive.
+        """
+        outputs = []
+        with open(archive, "rb") as fp:
+            for name in names:
+                output = path.joinpath(name)
+                output.parent.mkdir(parents=True, exist_ok=True)
+                output.write_bytes(self.read(fp, name))  # type: ignore
+                outputs.append(output)
+        return outputs
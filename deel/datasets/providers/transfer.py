@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+# Copyright IRT Antoine de Saint Exupéry et Université Paul Sabatier Toulouse III - All
+# rights reserved. DEEL is a research program operated by IVADO, IRT Saint Exupéry,
+# CRIAQ and ANITI - https://www.deel.ai/
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+import os
+import pathlib
+import threading
+import time
+import typing
+
+from tqdm import tqdm
+
+# Size of the first read of a transfer, in bytes:
+MIN_CHUNK_SIZE: int = 1 << 16
+
+# Maximum size of the reads of a transfer, in bytes:
+MAX_CHUNK_SIZE: int = 1 << 22
+
+# Maximum size of a single zero-copy call, in bytes:
+_MAX_ZERO_COPY_SIZE: int = 1 << 30
+
+# Minimum interval between two refreshes of a progress bar, in seconds:
+PROGRESS_INTERVAL: float = 0.1
+
+
+class Progress(object):
+
+    """
+    Progress bar for transfers. The bar is only refreshed every `PROGRESS_INTERVAL`
+    seconds, so that updating it for each chunk is cheap. Updates can come from
+    multiple threads.
+    """
+
+    # The progress bar:
+    _pbar: tqdm
+
+    # Number of bytes not reported to the progress bar yet:
+    _pending: int
+
+    # Time of the last refresh of the progress bar:
+    _last_refresh: float
+
+    _lock: threading.Lock
+
+    def __init__(self, total: typing.Optional[int], desc: str, initial: int = 0):
+        """
+        Args:
+            total: Total number of bytes to transfer, if known.
+            desc: Description of the progress bar.
+            initial: Number of bytes already transferred.
+        """
+        self._pbar = tqdm(
+            total=total,
+            initial=initial,
+            desc=desc,
+            unit="bytes",
+            unit_scale=True,
+            unit_divisor=1024,
+        )
+        self._pending = 0
+        self._last_refresh = time.monotonic()
+        self._lock = threading.Lock()
+
+    def update(self, size: int):
+        """
+        Report that the given number of bytes have been transferred.
+
+        Args:
+            size: Number of bytes transferred.
+        """
+        with self._lock:
+            self._pending += size
+            now = time.monotonic()
+            if now - self._last_refresh >= PROGRESS_INTERVAL:
+                self._pbar.update(self._pending)
+                self._pending = 0
+                self._last_refresh = now
+
+    def close(self):
+        with self._lock:
+            self._pbar.update(self._pending)
+            self._pending = 0
+        self._pbar.close()
+
+    def __enter__(self) -> "Progress":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def iter_chunks(stream: typing.BinaryIO) -> typing.Iterator[memoryview]:
+    """
+    Read the given stream by chunks, into a single reusable buffer. The size of
+    the reads starts at `MIN_CHUNK_SIZE` and is doubled each time a read fills
+    it, up to `MAX_CHUNK_SIZE`, so that fast streams are read with few calls.
+
+    Each chunk is a view on the buffer and is only valid until the next one is
+    requested.
+
+    Args:
+        stream: The stream to read.
+
+    Returns:
+        An iterator over the chunks of the stream.
+    """
+    size = MIN_CHUNK_SIZE
+
+    # Streams without readinto are read into new bytes objects:
+    if not hasattr(stream, "readinto"):
+        while True:
+            data = stream.read(size)
+            if not data:
+                return
+            yield memoryview(data)
+            if len(data) == size:
+                size = min(2 * size, MAX_CHUNK_SIZE)
+
+    buffer = memoryview(bytearray(MAX_CHUNK_SIZE))
+    while True:
+        count = stream.readinto(buffer[:size])  # type: ignore
+        if not count:
+            return
+        yield buffer[:count]
+        if count == size:
+            size = min(2 * size, MAX_CHUNK_SIZE)
+
+
+def copy_stream(
+    source: typing.BinaryIO,
+    target: typing.BinaryIO,
+    progress: typing.Optional[Progress] = None,
+) -> int:
+    """
+    Copy the content of the given source stream to the given target stream,
+    see `iter_chunks`.
+
+    Args:
+        source: The stream to read.
+        target: The stream to write.
+        progress: Progress bar to update, if any.
+
+    Returns:
+        The number of bytes copied.
+    """
+    copied = 0
+    for chunk in iter_chunks(source):
+        target.write(chunk)
+        copied += len(chunk)
+        if progress is not None:
+            progress.update(len(chunk))
+    return copied
+
+
+def copy_file(
+    source: pathlib.Path,
+    target: pathlib.Path,
+    progress: typing.Optional[Progress] = None,
+):
+    """
+    Copy the given source file to the given target file, without copying the
+    content through user space when possible (`copy_file_range`, which can
+    also clone the file or copy it server-side on some filesystems, or
+    `sendfile`).
+
+    Args:
+        source: The file to copy.
+        target: The destination file, overwritten if it exists.
+        progress: Progress bar to update, if any.
+    """
+    with open(source, "rb") as sp, open(target, "wb") as tp:
+        size = os.fstat(sp.fileno()).st_size
+        offset = 0
+        for name in ("copy_file_range", "sendfile"):
+            if not hasattr(os, name):
+                continue
+            try:
+                while offset < size:
+                    count = min(size - offset, _MAX_ZERO_COPY_SIZE)
+                    if name == "copy_file_range":
+                        count = os.copy_file_range(  # type: ignore
+                            sp.fileno(), tp.fileno(), count
+                        )
+                    else:
+                        count = os.sendfile(tp.fileno(), sp.fileno(), offset, count)
+                        os.lseek(sp.fileno(), offset + count, os.SEEK_SET)
+                    if count == 0:
+                        break
+                    offset += count
+                    if progress is not None:
+                        progress.update(count)
+            except OSError:
+                # Not supported for these files, continue from the current offset
+                # with the next method:
+                sp.seek(offset)
+                tp.seek(offset)
+                continue
+            if offset >= size:
+                return
+
+            # The copy stopped before the expected size (e.g., the file was
+            # truncated, or the filesystem copies nothing), the remaining content
+            # is copied through user space:
+            sp.seek(offset)
+            tp.seek(offset)
+            break
+
+        # Copy through user space:
+        copy_stream(sp, tp, progress)  # type: ignore
@@ -21,20 +21,35 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 import abc
+import contextlib
 import os
 import pathlib
+import posixpath
 import re
 import typing
+import urllib.parse
 
-from tqdm import tqdm
+import requests
 from webdav3.client import Client
+from webdav3.client import WebDavXmlUtils
+from webdav3.exceptions import ConnectionException
+from webdav3.exceptions import NoConnection
+from webdav3.exceptions import RemoteResourceNotFound
+from webdav3.exceptions import ResponseErrorCode
 from webdav3.exceptions import WebDavException
 from webdav3.urn import Urn
 
 from . import logger
+from .checksum import Hasher
 from .exceptions import DatasetNotFoundError
+from .http_providers import validator_from_headers
+from .remote_provider import PartFile
+from .remote_provider import ProgressReader
 from .remote_provider import RemoteFile
 from .remote_provider import RemoteProvider
+from .selection import Selection
+from .transfer import copy_stream
+from .transfer import Progress
 
 
 class WebDavAuthenticator(abc.ABC):
@@ -98,45 +113,126 @@ class WebDavRemoteFile(RemoteFile):
     # Path to the file (relative to the dataset):
     _file_path: str
 
-    def __init__(self, client: Client, dataset_path: str, file_path: str):
+    # Information about the file (if retrieved), see `webdav3.client.Client.info`:
+    _file_info: typing.Optional[typing.Dict[str, typing.Optional[str]]]
+
+    def __init__(
+        self,
+        client: Client,
+        dataset_path: str,
+        file_path: str,
+        file_info: typing.Optional[typing.Dict[str, typing.Optional[str]]] = None,
+    ):
         """
         Args:
             client: The WebDAV client (used for download).
             dataset_path: Path to the dataset, relative the root of the server.
             file_path: Path to the file of the dataset, relative to the dataset path.
+            file_info: Information about the file if already known (e.g., from
+                the listing of the dataset), see `webdav3.client.Client.info`.
         """
         self._client = client
         self._dataset_path = dataset_path.rstrip("/")
         self._file_path = file_path.strip("/")
+        self._file_info = file_info
+
+    def _info(self) -> typing.Dict[str, typing.Optional[str]]:
+        """
+        Retrieve information about the file, the information are cached.
+
+        Returns:
+            The information about the file, see `webdav3.client.Client.info`.
+        """
+        if self._file_info is None:
+            self._file_info = self._client.info(
+                "{}/{}".format(self._dataset_path, self._file_path)
+            )
+        return self._file_info  # type: ignore
 
-    def download(self, local_file: pathlib.Path):
+    def download(
+        self, local_file: pathlib.Path, hasher: typing.Optional[Hasher] = None
+    ):
 
         remote_file = "{}/{}".format(self._dataset_path, self._file_path)
 
         # Retrieve information (size) of the file:
-        file_info = self._client.info(remote_file)
-        file_size = int(file_info["size"])
+        file_size = self.size
 
         # The code below is taken from webdav3.Client.download_file, and is adapted
-        # for progress.
+        # for progress and to resume previous downloads.
         urn = Urn(remote_file)
 
+        part = PartFile(local_file)
+        offset = part.offset
+        headers = []
+        if 0 < offset < file_size:
+            headers = [
+                "Range: bytes={}-".format(offset),
+                "If-Range: {}".format(part.validator),
+            ]
+        else:
+            offset = 0
+
         logger.info("Downloading {}... ".format(local_file))
-        with open(local_file, "wb") as fp:
-            response = self._client.execute_request("download", urn.quote())
+        response = self._client.execute_request(
+            "download", urn.quote(), headers_ext=headers
+        )
+
+        # The server sends the whole file if the content has changed:
+        if response.status_code != 206:
+            offset = 0
+
+        with part.open(offset, validator_from_headers(response.headers), hasher) as fp:
+
+            # The raw response is read directly (instead of using iter_content) to
+            # use large buffers, the content is still decoded if it was encoded:
+            response.raw.decode_content = True
 
             # TODO: Remove logging if logger is disabled:
-            pbar = tqdm(
-                total=file_size,
-                desc=local_file.parts[-1],
-                unit="bytes",
-                unit_scale=True,
-                unit_divisor=1024,
-            )
-            for block in response.iter_content(1024):
-                fp.write(block)
-                pbar.update(len(block))
-            pbar.close()
+            with Progress(file_size, local_file.parts[-1], offset) as progress:
+                copy_stream(response.raw, fp, progress)
+
+        part.commit()
+
+    @property
+    def size(self) -> int:
+        """
+        Returns:
+            The size of the file, in bytes.
+        """
+        return int(self._info()["size"])  # type: ignore
+
+    @property
+    def signature(self) -> typing.Optional[str]:
+        info = self._info()
+        validator = info.get("etag") or info.get("modified")
+        if validator is None:
+            return None
+        return "{}:{}".format(validator, info.get("size"))
+
+    @property
+    def streamable(self) -> bool:
+        return True
+
+    @contextlib.contextmanager
+    def open(self) -> typing.Iterator[typing.BinaryIO]:
+        remote_file = "{}/{}".format(self._dataset_path, self._file_path)
+
+        # Retrieve information (size) of the file:
+        file_size = self.size
+
+        logger.info("Streaming {}... ".format(remote_file))
+        response = self._client.execute_request("download", Urn(remote_file).quote())
+
+        # Let urllib3 undo any transfer encoding (e.g., gzip) from the server:
+        response.raw.decode_content = True
+        try:
+            with ProgressReader(
+                response.raw, file_size, pathlib.Path(self._file_path).name
+            ) as stream:
+                yield stream
+        finally:
+            response.close()
 
     @property
     def relative_path(self) -> pathlib.Path:
@@ -172,35 +268,50 @@ class WebDavProvider(RemoteProvider):
     # The WebDAV client:
     _client: Client
 
+    # Datasets and versions on the server, once listed (see `_list_catalogue`):
+    _catalogue: typing.Optional[typing.Dict[str, typing.List[str]]]
+
     def __init__(
         self,
         root_folder: os.PathLike,
         remote_url: str,
         remote_path: str = "",
         authenticator: typing.Optional[WebDavAuthenticator] = None,
+        **kwargs
     ):
         """
         Args:
             root_folder: Root folder to look-up datasets.
             remote_url: Remote URL of the WebDAV server.
             authenticator: Authenticator to use.
+            **kwargs: Extra arguments for `RemoteProvider` (e.g., `max_workers`).
         """
-        super().__init__(root_folder, remote_url)
-
-        # WebDAV specific members:
-        self._authenticator = authenticator
-
         # Remote path from the root of the webdav folder:
         self._remote_path = remote_path
         if self._remote_path and not self._remote_path.endswith("/"):
             self._remote_path += "/"
 
+        super().__init__(root_folder, remote_url, **kwargs)
+
+        # WebDAV specific members:
+        self._authenticator = authenticator
+
         # Create the WebDAV client:
         options = {"webdav_hostname": self._remote_url}
         if isinstance(self._authenticator, WebDavSimpleAuthenticator):
             options["webdav_login"] = self._authenticator.username
             options["webdav_password"] = self._authenticator.password
         self._client = Client(options)
+        self._catalogue = None
+
+    def _catalogue_id(self) -> str:
+        return "{}/{}".format(super()._catalogue_id(), self._remote_path)
+
+    def check_health(self) -> bool:
+        # The listing of the server is only kept for a single use, the session of
+        # the client reconnects by itself:
+        self._catalogue = None
+        return super().check_health()
 
     def _is_available(self) -> bool:
         try:
@@ -208,46 +319,213 @@ class WebDavProvider(RemoteProvider):
         except WebDavException:
             return False
 
-    def _is_dataset_folder(self, name):
-        if self._remote_path:
-            relative_root = self._remote_path.rstrip("/").split("/")[-1]
-        else:
-            relative_root = self._remote_url.rstrip("/").split("/")[-1]
+    def _is_dataset_folder(self, versions: typing.List[str]) -> bool:
+        """
+        Args:
+            versions: The content of a folder of the server.
 
-        if name.strip("/") == relative_root:
-            return False
+        Returns:
+            `True` if the folder is a dataset folder, i.e., if it contains
+            versions.
+        """
+        return any(self.VERSION_REGEX.match(v) for v in versions)
+
+    def _server_path(self, remote_path: str) -> str:
+        """
+        Args:
+            remote_path: Path to a folder, relative to the root of the server.
 
-        return any(self.VERSION_REGEX.match(v) for v in self.list_versions(name))
+        Returns:
+            The path of the folder as found in listings from the server.
+        """
+        return urllib.parse.unquote(
+            urllib.parse.urlsplit(
+                self._client.get_url(Urn(remote_path, directory=True).quote())
+            ).path
+        ).rstrip("/")
+
+    def _list_folders(self, remote_path: str) -> typing.List[str]:
+        """
+        List the (non-hidden) sub-folders of the given remote folder using a
+        single PROPFIND request.
+
+        Args:
+            remote_path: Path to the folder, relative to the root of the server.
+
+        Returns:
+            The names of the sub-folders of the given folder.
+        """
+        root = self._server_path(remote_path)
+        return self._remove_hidden_values(
+            [
+                posixpath.basename(info["path"].rstrip("/"))
+                for info in self._propfind(remote_path, "1")
+                if info["isdir"] and info["path"].rstrip("/") != root
+            ]
+        )
+
+    def _propfind(
+        self, remote_path: str, depth: str
+    ) -> typing.List[typing.Dict[str, typing.Any]]:
+        """
+        List the given remote folder using a single PROPFIND request.
+
+        Args:
+            remote_path: Path to the folder, relative to the root of the server.
+            depth: Depth of the listing (`"1"` or `"infinity"`).
+
+        Returns:
+            The information about the resources in the listing, see
+            `webdav3.client.Client.list`. The listing includes the folder itself.
+
+        Raises:
+            WebDavException: If the request fails, including when the server cannot
+                be reached (`execute_request` does not convert connection errors
+                like the other methods of the client).
+        """
+        try:
+            response = self._client.execute_request(
+                "list",
+                Urn(remote_path, directory=True).quote(),
+                headers_ext=["Depth: {}".format(depth)],
+            )
+        except requests.ConnectionError:
+            raise NoConnection(self._remote_url)
+        except requests.RequestException as e:
+            raise ConnectionException(e)
+        return WebDavXmlUtils.parse_get_list_info_response(  # type: ignore
+            response.content
+        )
+
+    def _list_tree(
+        self,
+        remote_path: str,
+        select_folder: typing.Optional[typing.Callable[[str], bool]] = None,
+    ) -> typing.Dict[str, typing.Dict[str, typing.Any]]:
+        """
+        List all the files under the given remote folder, recursively.
+
+        The whole tree is retrieved using a single `Depth: infinity` PROPFIND
+        request. If the server forbids such requests, or silently limits the depth
+        of the listing, the folders whose content is missing are listed one level
+        at a time.
 
-    def _list_remote_files(self, name: str, version: str) -> typing.List[RemoteFile]:
+        Args:
+            remote_path: Path to the folder, relative to the root of the server.
+            select_folder: Function indicating if a folder (by path relative to the
+                given folder) may contain files of interest, the folders that do
+                not are not listed separately. `None` to list all the folders.
+
+        Returns:
+            A mapping from the paths of the files (relative to the given folder) to
+            their information, see `webdav3.client.Client.list`.
+        """
+
+        # Server paths (in the listing) of the given folder:
+        root = self._server_path(remote_path)
+
+        files: typing.Dict[str, typing.Dict[str, typing.Any]] = {}
+        pending = [("", "infinity")]
+        while pending:
+            folder, depth = pending.pop()
+            folder_path = posixpath.join(remote_path, folder)
+            try:
+                infos = self._propfind(folder_path, depth)
+            except ResponseErrorCode:
+                if depth != "infinity":
+                    raise
+                logger.info("Depth: infinity listing refused by the server.")
+                infos = self._propfind(folder_path, "1")
+
+            folders, parents = [], set()
+            for info in infos:
+                path = info["path"].rstrip("/")
+                if not path.startswith(root + "/"):
+                    continue
+                relative_path = path[len(root) + 1 :]
+                if relative_path == folder:
+                    continue
+                parents.add(posixpath.dirname(relative_path))
+                if info["isdir"]:
+                    folders.append(relative_path)
+                else:
+                    files[relative_path] = info
+
+            # Folders whose content was not in the listing are listed separately:
+            pending.extend(
+                (path, "1")
+                for path in folders
+                if path not in parents
+                and (select_folder is None or select_folder(path))
+            )
+
+        return files
+
+    def _list_remote_files(
+        self, name: str, version: str, selection: typing.Optional[Selection] = None
+    ) -> typing.List[RemoteFile]:
         # Path to the dataset:
         dataset_path = "{}{}/{}/".format(self._remote_path, name, version)
+        tree = self._list_tree(
+            dataset_path, None if selection is None else selection.may_contain
+        )
         return [
-            WebDavRemoteFile(self._client, dataset_path, fpath)
-            for fpath in self._client.list(dataset_path)
-            if fpath.rstrip("/") != version
+            WebDavRemoteFile(self._client, dataset_path, relative_path, info)
+            for relative_path, info in sorted(tree.items())
         ]
 
+    def _list_catalogue(self) -> typing.Dict[str, typing.List[str]]:
+        """
+        List all the datasets on the server with their versions.
+
+        The folders at the root of the server are listed first, and then the
+        content of all these folders is listed concurrently. The result is kept
+        for the lifetime of this provider.
+
+        Returns:
+            A mapping from the datasets on the server to their versions.
+        """
+        if self._catalogue is None:
+            names = self._list_folders(self._remote_path)
+            with self._make_executor() as executor:
+                versions = list(
+                    executor.map(
+                        lambda name: self._list_folders(
+                            "{}{}/".format(self._remote_path, name)
+                        ),
+                        names,
+                    )
+                )
+            self._catalogue = {
+                name: name_versions
+                for name, name_versions in zip(names, versions)
+                if self._is_dataset_folder(name_versions)
+            }
+        return self._catalogue
+
+    def _list_remote_versions(self, name: str) -> typing.List[str]:
+        # Only list the given dataset instead of the whole server:
+        try:
+            versions = self.list_versions(name)
+        except WebDavException:
+            raise DatasetNotFoundError(name)
+        if not self._is_dataset_folder(versions):
+            raise DatasetNotFoundError(name)
+        return versions
+
     def list_datasets(self) -> typing.List[str]:
-        return self._remove_hidden_values(
-            [
-                name.strip("/")
-                for name in self._client.list(self._remote_path)
-                if self._is_dataset_folder(name)
-            ]
-        )
+        return list(self._list_catalogue())
 
     def list_versions(self, dataset: str) -> typing.List[str]:
 
-        # Check that the dataset exists:
+        # Use the catalogue if the server was already listed:
+        if self._catalogue is not None:
+            if dataset not in self._catalogue:
+                raise DatasetNotFoundError(dataset)
+            return self._catalogue[dataset]
+
         remote_path = "{}{}/".format(self._remote_path, dataset)
-        if not self._client.check(remote_path):
+        try:
+            return self._list_folders(remote_path)
+        except RemoteResourceNotFound:
             raise DatasetNotFoundError(remote_path)
-
-        return self._remove_hidden_values(
-            [
-                name.strip("/")
-                for name in self._client.list(remote_path)
-                if name.strip("/") != dataset
-            ]
-        )
@@ -21,11 +21,14 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 import collections
+import json
 import os
 from pathlib import Path
 from typing import Any
+from typing import ContextManager
 from typing import Dict
 from typing import TextIO
+from typing import Tuple
 
 import yaml
 
@@ -34,6 +37,7 @@ from .providers import make_provider as make_provider
 from .providers import Provider
 from .providers.exceptions import DatasetNotFoundError
 from .providers.exceptions import InvalidConfigurationError
+from .providers.provider_pool import PROVIDER_POOL
 
 # Name of the environment variable containing the path to
 # the settings:
@@ -79,7 +83,37 @@ class SettingsProvider(object):
         Returns:
             A new `Provider` created from these settings.
         """
-        return make_provider(self._provider_type, base, self._provider_options)
+        return make_provider(self._provider_type, base, dict(self._provider_options))
+
+    def pool_key(self, base: Path) -> Tuple[str, str, str]:
+        """
+        Args:
+            base: path root directory
+
+        Returns:
+            The key identifying the providers created from those configurations
+            in a `ProviderPool`.
+        """
+        return (
+            self._provider_type,
+            str(base),
+            json.dumps(self._provider_options, sort_keys=True, default=str),
+        )
+
+    def lease_provider(self, base: Path) -> ContextManager[Provider]:
+        """
+        Lease a provider corresponding to those configurations from the
+        process-wide `ProviderPool`, so that its connections are reused.
+
+        Args:
+            base: path root directory
+
+        Returns:
+            A context manager returning the provider.
+        """
+        return PROVIDER_POOL.lease(
+            self.pool_key(base), lambda: self.create_provider(base)
+        )
 
 
 class Settings(object):
@@ -145,14 +179,23 @@ class Settings(object):
             for sp in self._provider_list.values():
                 try:
                     # check provider...
-                    provider = sp.create_provider(self._base)
-                    if dataset in provider.list_datasets():
+                    with sp.lease_provider(self._base) as provider:
+                        found = dataset in provider.list_datasets()
+                    if found:
                         s_provider = sp
                         break
                 except (DatasetNotFoundError, InvalidConfigurationError):
                     pass
         return s_provider
 
+    def _settings_provider(self, dataset: str) -> SettingsProvider:
+        if (
+            self._default_provider_ is not None
+            and self._default_provider_ in self._provider_list
+        ):
+            return self._provider_list[self._default_provider_]
+        return self.get_best_provider(dataset)
+
     def make_provider(self, dataset: str = "") -> Provider:
         """
         Creates and returns the provider corresponding to these settings.
@@ -161,16 +204,20 @@ class Settings(object):
         Returns:
             A new `Provider` created from these settings.
         """
+        return self._settings_provider(dataset).create_provider(self._base)
 
-        if (
-            self._default_provider_ is not None
-            and self._default_provider_ in self._provider_list
-        ):
-            s_provider = self._provider_list[self._default_provider_]
-        else:
-            s_provider = self.get_best_provider(dataset)
+    def lease_provider(self, dataset: str = "") -> ContextManager[Provider]:
+        """
+        Lease the provider corresponding to these settings from the process-wide
+        `ProviderPool`, so that providers and their connections are reused across
+        loads, datasets and threads.
 
-        return s_provider.create_provider(self._base)
+        Args:
+            dataset: dataset name
+        Returns:
+            A context manager returning the provider.
+        """
+        return self._settings_provider(dataset).lease_provider(self._base)
 
     @property
     def local_storage(self) -> Path:
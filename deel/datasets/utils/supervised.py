@@ -88,7 +88,7 @@ def load_hierarchical_python_image_dataset(
     """
 
     classes: Dict[Tuple[str, ...], Dict[str, List[pathlib.Path]]] = {}
-    for path in filter(pathlib.Path.is_file, folder.glob("*/**/*")):
+    for path in filter(lambda p: p.is_file(), folder.glob("*/**/*")):
 
         # The "class" path:
         if path.name.endswith(".txt"):
@@ -176,7 +176,7 @@ def load_python_image_dataset(
     # Mapping between class names and list of files:
     class_files: Dict[str, List[pathlib.Path]] = {}
 
-    for sd in filter(pathlib.Path.is_dir, folder.iterdir()):
+    for sd in filter(lambda p: p.is_dir(), folder.iterdir()):
 
         # Aggregate:
         cname = aggregate_fn(sd.name)
@@ -268,10 +268,11 @@ def load_numpy_image_dataset(
 
     # Load the images:
     def load_image(x: pathlib.Path):
-        im: Image.Image = Image.open(str(x))
-        if image_size is not None:
-            im = im.resize(image_size)
-        return np.array(im)
+        with x.open("rb") as fp:
+            im: Image.Image = Image.open(fp)
+            if image_size is not None:
+                im = im.resize(image_size)
+            return np.array(im)
 
     images = np.array([load_image(p) for p in files])
     labels = np.array(plabels)
@@ -499,13 +500,15 @@ def load_tensorflow_image_dataset(
     # tensorflow is not available.
     import tensorflow as tf
 
+    from .tensorflow_utils import tf_file_sources
+
     # Retrieve files:
     files, labels, idx_to_class = load_python_image_dataset(
         folder, shuffle, aggregate_fn, filter_fn
     )
 
-    # Convert files to filenames (str):
-    filenames = [str(f) for f in files]
+    # Convert files to sources (filenames if possible):
+    filenames, read_file = tf_file_sources(files)
     n_images = len(files)
 
     # Create the tensorflow dataset:
@@ -515,7 +518,7 @@ def load_tensorflow_image_dataset(
 
     # Preprocess function to load, resize and scale the image to [0, 1].
     def preprocess(filename, label):
-        x = tf.io.read_file(filename)
+        x = read_file(filename)
         x = tf.image.decode_image(x, channels=3, expand_animations=False)
         x = tf.image.convert_image_dtype(x, tf.float32)
         if image_size is not None:
@@ -20,12 +20,44 @@
 # LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
+import pathlib
+from typing import Any
+from typing import Callable
+from typing import List
 from typing import Sequence
 from typing import Tuple
 
 import tensorflow as tf
 
 
+def tf_file_sources(
+    files: Sequence[Any],
+) -> Tuple[List[Any], Callable[[tf.Tensor], tf.Tensor]]:
+    """
+    Create the sources of a tensorflow dataset over the given files, and the
+    function that reads the content of a source.
+
+    Files on the file system are read by tensorflow from their path, other files
+    (e.g., members of kept archives, see `ArchiveFolder`) are read in python.
+
+    Args:
+        files: The files to read.
+
+    Returns:
+        A tuple containing the sources (one for each file) and the function to
+        read a source.
+    """
+    if all(isinstance(file, pathlib.Path) for file in files):
+        return [str(file) for file in files], tf.io.read_file
+
+    def read_file(index: tf.Tensor) -> tf.Tensor:
+        return tf.numpy_function(
+            lambda i: files[int(i)].read_bytes(), [index], tf.string
+        )
+
+    return list(range(len(files))), read_file
+
+
 def tf_split_on_label(
     dataset: tf.data.Dataset, labels_in: Sequence[int]
 ) -> Tuple[tf.data.Dataset, tf.data.Dataset]:
@@ -45,7 +45,7 @@ class ImageDataset(Dataset):
         self.transform = transform
 
     def loader(self, path) -> Image.Image:
-        with open(path, "rb") as fp:
+        with path.open("rb") as fp:
             return Image.open(fp).convert("RGB")
 
     def __len__(self) -> int:
@@ -75,7 +75,7 @@ def load_hierarchical_python_image_dataset(
     """
 
     classes: Dict[Tuple[str, ...], List[pathlib.Path]] = defaultdict(list)
-    for path in filter(pathlib.Path.is_file, folder.glob("*/**/*")):
+    for path in filter(lambda p: p.is_file(), folder.glob("*/**/*")):
 
         # The "class" path:
         if path.name.endswith(".txt"):
@@ -184,10 +184,11 @@ def load_numpy_image_dataset(
 
     # Load the images:
     def load_image(x: pathlib.Path):
-        im: Image.Image = Image.open(str(x))
-        if image_size is not None:
-            im = im.resize(image_size)
-        return np.array(im)
+        with x.open("rb") as fp:
+            im: Image.Image = Image.open(fp)
+            if image_size is not None:
+                im = im.resize(image_size)
+            return np.array(im)
 
     images = np.array([load_image(p) for p in files])
 
@@ -379,11 +380,13 @@ def load_tensorflow_image_dataset(
     # tensorflow is not available.
     import tensorflow as tf
 
+    from .tensorflow_utils import tf_file_sources
+
     # Retrieve files:
     files = load_python_image_dataset(folder, shuffle, filter_fn)
 
-    # Convert files to filenames (str):
-    filenames = [str(f) for f in files]
+    # Convert files to sources (filenames if possible):
+    filenames, read_file = tf_file_sources(files)
     n_images = len(files)
 
     # Create the tensorflow dataset:
@@ -391,7 +394,7 @@ def load_tensorflow_image_dataset(
 
     # Preprocess function to load, resize and scale the image to [0, 1].
     def preprocess(filename):
-        x = tf.io.read_file(filename)
+        x = read_file(filename)
         x = tf.image.decode_image(x, channels=3, expand_animations=False)
         x = tf.image.convert_image_dtype(x, tf.float32)
         if image_size is not None:
@@ -85,5 +85,10 @@ setup(
         "Pillow",
         "PyYAML",
     ],
-    extras_require={"dev": dev_requires, "docs": docs_requires},
+    extras_require={
+        "dev": dev_requires,
+        "docs": docs_requires,
+        "zstd": ["zstandard"],
+        "lz4": ["lz4"],
+    },
 )
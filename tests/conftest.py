@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+# Copyright IRT Antoine de Saint Exupéry et Université Paul Sabatier Toulouse III - All
+# rights reserved. DEEL is a research program operated by IVADO, IRT Saint Exupéry,
+# CRIAQ and ANITI - https://www.deel.ai/
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+""" Shared fixtures for the tests"""
+import io
+import pathlib
+import tarfile
+import typing
+
+import pytest
+
+
+def _make_source_dataset(
+    root: pathlib.Path, name: str, version: str, files: typing.Dict[str, bytes]
+) -> pathlib.Path:
+    """
+    Create a dataset version in the given source folder, storing each file
+    in its own .tar.gz archive.
+    """
+    path = root.joinpath(name, version)
+    path.mkdir(parents=True)
+    for filename, content in files.items():
+        with tarfile.open(path.joinpath(filename + ".tar.gz"), "w:gz") as tp:
+            info = tarfile.TarInfo(filename)
+            info.size = len(content)
+            tp.addfile(info, io.BytesIO(content))
+    return path
+
+
+@pytest.fixture
+def make_source_dataset() -> typing.Callable[..., pathlib.Path]:
+    """
+    Returns a function `(root, name, version, files)` that creates a dataset
+    version in the `root` source folder, storing each file in its own .tar.gz
+    archive, and returns the folder of the version.
+    """
+    return _make_source_dataset
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+# Copyright IRT Antoine de Saint Exupéry et Université Paul Sabatier Toulouse III - All
+# rights reserved. DEEL is a research program operated by IVADO, IRT Saint Exupéry,
+# CRIAQ and ANITI - https://www.deel.ai/
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+""" Tests for the asynchronous provider API"""
+import asyncio
+import io
+import threading
+import time
+import typing
+
+import pytest
+
+from deel.datasets import load_async
+from deel.datasets.providers.async_provider import AsyncProvider
+from deel.datasets.providers.exceptions import DatasetNotFoundError
+from deel.datasets.providers.local_as_provider import LocalAsProvider
+from deel.datasets.settings import read_settings
+
+
+def test_async_provider(tmp_path, make_source_dataset):
+    """
+    Test the asynchronous provider API: concurrent retrievals with distinct
+    providers, serialised calls to a single provider, shared retrievals of the same
+    version, and `load_async`.
+    """
+    loop = asyncio.get_event_loop()
+    source = tmp_path.joinpath("source")
+    make_source_dataset(source, "dataset1", "1.0.0", {"a": b"aaa"})
+    make_source_dataset(source, "dataset2", "1.0.0", {"b": b"bbb"})
+
+    class CountingProvider(LocalAsProvider):
+        calls: typing.List[typing.Tuple[str, int]] = []
+        barrier = threading.Barrier(2)
+
+        def get_folder(self, name, *args, **kwargs):
+            self.calls.append((name, id(self)))
+            # Both datasets are retrieved at the same time:
+            self.barrier.wait(timeout=10)
+            return super().get_folder(name, *args, **kwargs)
+
+    provider = AsyncProvider(
+        lambda: CountingProvider(tmp_path.joinpath("local"), source)
+    )
+
+    async def retrieve():
+        async with provider:
+            datasets = await provider.list_datasets()
+            return datasets, await asyncio.gather(
+                provider.get_folder("dataset1"),
+                provider.get_folder("dataset1", returns_version=True),
+                provider.get_folder("dataset2"),
+            )
+
+    datasets, (path1, (path1bis, version), path2) = loop.run_until_complete(retrieve())
+    assert datasets == ["dataset1", "dataset2"]
+    assert sorted(name for name, _ in CountingProvider.calls) == [
+        "dataset1",
+        "dataset2",
+    ]
+    assert len(set(p for _, p in CountingProvider.calls)) == 2
+    assert path1 == path1bis == tmp_path.joinpath("local", "dataset1", "1.0.0")
+    assert version == "1.0.0"
+    assert path2.joinpath("b").read_bytes() == b"bbb"
+
+    with pytest.raises(DatasetNotFoundError):
+        loop.run_until_complete(provider.list_versions("dataset3"))
+    with pytest.raises(ValueError):
+        AsyncProvider(LocalAsProvider(tmp_path, source), max_concurrency=0)
+
+    # The calls to a single provider do not overlap:
+    class SerialProvider(LocalAsProvider):
+        running = 0
+        overlaps = 0
+
+        def get_folder(self, *args, **kwargs):
+            self.running += 1
+            self.overlaps += self.running > 1
+            time.sleep(0.05)
+            self.running -= 1
+            return super().get_folder(*args, **kwargs)
+
+    serial = SerialProvider(tmp_path.joinpath("local3"), source)
+    provider = AsyncProvider(serial)
+    assert provider.provider is serial
+
+    async def retrieve_serial():
+        async with provider:
+            return await asyncio.gather(
+                provider.get_folder("dataset1"), provider.get_folder("dataset2")
+            )
+
+    path1, path2 = loop.run_until_complete(retrieve_serial())
+    assert path2.joinpath("b").read_bytes() == b"bbb"
+    assert serial.overlaps == 0
+
+    settings = read_settings(
+        io.StringIO(
+            """version: 2
+path: {}
+providers:
+    local:
+        type: local
+        path: {}
+        copy: true
+""".format(
+                tmp_path.joinpath("local2"), source
+            )
+        )
+    )
+
+    async def load_all():
+        return await asyncio.gather(
+            load_async("dataset1", mode="path", settings=settings),
+            load_async("dataset2", mode="path", settings=settings),
+        )
+
+    path1, path2 = loop.run_until_complete(load_all())
+    assert path1 == tmp_path.joinpath("local2", "dataset1", "1.0.0")
+    assert path2.joinpath("b").read_bytes() == b"bbb"
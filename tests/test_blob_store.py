@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+# Copyright IRT Antoine de Saint Exupéry et Université Paul Sabatier Toulouse III - All
+# rights reserved. DEEL is a research program operated by IVADO, IRT Saint Exupéry,
+# CRIAQ and ANITI - https://www.deel.ai/
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+""" Tests for the content-addressed store of local versions"""
+from deel.datasets.providers.blob_store import BlobStore
+from deel.datasets.providers.local_as_provider import LocalAsProvider
+
+
+def test_blob_store_deduplication(tmp_path, make_source_dataset):
+    """
+    Test that identical files are shared between versions and that blobs
+    are removed when no version references them anymore.
+    """
+    source = tmp_path.joinpath("source")
+    make_source_dataset(source, "dataset1", "1.0.0", {"a": b"aaa", "b": b"bbb"})
+    make_source_dataset(source, "dataset1", "1.0.1", {"a": b"aaa", "b": b"BBB"})
+
+    local = tmp_path.joinpath("local")
+    provider = LocalAsProvider(local, source, dedup="hardlink")
+    path0 = provider.get_folder("dataset1", "1.0.0")
+    path1 = provider.get_folder("dataset1", "1.0.1")
+
+    assert provider.list_datasets() == ["dataset1"]
+    assert path0.joinpath("a").stat().st_ino == path1.joinpath("a").stat().st_ino
+    assert path0.joinpath("b").stat().st_ino != path1.joinpath("b").stat().st_ino
+    assert path1.joinpath("b").read_bytes() == b"BBB"
+
+    blobs = local.joinpath(BlobStore.FOLDER, "objects")
+    assert len(list(blobs.glob("*/*"))) == 3
+
+    provider.local_provider().del_folder("dataset1", "1.0.0")
+    assert len(list(blobs.glob("*/*"))) == 2
+    assert path1.joinpath("a").read_bytes() == b"aaa"
+
+    provider.local_provider().del_folder("dataset1", "1.0.1")
+    assert not list(blobs.glob("*/*"))
+    assert provider.local_provider().list_datasets() == []
+
+
+def test_blob_store_known_digests(tmp_path, monkeypatch):
+    """
+    Test that the files whose SHA-256 digest is recorded in the manifest are not
+    hashed again when they are added to the store.
+    """
+    source = tmp_path.joinpath("source")
+    for version in ("1.0.0", "1.0.1"):
+        source.joinpath("dataset1", version).mkdir(parents=True)
+        source.joinpath("dataset1", version, "a").write_bytes(b"aaa")
+
+    hashed = []
+
+    def hash_file(self, file):
+        hashed.append(file.name)
+        return hash_file.original(self, file)
+
+    hash_file.original = BlobStore.hash_file
+    monkeypatch.setattr(BlobStore, "hash_file", hash_file)
+
+    local = tmp_path.joinpath("local")
+    provider = LocalAsProvider(local, source, dedup="hardlink", checksum="sha256")
+    path0 = provider.get_folder("dataset1", "1.0.0")
+    path1 = provider.get_folder("dataset1", "1.0.1")
+    assert path0.joinpath("a").stat().st_ino == path1.joinpath("a").stat().st_ino
+    assert hashed == []
+
+    # Files with a digest of another algorithm are hashed:
+    local = tmp_path.joinpath("local2")
+    provider = LocalAsProvider(local, source, dedup="hardlink", checksum="blake2b")
+    provider.get_folder("dataset1", "1.0.0")
+    assert hashed == ["a"]
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+# Copyright IRT Antoine de Saint Exupéry et Université Paul Sabatier Toulouse III - All
+# rights reserved. DEEL is a research program operated by IVADO, IRT Saint Exupéry,
+# CRIAQ and ANITI - https://www.deel.ai/
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+""" Tests for the size-limited cache of local versions"""
+import os
+import stat
+import time
+
+import pytest
+
+from deel.datasets.providers.dataset_cache import parse_size
+from deel.datasets.providers.local_as_provider import LocalAsProvider
+from deel.datasets.providers.provider_pool import ProviderPool
+
+
+def test_dataset_cache(tmp_path, make_source_dataset):
+    """
+    Test that the least recently or frequently used versions are removed when
+    the cache exceeds its size, and that pinned versions are kept.
+    """
+    assert parse_size(512) == 512
+    assert parse_size("1.5K") == 1536
+    assert parse_size("2 GiB") == 2 << 30
+    with pytest.raises(ValueError):
+        parse_size("2 apples")
+
+    source = tmp_path.joinpath("source")
+    for name in ("dataset1", "dataset2", "dataset3"):
+        make_source_dataset(source, name, "1.0.0", {"a": b"a" * 1000})
+
+    def load(local, *names, **kwargs):
+        with LocalAsProvider(local, source, cache_size="2.5K", **kwargs) as provider:
+            for name in names:
+                provider.get_folder(name)
+                provider.release(name, "1.0.0")
+                time.sleep(0.01)
+            return sorted(provider.local_provider().list_datasets())
+
+    local = tmp_path.joinpath("local")
+    assert load(local, "dataset1", "dataset2", "dataset1") == ["dataset1", "dataset2"]
+    assert load(local, "dataset3") == ["dataset1", "dataset3"]
+
+    local = tmp_path.joinpath("local2")
+    assert load(local, "dataset1", "dataset1", "dataset2", cache_policy="lfu") == [
+        "dataset1",
+        "dataset2",
+    ]
+    assert load(local, "dataset3", cache_policy="lfu") == ["dataset1", "dataset3"]
+
+    # The versions in use are not removed, until their provider is closed:
+    local = tmp_path.joinpath("local3")
+    with LocalAsProvider(local, source, cache_size=1000) as provider:
+        provider.get_folder("dataset1")
+        assert load(local, "dataset2", "dataset3") == ["dataset1", "dataset3"]
+    assert load(local, "dataset2") == ["dataset2", "dataset3"]
+
+    # ...or returned to a pool:
+    pool = ProviderPool()
+    with pool.lease(
+        "key", lambda: LocalAsProvider(local, source, cache_size=1000)
+    ) as p:
+        p.get_folder("dataset1")
+        assert load(local, "dataset2", "dataset3") == ["dataset1", "dataset3"]
+    assert load(local, "dataset2") == ["dataset2", "dataset3"]
+    pool.clear()
+
+    with pytest.raises(ValueError):
+        LocalAsProvider(local, source, cache_size=1000, cache_policy="fifo")
+
+
+def test_dataset_cache_group(tmp_path, make_source_dataset):
+    """
+    Test that the lock, pin and usage files of the cache, and their folders, are
+    writable by their group.
+    """
+    source = tmp_path.joinpath("source")
+    make_source_dataset(source, "dataset", "1.0.0", {"a": b"a"})
+
+    local = tmp_path.joinpath("local")
+    umask = os.umask(0o022)
+    try:
+        with LocalAsProvider(local, source, cache_size="1M") as provider:
+            provider.get_folder("dataset")
+    finally:
+        os.umask(umask)
+
+    paths = [
+        local.joinpath(".locks"),
+        local.joinpath(".locks", "dataset"),
+        local.joinpath(".locks", "dataset", "1.0.0.lock"),
+        local.joinpath(".locks", "dataset", "1.0.0.pin"),
+        local.joinpath("dataset", ".meta"),
+        local.joinpath("dataset", ".meta", "1.0.0"),
+        local.joinpath("dataset", ".meta", "1.0.0", "usage.json"),
+    ]
+    for path in paths:
+        assert path.stat().st_mode & stat.S_IWGRP, path
@@ -0,0 +1,472 @@
+# -*- coding: utf-8 -*-
+# Copyright IRT Antoine de Saint Exupéry et Université Paul Sabatier Toulouse III - All
+# rights reserved. DEEL is a research program operated by IVADO, IRT Saint Exupéry,
+# CRIAQ and ANITI - https://www.deel.ai/
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+""" Tests for the extraction of archives and compressed files"""
+import concurrent.futures
+import gzip
+import io
+import lzma
+import os
+import shutil
+import struct
+import subprocess
+import tarfile
+import typing
+import zipfile
+import zlib
+
+import pytest
+from PIL import Image
+
+from deel.datasets.providers import decompression
+from deel.datasets.providers.archive_folder import ArchiveFolder
+from deel.datasets.providers.archive_folder import MemberReader
+from deel.datasets.providers.decompression import BackgroundReader
+from deel.datasets.providers.decompression import open_xz
+from deel.datasets.providers.decompression import ParallelXzReader
+from deel.datasets.providers.decompression import xz_blocks
+from deel.datasets.providers.extraction import ExtractionScheduler
+from deel.datasets.providers.local_as_provider import LocalAsProvider
+from deel.datasets.providers.local_as_provider import LocalFile
+from deel.datasets.providers.remote_provider import GzExtractor
+from deel.datasets.providers.remote_provider import Lz4Extractor
+from deel.datasets.providers.remote_provider import RemoteProvider
+from deel.datasets.providers.remote_provider import TarZExtractor
+from deel.datasets.providers.remote_provider import XzExtractor
+from deel.datasets.providers.remote_provider import ZstdExtractor
+from deel.datasets.providers.tar_index import is_block_compressed
+from deel.datasets.providers.tar_index import TarIndex
+from deel.datasets.utils import load_numpy_image_dataset
+
+
+def test_streaming_extraction(tmp_path, make_source_dataset):
+    """
+    Test that tar and gzip files are extracted from the stream while zip files
+    are downloaded before being extracted.
+    """
+    source = make_source_dataset(
+        tmp_path.joinpath("source"), "dataset1", "1.0.0", {"a.txt": b"aaa"}
+    )
+    with gzip.open(source.joinpath("b.txt.gz"), "wb") as fp:
+        fp.write(b"bbb")
+    with zipfile.ZipFile(source.joinpath("c.zip"), "w") as zp:
+        zp.writestr("c.txt", b"ccc")
+
+    downloaded: typing.List[str] = []
+
+    class SpyFile(LocalFile):
+        def download(self, local_file, *args):
+            downloaded.append(local_file.name)
+            super().download(local_file, *args)
+
+    class SpyProvider(LocalAsProvider):
+        def _list_remote_files(self, name, version, selection=None):
+            return [
+                SpyFile(f._dataset_path, f.source_path)
+                for f in super()._list_remote_files(name, version, selection)
+            ]
+
+    provider = SpyProvider(tmp_path.joinpath("local"), tmp_path.joinpath("source"))
+    path = provider.get_folder("dataset1")
+
+    assert downloaded == ["c.zip"]
+    assert sorted(p.name for p in path.iterdir()) == ["a.txt", "b.txt", "c.txt"]
+    assert path.joinpath("a.txt").read_bytes() == b"aaa"
+    assert path.joinpath("b.txt").read_bytes() == b"bbb"
+    assert path.joinpath("c.txt").read_bytes() == b"ccc"
+
+
+def test_keep_archives(tmp_path):
+    """
+    Test that zip and uncompressed tar archives are kept and indexed, and that
+    their members are read from the archives by the loaders.
+    """
+
+    def png(color: int) -> bytes:
+        buffer = io.BytesIO()
+        Image.new("L", (4, 4), color).save(buffer, format="PNG")
+        return buffer.getvalue()
+
+    source = tmp_path.joinpath("source")
+    path = source.joinpath("dataset1", "1.0.0")
+    path.joinpath("data").mkdir(parents=True)
+    with zipfile.ZipFile(path.joinpath("data", "cats.zip"), "w") as zp:
+        for i in range(3):
+            zp.writestr("cat/{}.png".format(i), png(10 + i), zipfile.ZIP_DEFLATED)
+    with tarfile.open(path.joinpath("data", "dogs.tar"), "w") as tp:
+        for i in range(2):
+            content = png(100 + i)
+            info = tarfile.TarInfo("dog/{}.png".format(i))
+            info.size = len(content)
+            tp.addfile(info, io.BytesIO(content))
+    with tarfile.open(path.joinpath("other.tgz"), "w:gz") as tp:
+        info = tarfile.TarInfo("other.txt")
+        info.size = 3
+        tp.addfile(info, io.BytesIO(b"txt"))
+    path.joinpath("labels.csv").write_bytes(b"csv")
+
+    provider = LocalAsProvider(tmp_path.joinpath("local"), source, keep_archives=True)
+    local_path = provider.get_folder("dataset1")
+    assert sorted(p.name for p in local_path.joinpath("data").iterdir()) == [
+        "cats.zip",
+        "cats.zip.index",
+        "dogs.tar",
+        "dogs.tar.index",
+    ]
+    assert local_path.joinpath("other.txt").read_bytes() == b"txt"
+    assert provider.verify("dataset1", "1.0.0") == []
+
+    root = ArchiveFolder(local_path).root
+    assert sorted(p.name for p in root.iterdir()) == ["data", "labels.csv", "other.txt"]
+    assert sorted(p.name for p in root.joinpath("data").iterdir()) == ["cat", "dog"]
+    assert sorted(str(p.relative_to(root)) for p in root.glob("*/**/*.png")) == [
+        "data/cat/0.png",
+        "data/cat/1.png",
+        "data/cat/2.png",
+        "data/dog/0.png",
+        "data/dog/1.png",
+    ]
+    assert root.joinpath("labels.csv").read_text() == "csv"
+    assert root.joinpath("data", "dog", "1.png").stat().st_size == len(png(101))
+    assert not root.joinpath("data", "dog", "2.png").exists()
+    with pytest.raises(FileNotFoundError):
+        root.joinpath("data", "dog", "2.png").open("rb")
+
+    # Members of uncompressed tar archives are views on the mapped archive:
+    with root.joinpath("data", "dog", "0.png").open("rb") as fp:
+        assert isinstance(fp, MemberReader)
+        assert bytes(fp.getbuffer()) == png(100)
+    assert root.joinpath("data", "dog", "1.png").read_buffer() == png(101)
+
+    # Members of zip archives can be read concurrently:
+    members = [root.joinpath("data", "cat", "{}.png".format(i)) for i in range(3)]
+    with concurrent.futures.ThreadPoolExecutor(3) as executor:
+        contents = list(executor.map(lambda p: p.read_bytes(), members * 10))
+    assert contents == [png(10 + i) for i in range(3)] * 10
+
+    ((x_train, y_train), _), _ = load_numpy_image_dataset(
+        root.joinpath("data"), train_split=1.0, shuffle=False
+    )
+    assert sorted(x_train[:, 0, 0, 0].tolist()) == [10, 11, 12, 100, 101]
+    assert sorted(y_train.tolist()) == [0, 0, 0, 1, 1]
+
+    # Members outside of the folder of the archive are rejected:
+    path = source.joinpath("dataset2", "1.0.0")
+    path.mkdir(parents=True)
+    with tarfile.open(path.joinpath("evil.tar"), "w") as tp:
+        info = tarfile.TarInfo("../evil.txt")
+        info.size = 4
+        tp.addfile(info, io.BytesIO(b"evil"))
+    with pytest.raises(Exception, match="Path Traversal"):
+        provider.get_folder("dataset2")
+
+
+def test_tar_index(tmp_path):
+    """
+    Test the index of uncompressed and block-compressed tar archives, and the
+    selective extraction of tar archives.
+    """
+
+    def bgzf(data: bytes, block_size: int = 1000) -> bytes:
+        # BGZF blocks: gzip members with a "BC" extra field:
+        blocks = []
+        for i in range(0, len(data), block_size):
+            chunk = data[i : i + block_size]
+            compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+            deflated = compressor.compress(chunk) + compressor.flush()
+            blocks.append(
+                b"\x1f\x8b\x08\x04\0\0\0\0\0\xff\x06\0BC\x02\0"
+                + struct.pack("<H", len(deflated) + 25)
+                + deflated
+                + struct.pack("<II", zlib.crc32(chunk), len(chunk))
+            )
+        return b"".join(blocks)
+
+    contents = {"a/{}.txt".format(i): os.urandom(100 * i) for i in range(20)}
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w") as tp:
+        for name, content in contents.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            tp.addfile(info, io.BytesIO(content))
+    tar = tmp_path.joinpath("data.tar")
+    tar.write_bytes(buffer.getvalue())
+    tgz = tmp_path.joinpath("data.tar.gz")
+    tgz.write_bytes(bgzf(buffer.getvalue()))
+    assert not is_block_compressed(tar)
+    assert is_block_compressed(tgz)
+
+    for archive in (tar, tgz):
+        index = TarIndex.build(archive)
+        assert index.compressed == (archive == tgz)
+        assert [entry.name for entry in index.entries] == list(contents)
+        index.save(tmp_path.joinpath("index"))
+        index = TarIndex.load(tmp_path.joinpath("index"), archive)
+        assert index is not None
+        with open(archive, "rb") as fp:
+            for name in reversed(list(contents)):
+                assert index.read(fp, name) == contents[name]
+        assert index.extract(archive, ["a/3.txt"], tmp_path.joinpath("x")) == [
+            tmp_path.joinpath("x", "a", "3.txt")
+        ]
+        assert tmp_path.joinpath("x", "a", "3.txt").read_bytes() == contents["a/3.txt"]
+
+    # Header offsets point to the headers in the uncompressed archive:
+    data = tar.read_bytes()
+    for entry in index.entries:
+        header = tarfile.TarInfo.frombuf(
+            data[entry.header_offset : entry.header_offset + 512], "utf-8", "strict"
+        )
+        assert header.name == entry.name
+        assert entry.data_offset == entry.header_offset + 512
+
+    # Outdated or invalid indexes are ignored:
+    tmp_path.joinpath("index").write_bytes(b"invalid")
+    assert TarIndex.load(tmp_path.joinpath("index"), tgz) is None
+    TarIndex.build(tar).save(tmp_path.joinpath("index"))
+    assert TarIndex.load(tmp_path.joinpath("index"), tgz) is None
+
+    # Only the selected members are extracted:
+    extractor = TarZExtractor(select=lambda name: name.endswith("1.txt"))
+    with tarfile.open(tar, "r") as tp:
+        outputs = extractor._extract(tp, tmp_path.joinpath("y"))
+    assert sorted(p.name for p in outputs) == ["1.txt", "11.txt"]
+
+    # Block-compressed archives are kept, other compressed archives extracted:
+    path = tmp_path.joinpath("source", "dataset1", "1.0.0")
+    path.mkdir(parents=True)
+    path.joinpath("block.tar.gz").write_bytes(tgz.read_bytes())
+    with tarfile.open(path.joinpath("other.tar.gz"), "w:gz") as tp:
+        tp.add(tmp_path.joinpath("x", "a", "3.txt"), "b/3.txt")
+    provider = LocalAsProvider(
+        tmp_path.joinpath("local"), tmp_path.joinpath("source"), keep_archives=True
+    )
+    local_path = provider.get_folder("dataset1")
+    assert sorted(p.name for p in local_path.iterdir()) == [
+        "b",
+        "block.tar.gz",
+        "block.tar.gz.index",
+    ]
+    root = ArchiveFolder(local_path).root
+    assert sorted(p.name for p in root.iterdir()) == ["a", "b"]
+    assert root.joinpath("a", "7.txt").read_bytes() == contents["a/7.txt"]
+    assert root.joinpath("b", "3.txt").read_bytes() == contents["a/3.txt"]
+
+
+def test_parallel_extraction(tmp_path, monkeypatch):
+    """
+    Test the extraction of downloaded archives in worker processes, with the
+    members of zip archives split between the workers.
+    """
+    monkeypatch.setattr(ExtractionScheduler, "MIN_RANGE_SIZE", 1000)
+
+    source = tmp_path.joinpath("source")
+    path = source.joinpath("dataset1", "1.0.0")
+    path.mkdir(parents=True)
+    contents = {}
+    for i in range(3):
+        with zipfile.ZipFile(path.joinpath("part{}.zip".format(i)), "w") as zp:
+            for j in range(10):
+                name = "part{}/{}.bin".format(i, j)
+                contents[name] = os.urandom(500)
+                zp.writestr(name, contents[name])
+
+    scheduler = ExtractionScheduler(2)
+    assert scheduler.max_workers == min(2, os.cpu_count() or 1)
+    with zipfile.ZipFile(path.joinpath("part0.zip")) as zp:
+        ranges = scheduler._split(zp.infolist())
+    assert len(ranges) == scheduler.max_workers
+    assert sum(ranges, []) == ["part0/{}.bin".format(j) for j in range(10)]
+
+    with LocalAsProvider(
+        tmp_path.joinpath("local"), source, extract_workers=2
+    ) as provider:
+        local_path = provider.get_folder("dataset1")
+        assert sorted(p.name for p in local_path.iterdir()) == [
+            "part0",
+            "part1",
+            "part2",
+        ]
+        for name, content in contents.items():
+            assert local_path.joinpath(name).read_bytes() == content
+        assert provider.verify("dataset1", "1.0.0") == []
+
+    # Downloaded tar and gzip files are also extracted by the workers:
+    folder = tmp_path.joinpath("files")
+    folder.mkdir()
+    with tarfile.open(folder.joinpath("a.tar.gz"), "w:gz") as tp:
+        tp.add(local_path.joinpath("part0"), "a")
+    folder.joinpath("b.txt.gz").write_bytes(gzip.compress(b"bbb"))
+    try:
+        outputs = TarZExtractor(scheduler=scheduler).apply(folder.joinpath("a.tar.gz"))
+        assert len(outputs) == 10
+        assert folder.joinpath("a", "3.bin").read_bytes() == contents["part0/3.bin"]
+        assert GzExtractor(scheduler).apply(folder.joinpath("b.txt.gz")) == [
+            folder.joinpath("b.txt")
+        ]
+        assert folder.joinpath("b.txt").read_bytes() == b"bbb"
+        assert sorted(p.name for p in folder.iterdir()) == ["a", "b.txt"]
+    finally:
+        scheduler.shutdown()
+
+    with pytest.raises(ValueError):
+        ExtractionScheduler(0)
+
+
+def test_xz_extractor(tmp_path, monkeypatch):
+    """
+    Test the extraction of xz archives, whose blocks are decoded in parallel.
+    """
+    contents = {"a/{}.bin".format(i): os.urandom(10000) for i in range(10)}
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w") as tp:
+        for name, content in contents.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            tp.addfile(info, io.BytesIO(content))
+    data = buffer.getvalue()
+
+    # Concatenated streams, one block each:
+    path = tmp_path.joinpath("source", "dataset1", "1.0.0")
+    path.mkdir(parents=True)
+    archive = path.joinpath("data.tar.xz")
+    archive.write_bytes(
+        b"".join(lzma.compress(data[i : i + 20000]) for i in range(0, len(data), 20000))
+    )
+    with open(archive, "rb") as fp:
+        blocks = xz_blocks(fp)
+    assert len(blocks) == (len(data) + 19999) // 20000
+    assert sum(block.uncompressed_size for block in blocks) == len(data)
+
+    # Stream padding is skipped when decoding blocks in parallel:
+    padded = tmp_path.joinpath("padded.xz")
+    padded.write_bytes(lzma.compress(b"aaa") + b"\0" * 8 + lzma.compress(b"bbb"))
+    with open(padded, "rb") as fp, open_xz(fp, max_workers=2) as stream:
+        assert isinstance(stream, ParallelXzReader)
+        assert stream.read() == b"aaabbb"
+
+    # The blocks decoded at once are limited in size:
+    for max_size, count in ((1000, 1), (45000, 2)):
+        monkeypatch.setattr(decompression, "_MAX_PENDING_SIZE", max_size)
+        with open(archive, "rb") as fp, open_xz(fp, max_workers=4) as stream:
+            assert stream.read(1) == data[:1]
+            assert len(stream._pending) == count - 1
+            assert stream.read() == data[1:]
+    monkeypatch.undo()
+    path.joinpath("data.txt.xz").write_bytes(lzma.compress(b"txt"))
+
+    # Downloaded archives:
+    folder = tmp_path.joinpath("files")
+    shutil.copytree(path, folder)
+    outputs = XzExtractor().apply(folder.joinpath("data.tar.xz"))
+    assert len(outputs) == len(contents)
+    for name, content in contents.items():
+        assert folder.joinpath(name).read_bytes() == content
+    assert XzExtractor().apply(folder.joinpath("data.txt.xz")) == [
+        folder.joinpath("data.txt")
+    ]
+    assert folder.joinpath("data.txt").read_bytes() == b"txt"
+    assert sorted(p.name for p in folder.iterdir()) == ["a", "data.txt"]
+
+    # Downloaded archives extracted by a scheduler:
+    folder = tmp_path.joinpath("scheduled")
+    shutil.copytree(path, folder)
+    scheduler = ExtractionScheduler(2)
+    modifiers = [m.with_scheduler(scheduler) for m in RemoteProvider.modifiers]
+    try:
+        for name in ("data.tar.xz", "data.txt.xz"):
+            modifier = next(m for m in modifiers if m.accept(folder.joinpath(name)))
+            assert isinstance(modifier, XzExtractor)
+            assert modifier._scheduler is scheduler
+            modifier.apply(folder.joinpath(name))
+    finally:
+        scheduler.shutdown()
+    assert folder.joinpath("a", "3.bin").read_bytes() == contents["a/3.bin"]
+    assert folder.joinpath("data.txt").read_bytes() == b"txt"
+    assert sorted(p.name for p in folder.iterdir()) == ["a", "data.txt"]
+
+    # Archives extracted while being downloaded:
+    provider = LocalAsProvider(tmp_path.joinpath("local"), tmp_path.joinpath("source"))
+    local_path = provider.get_folder("dataset1")
+    assert sorted(p.name for p in local_path.iterdir()) == ["a", "data.txt"]
+    assert local_path.joinpath("a", "9.bin").read_bytes() == contents["a/9.bin"]
+
+    # Multiple blocks in a single stream:
+    if shutil.which("xz") is not None:
+        archive = tmp_path.joinpath("multi.tar.xz")
+        archive.write_bytes(
+            subprocess.run(
+                ["xz", "-T2", "--block-size=16KiB", "-c"],
+                input=data,
+                stdout=subprocess.PIPE,
+                check=True,
+            ).stdout
+        )
+        with open(archive, "rb") as fp:
+            assert len(xz_blocks(fp)) > 1
+        XzExtractor().apply(archive)
+        assert tmp_path.joinpath("a", "5.bin").read_bytes() == contents["a/5.bin"]
+
+
+@pytest.mark.parametrize("codec", ["zstd", "lz4"])
+def test_optional_extractors(tmp_path, codec):
+    """
+    Test the extraction of Zstandard and LZ4 archives, if the optional packages
+    are installed.
+    """
+    if codec == "zstd":
+        compress = pytest.importorskip("zstandard").compress
+        extractor, suffix = ZstdExtractor(), ".zst"
+    else:
+        compress = pytest.importorskip("lz4.frame").compress
+        extractor, suffix = Lz4Extractor(), ".lz4"
+
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w") as tp:
+        info = tarfile.TarInfo("a/b.txt")
+        info.size = 3
+        tp.addfile(info, io.BytesIO(b"bbb"))
+    archive = tmp_path.joinpath("data.tar" + suffix)
+    archive.write_bytes(compress(buffer.getvalue()))
+    assert extractor.accept(archive)
+    assert extractor.apply(archive) == [tmp_path.joinpath("a", "b.txt")]
+    assert tmp_path.joinpath("a", "b.txt").read_bytes() == b"bbb"
+    assert not archive.exists()
+
+
+def test_background_reader_error():
+    """
+    Test that the error raised by the stream read in the background is raised
+    again by the following reads.
+    """
+
+    class FailingStream(io.BytesIO):
+        def read(self, size=-1):
+            if self.tell() > 0:
+                raise OSError("Corrupted stream.")
+            return super().read(3)
+
+    with BackgroundReader(FailingStream(b"abcdef")) as stream:  # type: ignore
+        assert stream.read(3) == b"abc"
+        for _ in range(2):
+            with pytest.raises(OSError):
+                stream.read(3)
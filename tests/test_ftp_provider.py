@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+# Copyright IRT Antoine de Saint Exupéry et Université Paul Sabatier Toulouse III - All
+# rights reserved. DEEL is a research program operated by IVADO, IRT Saint Exupéry,
+# CRIAQ and ANITI - https://www.deel.ai/
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+""" Tests for the FTP provider"""
+import asyncio
+import ftplib
+import threading
+import time
+import typing
+
+import pytest
+
+from deel.datasets.providers.async_provider import AsyncProvider
+from deel.datasets.providers.ftp_providers import FtpProvider
+from deel.datasets.providers.ftp_providers import FtpSimpleAuthenticator
+
+
+@pytest.fixture
+def ftp_provider(monkeypatch, tmp_path):
+    """
+    Start a FTP server (pyftpdlib) serving a dataset with two versions, and
+    returns a function creating a `FtpProvider` (with the given extra arguments)
+    for the server, and the list of the FTP clients opened by the providers.
+    """
+    authorizers = pytest.importorskip("pyftpdlib.authorizers")
+    handlers = pytest.importorskip("pyftpdlib.handlers")
+    servers = pytest.importorskip("pyftpdlib.servers")
+
+    root = tmp_path.joinpath("ftp")
+    for version in ("1.0.0", "1.0.1"):
+        path = root.joinpath("dataset1", version)
+        path.mkdir(parents=True)
+        for filename in "abcd":
+            path.joinpath(filename).write_bytes((filename + version).encode())
+
+    authorizer = authorizers.DummyAuthorizer()
+    authorizer.add_user("user", "pass", str(root), perm="elr")
+    handler = type("Handler", (handlers.FTPHandler,), {"authorizer": authorizer})
+    server = servers.FTPServer(("127.0.0.1", 0), handler)
+    monkeypatch.setattr(ftplib, "FTP_PORT", server.socket.getsockname()[1])
+    thread = threading.Thread(
+        target=server.serve_forever, kwargs={"timeout": 0.1}, daemon=True
+    )
+    thread.start()
+
+    clients: typing.List[ftplib.FTP] = []
+
+    class RecordingProvider(FtpProvider):
+        def _connect(self):
+            clients.append(super()._connect())
+            return clients[-1]
+
+    def make(**kwargs) -> FtpProvider:
+        return RecordingProvider(
+            tmp_path.joinpath("local"),
+            "ftp://127.0.0.1/",
+            FtpSimpleAuthenticator("user", "pass"),
+            **kwargs
+        )
+
+    yield make, clients
+    server.close_all()
+    thread.join()
+
+
+def test_ftp_download_connections(ftp_provider):
+    """
+    Test that the connections of the download threads are closed once the
+    files of a version are downloaded.
+    """
+    make, clients = ftp_provider
+    with make(max_workers=3) as provider:
+        for version in ("1.0.0", "1.0.1"):
+            path = provider.get_folder("dataset1", version)
+            assert path.joinpath("d").read_bytes() == b"d" + version.encode()
+            assert 1 < len(clients) <= 4
+            assert [c for c in clients if c.sock is not None] == [clients[0]]
+            del clients[1:]
+
+
+def test_ftp_async_calls(ftp_provider):
+    """
+    Test concurrent asynchronous calls to a single FTP provider, which share its
+    connection.
+    """
+    make, _ = ftp_provider
+    provider = AsyncProvider(make(max_workers=2), max_concurrency=4)
+
+    async def retrieve():
+        async with provider:
+            return await asyncio.gather(
+                provider.get_folder("dataset1", "1.0.0"),
+                provider.get_folder("dataset1", "1.0.1"),
+                *(provider.list_versions("dataset1") for _ in range(4)),
+                provider.list_datasets()
+            )
+
+    path0, path1, *listings = asyncio.get_event_loop().run_until_complete(retrieve())
+    assert path0.joinpath("a").read_bytes() == b"a1.0.0"
+    assert path1.joinpath("b").read_bytes() == b"b1.0.1"
+    assert listings == [["1.0.0", "1.0.1"]] * 4 + [["dataset1"]]
+
+
+def test_ftp_catalogue_refresh(ftp_provider):
+    """
+    Test that the catalogue cache is refreshed in the background with its own
+    connection, closed once the refresh is done.
+    """
+    make, clients = ftp_provider
+    catalogue = {"dataset1": ["1.0.0", "1.0.1"]}
+    with make(catalogue_ttl=0, catalogue_max_stale=3600) as provider:
+        assert provider.list_catalogue() == catalogue
+        assert len(clients) == 1
+        time.sleep(0.01)
+        assert provider.list_catalogue() == catalogue
+        assert provider.list_versions("dataset1") == catalogue["dataset1"]
+        provider._catalogue_cache.wait()
+        assert len(clients) == 2
+        assert [c for c in clients if c.sock is not None] == [clients[0]]
+
+
+def test_ftp_without_size(ftp_provider, monkeypatch):
+    """
+    Test that files are downloaded from servers that do not report the size of the
+    files.
+    """
+    make, _ = ftp_provider
+    monkeypatch.setattr(ftplib.FTP, "size", lambda self, filename: None)
+    with make() as provider:
+        path = provider.get_folder("dataset1", "1.0.0")
+        assert path.joinpath("a").read_bytes() == b"a1.0.0"
@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+# Copyright IRT Antoine de Saint Exupéry et Université Paul Sabatier Toulouse III - All
+# rights reserved. DEEL is a research program operated by IVADO, IRT Saint Exupéry,
+# CRIAQ and ANITI - https://www.deel.ai/
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+""" Tests for the HTTP providers"""
+import functools
+import hashlib
+import http.server
+import io
+import os
+import pathlib
+import threading
+
+import pytest
+
+from deel.datasets.providers.http_providers import HttpRemoteFile
+from deel.datasets.providers.http_providers import HttpSingleFileProvider
+from deel.datasets.providers.remote_provider import PartFile
+
+
+class RangeRequestHandler(http.server.SimpleHTTPRequestHandler):
+    """
+    HTTP request handler that supports Range and If-Range requests, with
+    an ETag based on the file content.
+
+    The headers of the requests are recorded in the "requests" entry of the
+    `state` dictionary of the server, range requests are supported if its
+    "accept_ranges" entry is true, and HEAD requests if its "allow_head" entry
+    is true.
+    """
+
+    def log_message(self, *args):
+        pass
+
+    def _etag(self, path: str) -> str:
+        with open(path, "rb") as fp:
+            return '"{}"'.format(hashlib.sha256(fp.read()).hexdigest())
+
+    def send_head(self):
+        state = self.server.state  # type: ignore
+        state["requests"].append(dict(self.headers))
+        path = self.translate_path(self.path)
+        if self.command == "HEAD" and not state["allow_head"]:
+            self.send_error(405)
+            return None
+        if not os.path.isfile(path):
+            self.send_error(404)
+            return None
+
+        etag = self._etag(path)
+        size = os.path.getsize(path)
+        start = 0
+        end = size - 1
+        status = 200
+
+        range_header = self.headers.get("Range")
+        if (
+            state["accept_ranges"]
+            and range_header
+            and self.headers.get("If-Range", etag) == etag
+        ):
+            first, last = range_header.split("=")[1].split("-")
+            start = int(first)
+            if last:
+                end = min(int(last), end)
+            if start >= size:
+                self.send_error(416)
+                return None
+            status = 206
+
+        fp = io.BytesIO()
+        with open(path, "rb") as sp:
+            sp.seek(start)
+            fp.write(sp.read(end - start + 1))
+        fp.seek(0)
+        self.send_response(status)
+        if state["accept_ranges"]:
+            self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(end - start + 1))
+        if status == 206:
+            self.send_header("Content-Range", "bytes {}-{}/{}".format(start, end, size))
+        self.end_headers()
+        return fp
+
+
+@pytest.fixture
+def http_server(tmp_path):
+    """
+    Start a HTTP server supporting range requests that serves the "www" folder
+    in `tmp_path`, and returns the root URL of the server and a dictionary
+    containing the headers of the requests made to the server ("requests") and
+    whether range and HEAD requests are supported ("accept_ranges" and
+    "allow_head").
+    """
+    root = tmp_path.joinpath("www")
+    root.mkdir()
+    server = http.server.ThreadingHTTPServer(
+        ("127.0.0.1", 0),
+        functools.partial(RangeRequestHandler, directory=str(root)),
+    )
+    state = {"requests": [], "accept_ranges": True, "allow_head": True}
+    server.state = state  # type: ignore
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield "http://127.0.0.1:{}".format(server.server_address[1]), state
+    server.shutdown()
+    server.server_close()
+
+
+def test_resume_http_download(tmp_path, http_server):
+    """
+    Test that partial HTTP downloads are resumed, unless the remote file
+    has changed.
+    """
+    url, state = http_server
+    content = os.urandom(10000)
+    tmp_path.joinpath("www", "file.bin").write_bytes(content)
+    etag = '"{}"'.format(hashlib.sha256(content).hexdigest())
+
+    remote_file = HttpRemoteFile(url + "/file.bin", pathlib.Path("file.bin"))
+    local_file = tmp_path.joinpath("file.bin")
+
+    # Interrupted download with a valid validator:
+    part = PartFile(local_file)
+    with part.open(0, etag) as fp:
+        fp.write(content[:4000])
+    assert part.offset == 4000
+
+    remote_file.download(local_file)
+    assert local_file.read_bytes() == content
+    assert not part.path.exists()
+    assert state["requests"][-1]["Range"] == "bytes=4000-"
+
+    # Interrupted download of an outdated version of the file:
+    local_file.unlink()
+    with part.open(0, '"outdated"') as fp:
+        fp.write(b"x" * 4000)
+
+    remote_file.download(local_file)
+    assert local_file.read_bytes() == content
+    assert not part.path.exists()
+
+
+def test_segmented_http_download(tmp_path, http_server):
+    """
+    Test the segmented download of a single file, and the fallback to a
+    single stream when the server does not support range requests.
+    """
+    url, state = http_server
+    content = os.urandom(9 * (1 << 16) // 2)
+    tmp_path.joinpath("www", "file.bin").write_bytes(content)
+
+    class SmallSegmentsFile(HttpRemoteFile):
+        MIN_SEGMENT_SIZE = 1 << 16
+
+    class SegmentedProvider(HttpSingleFileProvider):
+        def _list_remote_files(self, name, version, selection=None):
+            return [
+                SmallSegmentsFile(f._remote_url, f.relative_path, f._segments)
+                for f in super()._list_remote_files(name, version, selection)
+            ]
+
+    provider = SegmentedProvider(
+        tmp_path.joinpath("local"), url + "/file.bin", "file", segments=4
+    )
+    path = provider.get_folder("file")
+    assert path.joinpath("file.bin").read_bytes() == content
+    ranges = [r["Range"] for r in state["requests"] if "Range" in r]
+    assert len(ranges) == 4
+
+    # Without support for range requests:
+    state["requests"].clear()
+    state["accept_ranges"] = False
+    path = provider.get_folder("file", force_update=True)
+    assert path.joinpath("file.bin").read_bytes() == content
+    assert not [r for r in state["requests"] if "Range" in r]
+
+    # Without support for HEAD requests:
+    state["accept_ranges"] = True
+    state["allow_head"] = False
+    local_file = tmp_path.joinpath("file.bin")
+    SmallSegmentsFile(url + "/file.bin", pathlib.Path("file.bin"), 4).download(
+        local_file
+    )
+    assert local_file.read_bytes() == content
+
+    # When the file changes between the HEAD and the range requests, the server
+    # answers with the whole file, which is then downloaded as a single stream:
+    state["allow_head"] = True
+    changed = os.urandom(len(content))
+
+    class ChangingFile(SmallSegmentsFile):
+        def _head(self):
+            headers = super()._head()
+            tmp_path.joinpath("www", "file.bin").write_bytes(changed)
+            return headers
+
+    state["requests"].clear()
+    ChangingFile(url + "/file.bin", pathlib.Path("file.bin"), 4).download(local_file)
+    assert local_file.read_bytes() == changed
+    assert not PartFile(local_file).path.exists()
+    assert len([r for r in state["requests"] if "Range" in r]) == 4
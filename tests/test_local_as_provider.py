@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+# Copyright IRT Antoine de Saint Exupéry et Université Paul Sabatier Toulouse III - All
+# rights reserved. DEEL is a research program operated by IVADO, IRT Saint Exupéry,
+# CRIAQ and ANITI - https://www.deel.ai/
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+""" Tests for the materialisation methods and lazy folders of LocalAsProvider"""
+import concurrent.futures
+import errno
+import hashlib
+import json
+import os
+import pathlib
+import typing
+
+import pytest
+
+from deel.datasets.providers import local_as_provider
+from deel.datasets.providers import make_provider
+from deel.datasets.providers.checksum import hash_file
+from deel.datasets.providers.local_as_provider import LocalAsProvider
+from deel.datasets.providers.local_provider import LocalProvider
+from deel.datasets.providers.manifest import Manifest
+from deel.datasets.providers.manifest import ManifestEntry
+from deel.datasets.providers.transfer import copy_file
+
+
+def test_materialize(tmp_path, monkeypatch):
+    """
+    Test the materialisation methods of the local provider, and the fallback
+    to the next method when a method is not supported.
+    """
+    source = tmp_path.joinpath("source")
+    path = source.joinpath("dataset1", "1.0.0")
+    path.joinpath("sub").mkdir(parents=True)
+    path.joinpath("a").write_bytes(b"aaa")
+    path.joinpath("sub", "b").write_bytes(b"bbb")
+
+    provider = LocalAsProvider(tmp_path.joinpath("local"), source, "symlink")
+    local_path = provider.get_folder("dataset1")
+    assert local_path.joinpath("sub", "b").is_symlink()
+    assert local_path.joinpath("sub", "b").resolve() == path.joinpath("sub", "b")
+    assert provider.verify("dataset1", "1.0.0") == []
+
+    provider = LocalAsProvider(
+        tmp_path.joinpath("local2"), source, "hardlink", checksum="sha256"
+    )
+    local_path = provider.get_folder("dataset1")
+    assert local_path.joinpath("a").samefile(path.joinpath("a"))
+    manifest = Manifest.load(provider._make_meta_folder("dataset1", "1.0.0"))
+    assert manifest is not None
+    assert manifest.get("a").digest == hashlib.sha256(b"aaa").hexdigest()
+
+    # Hard links across filesystems fail, the files are copied instead and
+    # hard links are not tried again:
+    links: typing.List[str] = []
+
+    def cross_device_link(source, target):
+        links.append(target)
+        raise OSError(errno.EXDEV, os.strerror(errno.EXDEV))
+
+    monkeypatch.setattr(os, "link", cross_device_link)
+    provider = LocalAsProvider(
+        tmp_path.joinpath("local3"), source, ["hardlink"], max_workers=1
+    )
+    local_path = provider.get_folder("dataset1")
+    assert len(links) == 1
+    assert not local_path.joinpath("a").samefile(path.joinpath("a"))
+    assert local_path.joinpath("sub", "b").read_bytes() == b"bbb"
+
+    provider = make_provider(
+        "local",
+        tmp_path.joinpath("local4"),
+        {"path": source, "copy": True, "materialize": "auto"},
+    )
+    assert provider.get_folder("dataset1").joinpath("a").read_bytes() == b"aaa"
+
+    with pytest.raises(ValueError):
+        LocalAsProvider(tmp_path, source, "move")
+    with pytest.raises(ValueError):
+        LocalAsProvider(tmp_path, source, "symlink", dedup="hardlink")
+
+
+def test_materialize_without_reading(tmp_path, monkeypatch):
+    """
+    Test that files are linked or copied without reading their content, unless
+    the source publishes digests.
+    """
+    source = tmp_path.joinpath("source")
+    path = source.joinpath("dataset1", "1.0.0")
+    path.mkdir(parents=True)
+    path.joinpath("a").write_bytes(b"aaa")
+
+    hashed: typing.List[str] = []
+    copied: typing.List[str] = []
+
+    def recording_hash_file(path, hasher):
+        hashed.append(pathlib.Path(path).name)
+        return hash_file(path, hasher)
+
+    def recording_copy_file(source, target):
+        copied.append(pathlib.Path(target).name)
+        return copy_file(source, target)
+
+    monkeypatch.setattr(local_as_provider, "hash_file", recording_hash_file)
+    monkeypatch.setattr(local_as_provider, "copy_file", recording_copy_file)
+
+    for index, materialize in enumerate(("symlink", "hardlink", "copy")):
+        provider = LocalAsProvider(tmp_path.joinpath(str(index)), source, materialize)
+        local_path = provider.get_folder("dataset1")
+        assert local_path.joinpath("a").read_bytes() == b"aaa"
+        assert hashed == []
+    assert copied == ["a"]
+
+    # Published digests are still checked:
+    Manifest([ManifestEntry("a", digest=hashlib.sha256(b"aaa").hexdigest())]).write(
+        path.joinpath(Manifest.REMOTE_FILENAME)
+    )
+    provider = LocalAsProvider(tmp_path.joinpath("local"), source, "hardlink")
+    provider.get_folder("dataset1")
+    assert hashed == ["a"]
+
+
+def test_lazy_folder(tmp_path):
+    """
+    Test that lazy folders copy files when they are accessed, read the following
+    files ahead and prefetch the files accessed previously.
+    """
+    source = tmp_path.joinpath("source")
+    path = source.joinpath("dataset1", "1.0.0")
+    path.joinpath("sub").mkdir(parents=True)
+    for filename in "abcde":
+        path.joinpath("sub", filename).write_bytes(filename.encode() * 3)
+    path.joinpath("f").write_bytes(b"fff")
+
+    local = tmp_path.joinpath("local")
+    provider = LocalAsProvider(local, source)
+    with provider.get_lazy_folder("dataset1", read_ahead=2) as folder:
+        assert folder.path == local.joinpath("dataset1", "1.0.0")
+        assert list(folder.path.iterdir()) == []
+        with folder.open("sub/b") as fp:
+            assert fp.read() == b"bbb"
+        concurrent.futures.wait(folder._background)
+        assert sorted(f.name for f in folder.path.joinpath("sub").iterdir()) == [
+            "b",
+            "c",
+            "d",
+        ]
+        with pytest.raises(ValueError):
+            folder.open("../1.0.1/a")
+        with pytest.raises(FileNotFoundError):
+            folder.open("sub/g")
+
+    # The version is incomplete, and the accesses are recorded:
+    assert LocalProvider(local).list_versions("dataset1") == []
+    meta_path = provider._make_meta_folder("dataset1", "1.0.0")
+    with open(meta_path.joinpath("access.json")) as fp:
+        assert json.load(fp) == {"sub/b": 1}
+
+    # The files accessed previously are prefetched:
+    folder.path.joinpath("sub", "b").unlink()
+    with provider.get_lazy_folder("dataset1") as folder:
+        concurrent.futures.wait(folder._background)
+        assert folder.path.joinpath("sub", "b").read_bytes() == b"bbb"
+
+    # The copied files are kept by get_folder:
+    inode = folder.path.joinpath("sub", "c").stat().st_ino
+    assert provider.get_folder("dataset1") == folder.path
+    assert folder.path.joinpath("sub", "c").stat().st_ino == inode
+    assert folder.path.joinpath("f").read_bytes() == b"fff"
+    assert LocalProvider(local).list_versions("dataset1") == ["1.0.0"]
+
+    # Placeholders are replaced when accessed, and by get_folder:
+    provider = LocalAsProvider(tmp_path.joinpath("local2"), source)
+    with provider.get_lazy_folder("dataset1", placeholders=True, prefetch=False) as f:
+        assert f.path.joinpath("sub", "e").is_symlink()
+        assert f.path.joinpath("f").read_bytes() == b"fff"
+        with f.open("f") as fp:
+            assert fp.read() == b"fff"
+        assert not f.path.joinpath("f").is_symlink()
+    path = provider.get_folder("dataset1")
+    assert not path.joinpath("sub", "e").is_symlink()
+    assert path.joinpath("sub", "e").read_bytes() == b"eee"
+    assert source.joinpath("dataset1", "1.0.0", "sub", "e").read_bytes() == b"eee"
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+# Copyright IRT Antoine de Saint Exupéry et Université Paul Sabatier Toulouse III - All
+# rights reserved. DEEL is a research program operated by IVADO, IRT Saint Exupéry,
+# CRIAQ and ANITI - https://www.deel.ai/
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+""" Tests for the manifests of dataset versions and the checksums of files"""
+import hashlib
+import threading
+import typing
+import zipfile
+
+import pytest
+
+from deel.datasets.providers.checksum import new_hasher
+from deel.datasets.providers.exceptions import IntegrityError
+from deel.datasets.providers.local_as_provider import LocalAsProvider
+from deel.datasets.providers.local_as_provider import LocalFile
+from deel.datasets.providers.manifest import Manifest
+from deel.datasets.providers.manifest import ManifestEntry
+from deel.datasets.providers.remote_provider import PartFile
+
+
+def test_manifest_resume_and_verify(tmp_path, make_source_dataset):
+    """
+    Test that an interrupted download is resumed without downloading again the
+    files already downloaded, that downloaded files are checked against the
+    manifest published by the remote, and that local versions can be verified.
+    """
+    source = tmp_path.joinpath("source")
+    path = make_source_dataset(
+        source, "dataset1", "1.0.0", {"a": b"aaa", "b": b"bbb", "c": b"ccc"}
+    )
+    published = Manifest(
+        ManifestEntry(
+            f.name,
+            size=f.stat().st_size,
+            digest=hashlib.sha256(f.read_bytes()).hexdigest(),
+        )
+        for f in path.iterdir()
+    )
+    published.write(path.joinpath(Manifest.REMOTE_FILENAME))
+
+    class FailingProvider(LocalAsProvider):
+        # All the downloads are started before the failure:
+        barrier: typing.Optional[threading.Barrier] = threading.Barrier(3)
+        failing: typing.Set[str] = {"c.tar.gz"}
+
+        def _download_file(self, remote_file, local_path, *args):
+            if self.barrier is not None:
+                self.barrier.wait(timeout=10)
+            if remote_file.relative_path.as_posix() in self.failing:
+                raise OSError("connection lost")
+            return super()._download_file(remote_file, local_path, *args)
+
+    local = tmp_path.joinpath("local")
+    provider = FailingProvider(local, source, max_workers=3)
+    with pytest.raises(OSError):
+        provider.get_folder("dataset1", "1.0.0")
+
+    local_path = local.joinpath("dataset1", "1.0.0")
+    meta_path = provider._make_meta_folder("dataset1", "1.0.0")
+    assert Manifest.in_progress(meta_path)
+    assert provider.local_provider().list_versions("dataset1") == []
+    assert provider.verify("dataset1", "1.0.0") is None
+
+    # The partial version is in the staging folder:
+    assert not local_path.exists()
+    inode = (
+        provider._make_staging_folder("dataset1", "1.0.0").joinpath("a").stat().st_ino
+    )
+    provider.barrier = None
+    provider.failing = set()
+    assert provider.get_folder("dataset1", "1.0.0") == local_path
+    assert local_path.joinpath("a").stat().st_ino == inode
+    assert sorted(p.name for p in local_path.iterdir()) == ["a", "b", "c"]
+    assert not Manifest.in_progress(meta_path)
+    assert provider.local_provider().list_versions("dataset1") == ["1.0.0"]
+
+    manifest = Manifest.load(meta_path)
+    assert manifest is not None
+    assert manifest.get("c.tar.gz").digest == published.get("c.tar.gz").digest
+
+    assert provider.verify("dataset1", "1.0.0") == []
+    local_path.joinpath("b").write_bytes(b"b")
+    assert provider.verify("dataset1", "1.0.0") == ["b.tar.gz"]
+
+    # Corrupted file on the remote:
+    published.add(ManifestEntry("a.tar.gz", size=published.get("a.tar.gz").size))
+    published.add(ManifestEntry("b.tar.gz", digest="0" * 64))
+    published.write(path.joinpath(Manifest.REMOTE_FILENAME))
+    with pytest.raises(IntegrityError):
+        LocalAsProvider(tmp_path.joinpath("local2"), source).get_folder("dataset1")
+
+
+def test_checksum_while_downloading(tmp_path, make_source_dataset):
+    """
+    Test that checksums are computed while files are downloaded (or streamed),
+    and that files that do not match the published manifest are downloaded again.
+    """
+    # Resumed downloads hash the content already downloaded first:
+    part = PartFile(tmp_path.joinpath("file"))
+    with part.open(0, "v1") as fp:
+        fp.write(b"abc")
+    hasher = new_hasher("sha256")
+    with part.open(part.offset, "v1", hasher) as fp:
+        fp.write(b"def")
+    part.commit()
+    assert hasher.hexdigest() == hashlib.sha256(b"abcdef").hexdigest()
+
+    source = tmp_path.joinpath("source")
+    path = make_source_dataset(source, "dataset1", "1.0.0", {"a": b"aaa"})
+    with zipfile.ZipFile(path.joinpath("b.zip"), "w") as zp:
+        zp.writestr("b", b"bbb")
+    digests = {
+        f.name: hashlib.sha256(f.read_bytes()).hexdigest() for f in path.iterdir()
+    }
+
+    provider = LocalAsProvider(tmp_path.joinpath("local"), source, checksum="sha256")
+    local_path = provider.get_folder("dataset1")
+    manifest = Manifest.load(provider._make_meta_folder("dataset1", "1.0.0"))
+    assert manifest is not None
+    for name, digest in digests.items():
+        assert manifest.get(name).digest == digest
+
+    provider = LocalAsProvider(tmp_path.joinpath("local2"), source, checksum="blake2b")
+    provider.get_folder("dataset1")
+    manifest = Manifest.load(provider._make_meta_folder("dataset1", "1.0.0"))
+    assert manifest is not None
+    assert manifest.get("b.zip").digest == "blake2b:{}".format(
+        hashlib.blake2b(path.joinpath("b.zip").read_bytes()).hexdigest()
+    )
+
+    with pytest.raises(ValueError):
+        LocalAsProvider(tmp_path.joinpath("local"), source, checksum="md4")
+
+    # Corrupt the first transfer of each file:
+    Manifest(
+        ManifestEntry(name, digest=digest) for name, digest in digests.items()
+    ).write(path.joinpath(Manifest.REMOTE_FILENAME))
+    downloads: typing.List[str] = []
+
+    class FlakyFile(LocalFile):
+        def download(self, local_file, hasher=None):
+            downloads.append(local_file.name)
+            if hasher is None or downloads.count(local_file.name) > 1:
+                return super().download(local_file, hasher)
+            local_file.write_bytes(b"corrupted")
+            hasher.update(b"corrupted")
+
+        @property
+        def streamable(self):
+            return False
+
+    class FlakyProvider(LocalAsProvider):
+        def _list_remote_files(self, name, version, selection=None):
+            return [
+                FlakyFile(f._dataset_path, f.source_path)
+                for f in super()._list_remote_files(name, version, selection)
+            ]
+
+    provider = FlakyProvider(tmp_path.joinpath("local3"), source)
+    local_path = provider.get_folder("dataset1")
+    assert sorted(downloads) == [
+        Manifest.REMOTE_FILENAME,
+        "a.tar.gz",
+        "a.tar.gz",
+        "b.zip",
+        "b.zip",
+    ]
+    assert local_path.joinpath("a").read_bytes() == b"aaa"
+    assert local_path.joinpath("b").read_bytes() == b"bbb"
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+# Copyright IRT Antoine de Saint Exupéry et Université Paul Sabatier Toulouse III - All
+# rights reserved. DEEL is a research program operated by IVADO, IRT Saint Exupéry,
+# CRIAQ and ANITI - https://www.deel.ai/
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+""" Tests for the process-wide provider pool"""
+import io
+import threading
+import time
+import typing
+
+from deel.datasets.dataset import Dataset
+from deel.datasets.providers import Provider
+from deel.datasets.providers.local_provider import LocalProvider
+from deel.datasets.providers.provider_pool import PROVIDER_POOL
+from deel.datasets.providers.provider_pool import ProviderPool
+from deel.datasets.settings import read_settings
+
+
+def test_provider_pool(tmp_path):
+    """
+    Test that providers are reused across leases and loads, and that idle or
+    broken providers are replaced.
+    """
+
+    class PooledProvider(LocalProvider):
+        def __init__(self, root_folder):
+            super().__init__(root_folder)
+            self.healthy = True
+            self.closed = False
+
+        def check_health(self):
+            return self.healthy
+
+        def __exit__(self, *args):
+            self.closed = True
+
+    created: typing.List[PooledProvider] = []
+
+    def factory():
+        created.append(PooledProvider(tmp_path))
+        return created[-1]
+
+    pool = ProviderPool(max_idle=1)
+    with pool.lease("a", factory) as provider:
+        pass
+    with pool.lease("a", factory) as provider2:
+        assert provider2 is provider
+
+        # Concurrent leases use different providers, the extra one is closed:
+        with pool.lease("a", factory) as provider3:
+            assert provider3 is not provider
+        assert not provider3.closed
+    assert provider.closed and not provider3.closed
+    with pool.lease("b", factory) as provider4:
+        assert provider4 is not provider
+
+    # Broken providers are replaced:
+    provider3.healthy = False
+    with pool.lease("a", factory) as provider5:
+        assert provider5 is not provider3 and provider3.closed
+
+    # Threads share the pool:
+    leased: typing.List[Provider] = []
+    thread = threading.Thread(
+        target=lambda: leased.append(pool.lease("a", factory).__enter__())
+    )
+    thread.start()
+    thread.join()
+    assert leased == [provider5]
+
+    # Idle providers expire:
+    pool._idle_timeout = 0
+    with pool.lease("b", factory) as provider6:
+        assert provider6 is not provider4 and provider4.closed
+    pool.clear()
+    assert provider6.closed
+
+    # Idle providers are closed once expired, without using the pool:
+    pool = ProviderPool(idle_timeout=0.05)
+    with pool.lease("a", factory) as provider7:
+        pass
+    with pool.lease("b", factory) as provider8:
+        pass
+    deadline = time.monotonic() + 10
+    while not provider8.closed and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert provider7.closed and provider8.closed
+    assert pool._idle == {} and pool._timer is None
+
+    # Datasets reuse the providers of the process pool:
+    source = tmp_path.joinpath("source")
+    source.joinpath("dataset1", "1.0.0").mkdir(parents=True)
+    source.joinpath("dataset1", "1.0.0", "a").write_bytes(b"a")
+    settings = read_settings(
+        io.StringIO(
+            """version: 2
+path: {}
+providers:
+    local:
+        type: local
+        path: {}
+        copy: true
+""".format(
+                tmp_path.joinpath("local"), source
+            )
+        )
+    )
+    PROVIDER_POOL.clear()
+    with settings.lease_provider("dataset1") as provider:
+        pass
+    assert Dataset("dataset1", settings=settings).load() == tmp_path.joinpath(
+        "local", "dataset1", "1.0.0"
+    )
+    with settings.lease_provider("dataset1") as provider2:
+        assert provider2 is provider
+    PROVIDER_POOL.clear()
@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+# Copyright IRT Antoine de Saint Exupéry et Université Paul Sabatier Toulouse III - All
+# rights reserved. DEEL is a research program operated by IVADO, IRT Saint Exupéry,
+# CRIAQ and ANITI - https://www.deel.ai/
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+""" Tests for the retrieval of dataset versions by remote providers"""
+import logging
+import pathlib
+import shutil
+import subprocess
+import sys
+import tarfile
+import threading
+import time
+import typing
+import zipfile
+
+import pytest
+
+from deel.datasets.providers.exceptions import LockTimeoutError
+from deel.datasets.providers.local_as_provider import LocalAsProvider
+from deel.datasets.providers.manifest import Manifest
+from deel.datasets.providers.remote_provider import PartFile
+
+
+def test_concurrent_downloads(tmp_path, make_source_dataset):
+    """
+    Test that files are downloaded concurrently and that the callbacks
+    are called from the calling thread.
+    """
+    files = {"file{}.txt".format(i): "content {}".format(i).encode() for i in range(8)}
+    make_source_dataset(tmp_path.joinpath("source"), "dataset1", "1.0.0", files)
+
+    class CheckedProvider(LocalAsProvider):
+        threads: typing.Set[int] = set()
+        downloaded: typing.List[pathlib.Path] = []
+
+        def _download_file(self, remote_file, local_path, *args):
+            self.threads.add(threading.get_ident())
+            return super()._download_file(remote_file, local_path, *args)
+
+        def _file_downloaded(self, file, local_file):
+            assert threading.current_thread() is threading.main_thread()
+            self.downloaded.append(local_file)
+            super()._file_downloaded(file, local_file)
+
+    provider = CheckedProvider(
+        tmp_path.joinpath("local"), tmp_path.joinpath("source"), max_workers=4
+    )
+    assert provider.max_workers == 4
+
+    path = provider.get_folder("dataset1")
+    assert path == tmp_path.joinpath("local", "dataset1", "1.0.0")
+    assert len(provider.downloaded) == len(files)
+    assert threading.get_ident() not in provider.threads
+    for filename, content in files.items():
+        assert path.joinpath(filename).read_bytes() == content
+        assert not path.joinpath(filename + ".tar.gz").exists()
+
+    with pytest.raises(ValueError):
+        LocalAsProvider(tmp_path, tmp_path, max_workers=0)
+
+
+def test_clear_folder_keeps_partial_files(tmp_path):
+    """
+    Test that clearing a version folder before a download keeps the partial
+    files of interrupted downloads.
+    """
+    path = tmp_path.joinpath("dataset1", "1.0.0")
+    path.joinpath("sub").mkdir(parents=True)
+    path.joinpath("done.bin").write_bytes(b"x")
+    path.joinpath("sub", "other.bin").write_bytes(b"x")
+    with PartFile(path.joinpath("big.bin")).open(0, '"etag"') as fp:
+        fp.write(b"x")
+
+    LocalAsProvider(tmp_path, tmp_path)._clear_folder(path)
+    assert sorted(p.name for p in path.iterdir()) == [
+        "big.bin.part",
+        "big.bin.part.json",
+    ]
+
+
+def test_delta_sync(tmp_path, make_source_dataset):
+    """
+    Test that only the files that changed are downloaded when a new version
+    is seeded from a previous local version.
+    """
+    source = tmp_path.joinpath("source")
+    path = make_source_dataset(source, "dataset1", "1.0.0", {"a": b"aaa", "b": b"b"})
+    make_source_dataset(source, "dataset1", "1.0.1", {"b": b"BBB"})
+    shutil.copy2(path.joinpath("a.tar.gz"), source.joinpath("dataset1", "1.0.1"))
+
+    local = tmp_path.joinpath("local")
+    provider = LocalAsProvider(local, source, delta_sync="hardlink")
+    path0 = provider.get_folder("dataset1", "1.0.0")
+    path1 = provider.get_folder("dataset1", "1.0.1")
+
+    assert path0.joinpath("a").stat().st_ino == path1.joinpath("a").stat().st_ino
+    assert path0.joinpath("b").stat().st_ino != path1.joinpath("b").stat().st_ino
+    assert path1.joinpath("b").read_bytes() == b"BBB"
+    assert sorted(p.name for p in path1.iterdir()) == ["a", "b"]
+
+    manifest = Manifest.load(
+        provider.local_provider()._make_meta_folder("dataset1", "1.0.1")
+    )
+    assert manifest is not None
+    assert manifest.get("a.tar.gz").outputs == {"a": 3}
+
+    provider.local_provider().del_folder("dataset1", "1.0.0")
+    assert path1.joinpath("a").read_bytes() == b"aaa"
+    assert provider.list_datasets() == ["dataset1"]
+
+
+def test_force_update_revalidation(tmp_path, caplog, make_source_dataset):
+    """
+    Test that a force update only downloads the files that changed, and removes
+    the files that are not on the remote anymore.
+    """
+    source = tmp_path.joinpath("source")
+    path = make_source_dataset(
+        source, "dataset1", "1.0.0", {"a": b"aaa", "b": b"bbb", "c": b"ccc"}
+    )
+
+    local = tmp_path.joinpath("local")
+    provider = LocalAsProvider(local, source)
+    local_path = provider.get_folder("dataset1")
+    inode = local_path.joinpath("a").stat().st_ino
+
+    path.joinpath("b.tar.gz").unlink()
+    path.joinpath("c.tar.gz").unlink()
+    make_source_dataset(source, "dataset2", "1.0.0", {"b": b"BBBB", "d": b"ddd"})
+    for filename in ("b.tar.gz", "d.tar.gz"):
+        source.joinpath("dataset2", "1.0.0", filename).rename(path.joinpath(filename))
+
+    with caplog.at_level(logging.INFO, logger="deel.datasets.providers"):
+        assert provider.get_folder("dataset1", force_update=True) == local_path
+
+    assert sorted(p.name for p in local_path.iterdir()) == ["a", "b", "d"]
+    assert local_path.joinpath("a").stat().st_ino == inode
+    assert local_path.joinpath("b").read_bytes() == b"BBBB"
+    assert "1 unchanged, 1 modified, 1 added, 1 removed" in caplog.text
+
+
+def test_download_lock(tmp_path, make_source_dataset):
+    """
+    Test that concurrent retrievals of the same version are downloaded once, and
+    that the lock of a version is shared between processes.
+    """
+    source = tmp_path.joinpath("source")
+    make_source_dataset(source, "dataset1", "1.0.0", {"a": b"aaa", "b": b"bbb"})
+
+    class SlowProvider(LocalAsProvider):
+        downloads: typing.List[str] = []
+
+        def _download_version(self, name, version, force_update, selection=None):
+            self.downloads.append(version)
+            time.sleep(0.2)
+            super()._download_version(name, version, force_update, selection)
+
+    local = tmp_path.joinpath("local")
+    paths: typing.List[pathlib.Path] = []
+    threads = [
+        threading.Thread(
+            target=lambda: paths.append(
+                SlowProvider(local, source).get_folder("dataset1")
+            )
+        )
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert SlowProvider.downloads == ["1.0.0"]
+    assert paths == [local.joinpath("dataset1", "1.0.0")] * 4
+    assert paths[0].joinpath("b").read_bytes() == b"bbb"
+    assert not local.joinpath("dataset1", ".staging").exists()
+
+    # A lock held by another process:
+    provider = LocalAsProvider(tmp_path.joinpath("local2"), source, lock_timeout=0.3)
+    lock = provider._make_lock("dataset1", "1.0.0")
+    holder = subprocess.Popen(
+        [
+            sys.executable,
+            "-c",
+            "import sys\n"
+            "from deel.datasets.providers.file_lock import FileLock\n"
+            "lock = FileLock(sys.argv[1])\n"
+            "lock.acquire()\n"
+            "print('locked', flush=True)\n"
+            "sys.stdin.read()\n",
+            str(lock.path),
+        ],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+    )
+    try:
+        assert holder.stdout.readline() == b"locked\n"  # type: ignore
+        with pytest.raises(LockTimeoutError):
+            provider.get_folder("dataset1")
+        assert not provider._make_folder("dataset1", "1.0.0").exists()
+    finally:
+        holder.communicate()
+
+    assert lock.acquire(timeout=1)
+    lock.release()
+    assert provider.get_folder("dataset1").joinpath("a").read_bytes() == b"aaa"
+
+
+def test_relative_root_folder(tmp_path, monkeypatch, make_source_dataset):
+    """
+    Test that archives are extracted and recorded in the manifest when the
+    local root folder is relative.
+    """
+    monkeypatch.chdir(tmp_path)
+    path = make_source_dataset(tmp_path.joinpath("source"), "dataset1", "1.0.0", {})
+    with tarfile.open(path.joinpath("a.tar.gz"), "w:gz") as tp:
+        tp.add(__file__, "sub/a.py")
+    with zipfile.ZipFile(path.joinpath("b.zip"), "w") as zp:
+        zp.writestr("sub/b.txt", b"bbb")
+    shutil.copytree(path, path.with_name("1.0.1"))
+
+    provider = LocalAsProvider(pathlib.Path("local"), pathlib.Path("source"))
+    local_path = provider.get_folder("dataset1", "1.0.0")
+    assert local_path == pathlib.Path("local", "dataset1", "1.0.0")
+    assert sorted(p.name for p in local_path.joinpath("sub").iterdir()) == [
+        "a.py",
+        "b.txt",
+    ]
+    manifest = Manifest.load(provider._make_meta_folder("dataset1", "1.0.0"))
+    assert manifest is not None
+    assert list(manifest.get("a.tar.gz").outputs) == ["sub/a.py"]
+
+    # The next version is seeded from the previous one:
+    local_path = provider.get_folder("dataset1", "1.0.1")
+    assert local_path.joinpath("sub", "b.txt").read_bytes() == b"bbb"
+    assert provider.verify("dataset1", "1.0.1") == []
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+# Copyright IRT Antoine de Saint Exupéry et Université Paul Sabatier Toulouse III - All
+# rights reserved. DEEL is a research program operated by IVADO, IRT Saint Exupéry,
+# CRIAQ and ANITI - https://www.deel.ai/
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+""" Tests for the selective retrieval of dataset versions"""
+import gzip
+import io
+import pathlib
+import tarfile
+import typing
+import zipfile
+
+from deel.datasets.dataset import Dataset
+from deel.datasets.providers.local_as_provider import LocalAsProvider
+from deel.datasets.providers.manifest import Manifest
+from deel.datasets.providers.selection import Selection
+
+
+def test_selective_download(tmp_path, monkeypatch):
+    """
+    Test that only the selected files and archive members are downloaded, and
+    that partial versions are topped up.
+    """
+    selection = Selection(["*/cat*"], "**/*.tmp")
+    assert selection.matches("train/cats/1.png")
+    assert not selection.matches("train/dogs/1.png")
+    assert not selection.matches("train/cats/1.tmp")
+    assert selection.may_contain("train") and not selection.may_contain("train/dogs")
+    assert Selection("**/*.zip").members("a/b.zip").everything
+    assert Selection(exclude="*.zip").members("b.zip") is None
+    assert Selection("test").members("b.zip") == Selection("test")
+    assert Selection(exclude="test").members("a/b.zip") == Selection(exclude="test")
+    members = Selection("a/b.zip", "a/b.zip/test").members("a/b.zip")
+    assert members == Selection(exclude=["a/b.zip/test", "a/test"])
+    assert not members.matches("a/test/1.png") and members.matches("a/train/1.png")
+    members = Selection("a/b.zip/train").members("a/b.zip")
+    assert members.matches("a/train/1.png") and not members.matches("a/test/1.png")
+    assert selection.union(Selection("test")).covers(selection)
+    assert not selection.covers(selection.union(Selection("test")))
+
+    source = tmp_path.joinpath("source")
+    path = source.joinpath("dataset1", "1.0.0")
+    for name in ("train/a.txt", "train/b.txt", "test/c.txt", "labels.csv"):
+        path.joinpath(name).parent.mkdir(parents=True, exist_ok=True)
+        path.joinpath(name).write_bytes(name.encode())
+    with tarfile.open(path.joinpath("data.tar.gz"), "w:gz") as tp:
+        for name in ("train/x.txt", "test/y.txt"):
+            info = tarfile.TarInfo(name)
+            info.size = len(name)
+            tp.addfile(info, io.BytesIO(name.encode()))
+    with zipfile.ZipFile(path.joinpath("images.zip"), "w") as zp:
+        zp.writestr("train/z.txt", b"train/z.txt")
+        zp.writestr("test/w.txt", b"test/w.txt")
+    path.joinpath("notes.txt.gz").write_bytes(gzip.compress(b"notes"))
+
+    local = tmp_path.joinpath("local")
+    provider = LocalAsProvider(local, source)
+    fetched: typing.List[str] = []
+    fetch_file = provider._fetch_file
+
+    def record(remote_file, *args):
+        fetched.append(remote_file.relative_path.as_posix())
+        return fetch_file(remote_file, *args)
+
+    monkeypatch.setattr(provider, "_fetch_file", record)
+
+    def local_files(local_path: pathlib.Path) -> typing.List[str]:
+        return sorted(
+            p.relative_to(local_path).as_posix()
+            for p in local_path.rglob("*")
+            if p.is_file()
+        )
+
+    # Only the selected files and members are retrieved:
+    local_path = provider.get_folder("dataset1", selection=Selection("test"))
+    assert local_files(local_path) == ["test/c.txt", "test/w.txt", "test/y.txt"]
+    assert sorted(fetched) == ["data.tar.gz", "images.zip", "test/c.txt"]
+    meta_path = provider._make_meta_folder("dataset1", "1.0.0")
+    assert Selection.load(meta_path) == Selection("test")
+    assert Manifest.load(meta_path).get("data.tar.gz").partial
+
+    # The version already contains the selected files:
+    fetched.clear()
+    assert (
+        provider.get_folder(
+            "dataset1", "1.0.0", offline_first=True, selection=Selection("test")
+        )
+        == local_path
+    )
+    assert provider.get_folder("dataset1", selection=Selection("test")) == local_path
+    assert fetched == []
+
+    # The version is topped up, the partially extracted archives are retrieved
+    # again:
+    provider.get_folder("dataset1", selection=Selection(exclude=["**/b.txt", "*.gz"]))
+    assert local_files(local_path) == [
+        "labels.csv",
+        "test/c.txt",
+        "test/w.txt",
+        "test/y.txt",
+        "train/a.txt",
+        "train/z.txt",
+    ]
+    assert sorted(fetched) == [
+        "data.tar.gz",
+        "images.zip",
+        "labels.csv",
+        "train/a.txt",
+    ]
+
+    # A full request completes the version, the archives whose members were
+    # excluded are retrieved again:
+    fetched.clear()
+    provider.get_folder("dataset1")
+    assert sorted(fetched) == [
+        "data.tar.gz",
+        "images.zip",
+        "notes.txt.gz",
+        "train/b.txt",
+    ]
+    assert len(local_files(local_path)) == 9
+    assert Selection.load(meta_path) is None
+    assert provider.verify("dataset1", "1.0.0") == []
+
+    # Splits can be selected when loading a dataset:
+    class SplitDataset(Dataset):
+        def _get_provider(self):
+            return LocalAsProvider(tmp_path.joinpath("other"), source)
+
+    split_path = SplitDataset("dataset1").load(split="train", exclude="**/x.txt")
+    assert local_files(split_path) == ["train/a.txt", "train/b.txt", "train/z.txt"]
+
+    # Excluded members are not extracted, also by their path in the archive:
+    provider = LocalAsProvider(tmp_path.joinpath("excluded"), source)
+    local_path = provider.get_folder("dataset1", selection=Selection(exclude="test"))
+    assert "test/y.txt" not in local_files(local_path)
+    assert "train/x.txt" in local_files(local_path)
+    provider = LocalAsProvider(tmp_path.joinpath("excluded2"), source)
+    local_path = provider.get_folder(
+        "dataset1", selection=Selection("data.tar.gz", "data.tar.gz/test")
+    )
+    assert local_files(local_path) == ["train/x.txt"]
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+# Copyright IRT Antoine de Saint Exupéry et Université Paul Sabatier Toulouse III - All
+# rights reserved. DEEL is a research program operated by IVADO, IRT Saint Exupéry,
+# CRIAQ and ANITI - https://www.deel.ai/
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+""" Tests for the transfer core shared by the downloads"""
+import io
+import os
+import typing
+
+from deel.datasets.providers import transfer
+
+
+def test_transfer_core(tmp_path):
+    """
+    Test that streams are read with growing chunks into a reusable buffer, and
+    that files are copied completely.
+    """
+    data = os.urandom(3 * transfer.MAX_CHUNK_SIZE + 17)
+
+    class RecordingStream(io.BytesIO):
+        sizes: typing.List[int] = []
+
+        def readinto(self, buffer):
+            self.sizes.append(len(buffer))
+            return super().readinto(buffer)
+
+    stream = RecordingStream(data)
+    target = io.BytesIO()
+    assert transfer.copy_stream(stream, target) == len(data)
+    assert target.getvalue() == data
+    assert stream.sizes[0] == transfer.MIN_CHUNK_SIZE
+    assert stream.sizes[1] == 2 * transfer.MIN_CHUNK_SIZE
+    assert max(stream.sizes) == transfer.MAX_CHUNK_SIZE
+
+    source = tmp_path.joinpath("source.bin")
+    source.write_bytes(data)
+    target_path = tmp_path.joinpath("target.bin")
+    target_path.write_bytes(b"previous content, longer than nothing")
+    with transfer.Progress(len(data), "copy") as progress:
+        transfer.copy_file(source, target_path, progress)
+        assert progress._pbar.n + progress._pending == len(data)
+    assert target_path.read_bytes() == data
+
+    empty = tmp_path.joinpath("empty.bin")
+    empty.write_bytes(b"")
+    transfer.copy_file(empty, target_path)
+    assert target_path.read_bytes() == b""
+
+
+def test_copy_file_short(tmp_path, monkeypatch):
+    """
+    Test that a zero-copy stopping before the end of the file is completed
+    through user space.
+    """
+    data = os.urandom(3 * transfer.MAX_CHUNK_SIZE + 17)
+    source = tmp_path.joinpath("source.bin")
+    source.write_bytes(data)
+    target = tmp_path.joinpath("target.bin")
+
+    calls: typing.List[int] = []
+
+    def short_copy_file_range(src, dst, count, *args):
+        # Copy a single block, then nothing, like a truncated source:
+        calls.append(count)
+        if len(calls) > 1:
+            return 0
+        block = os.read(src, 1024)
+        return os.write(dst, block)
+
+    monkeypatch.setattr(os, "copy_file_range", short_copy_file_range, raising=False)
+    with transfer.Progress(len(data), "copy") as progress:
+        transfer.copy_file(source, target, progress)
+        assert progress._pbar.n + progress._pending == len(data)
+    assert len(calls) == 2
+    assert target.read_bytes() == data
@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+# Copyright IRT Antoine de Saint Exupéry et Université Paul Sabatier Toulouse III - All
+# rights reserved. DEEL is a research program operated by IVADO, IRT Saint Exupéry,
+# CRIAQ and ANITI - https://www.deel.ai/
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+""" Tests for the WebDAV provider"""
+import logging
+import socket
+import threading
+import wsgiref.simple_server
+
+import pytest
+from webdav3.exceptions import WebDavException
+
+from deel.datasets.providers.exceptions import DatasetNotFoundError
+from deel.datasets.providers.manifest import Manifest
+from deel.datasets.providers.webdav_provider import WebDavProvider
+
+
+@pytest.fixture
+def webdav_server(tmp_path):
+    """
+    Start a WebDAV server (WsgiDAV) that serves the "dav" folder in `tmp_path`,
+    and returns the root URL of the server and a dictionary containing the
+    requests made to the server ("requests") and whether `Depth: infinity`
+    listings are allowed ("infinity").
+    """
+    wsgidav_app = pytest.importorskip("wsgidav.wsgidav_app")
+
+    root = tmp_path.joinpath("dav")
+    root.mkdir()
+    app = wsgidav_app.WsgiDAVApp(
+        {
+            "provider_mapping": {"/": str(root)},
+            "simple_dc": {"user_mapping": {"*": True}},
+            "verbose": 0,
+            "logging": {"enable": False},
+        }
+    )
+    state = {"requests": [], "infinity": True}
+
+    def middleware(environ, start_response):
+        depth = environ.get("HTTP_DEPTH")
+        state["requests"].append((environ["REQUEST_METHOD"], depth))
+        if depth == "infinity" and not state["infinity"]:
+            start_response("403 Forbidden", [("Content-Length", "0")])
+            return [b""]
+        return app(environ, start_response)
+
+    class QuietHandler(wsgiref.simple_server.WSGIRequestHandler):
+        def log_message(self, *args):
+            pass
+
+    server = wsgiref.simple_server.make_server(
+        "127.0.0.1", 0, middleware, handler_class=QuietHandler
+    )
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield "http://127.0.0.1:{}".format(server.server_port), state
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.parametrize("infinity", [True, False])
+def test_webdav_recursive_listing(tmp_path, webdav_server, infinity):
+    """
+    Test that the files of a WebDAV dataset are listed recursively with their
+    size, using a single request when the server allows it.
+    """
+    url, state = webdav_server
+    path = tmp_path.joinpath("dav", "dataset1", "1.0.0")
+    path.joinpath("sub", "deeper").mkdir(parents=True)
+    path.joinpath("a").write_bytes(b"aaa")
+    path.joinpath("sub", "b").write_bytes(b"bb")
+    path.joinpath("sub", "deeper", "c").write_bytes(b"c")
+
+    state["infinity"] = infinity
+    provider = WebDavProvider(tmp_path.joinpath("local"), url)
+    files = provider._list_remote_files("dataset1", "1.0.0")
+
+    assert [(f.relative_path.as_posix(), f.size) for f in files] == [
+        ("a", 3),
+        ("sub/b", 2),
+        ("sub/deeper/c", 1),
+    ]
+    assert all(f.signature is not None for f in files)
+    if infinity:
+        assert state["requests"] == [("PROPFIND", "infinity")]
+    else:
+        assert state["requests"].count(("PROPFIND", "1")) == 3
+
+    local_path = provider.get_folder("dataset1", "1.0.0")
+    assert local_path.joinpath("sub", "deeper", "c").read_bytes() == b"c"
+
+
+def test_webdav_catalogue(tmp_path, webdav_server):
+    """
+    Test that the datasets and versions on a WebDAV server are listed with one
+    request per dataset, and that loading a dataset does not list the server.
+    """
+    url, state = webdav_server
+    root = tmp_path.joinpath("dav")
+    for name, version in [
+        ("dataset1", "1.0.0"),
+        ("dataset1", "1.0.1"),
+        ("ds2", "2.0.0"),
+    ]:
+        root.joinpath(name, version).mkdir(parents=True)
+        root.joinpath(name, version, "file").write_bytes(b"x")
+    root.joinpath("other", "folder").mkdir(parents=True)
+    root.joinpath(".hidden", "1.0.0").mkdir(parents=True)
+
+    provider = WebDavProvider(tmp_path.joinpath("local"), url)
+    assert sorted(provider.list_datasets()) == ["dataset1", "ds2"]
+    assert sorted(provider.list_versions("dataset1")) == ["1.0.0", "1.0.1"]
+    with pytest.raises(DatasetNotFoundError):
+        provider.list_versions("other")
+    assert len(state["requests"]) == 4
+
+    state["requests"].clear()
+    provider = WebDavProvider(tmp_path.joinpath("local"), url)
+    provider.get_folder("dataset1")
+    assert state["requests"] == [
+        ("PROPFIND", "1"),
+        ("PROPFIND", "infinity"),
+        ("GET", None),
+    ]
+
+    with pytest.raises(DatasetNotFoundError):
+        provider.get_folder("other")
+
+
+def test_catalogue_cache(tmp_path, webdav_server):
+    """
+    Test that loading a dataset already on disk does not contact the remote
+    when the catalogue is cached, and that stale values are refreshed.
+    """
+    url, state = webdav_server
+    path = tmp_path.joinpath("dav", "dataset1", "1.0.0")
+    path.mkdir(parents=True)
+    path.joinpath("file").write_bytes(b"x")
+
+    local = tmp_path.joinpath("local")
+    with WebDavProvider(local, url, catalogue_ttl=3600) as provider:
+        local_path = provider.get_folder("dataset1")
+
+    state["requests"].clear()
+    with WebDavProvider(local, url, catalogue_ttl=3600) as provider:
+        assert provider.get_folder("dataset1") == local_path
+        assert provider.list_catalogue() == {"dataset1": ["1.0.0"]}
+        assert provider.list_catalogue() == {"dataset1": ["1.0.0"]}
+    assert len(state["requests"]) == 2
+
+    # Stale values are used while being refreshed in the background:
+    tmp_path.joinpath("dav", "dataset1", "1.0.1").mkdir()
+    state["requests"].clear()
+    with WebDavProvider(
+        local, url, catalogue_ttl=0, catalogue_max_stale=3600
+    ) as provider:
+        assert provider.get_folder("dataset1") == local_path
+    assert state["requests"] == [("PROPFIND", "1")]
+
+    state["requests"].clear()
+    with WebDavProvider(local, url, catalogue_ttl=3600) as provider:
+        assert provider.get_folder("dataset1", "1.0.1").name == "1.0.1"
+        provider.invalidate_catalogue()
+        assert sorted(provider.list_catalogue()["dataset1"]) == ["1.0.0", "1.0.1"]
+    assert state["requests"][0] == ("PROPFIND", "infinity")
+
+
+def test_offline_first(tmp_path, webdav_server):
+    """
+    Test that complete local versions are used without contacting the remote
+    when an exact version is requested with the offline-first policy.
+    """
+    url, state = webdav_server
+    path = tmp_path.joinpath("dav", "dataset1", "1.0.0")
+    path.mkdir(parents=True)
+    path.joinpath("file").write_bytes(b"x")
+
+    local = tmp_path.joinpath("local")
+    provider = WebDavProvider(local, url, offline_first=True)
+    local_path = provider.get_folder("dataset1", "1.0.0")
+
+    state["requests"].clear()
+    assert provider.get_folder("dataset1", "1.0.0") == local_path
+    assert state["requests"] == []
+
+    # Selectors and per-call policy still contact the remote:
+    assert provider.get_folder("dataset1", "1.0") == local_path
+    assert provider.get_folder("dataset1", "1.0.0", offline_first=False) == local_path
+    assert len(state["requests"]) == 2
+
+    # Incomplete versions are resolved using the remote:
+    Manifest.remove(provider._make_meta_folder("dataset1", "1.0.0"))
+    state["requests"].clear()
+    assert provider.get_folder("dataset1", "1.0.0") == local_path
+    assert state["requests"] == [("PROPFIND", "1")]
+
+
+def test_webdav_server_down(tmp_path, webdav_server, caplog):
+    """
+    Test that the local version is used when the server cannot be reached.
+    """
+    url, _ = webdav_server
+    path = tmp_path.joinpath("dav", "dataset1", "1.0.0")
+    path.mkdir(parents=True)
+    path.joinpath("file").write_bytes(b"x")
+
+    local = tmp_path.joinpath("local")
+    local_path = WebDavProvider(local, url).get_folder("dataset1")
+
+    # Nothing listens on a port that was just released:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        down_url = "http://127.0.0.1:{}".format(sock.getsockname()[1])
+
+    provider = WebDavProvider(local, down_url)
+    with caplog.at_level(logging.WARNING, logger="deel.datasets.providers"):
+        assert provider.get_folder("dataset1") == local_path
+    assert "might be outdated" in caplog.text
+    with pytest.raises(DatasetNotFoundError):
+        provider.get_folder("dataset2")
+    with pytest.raises(WebDavException):
+        provider.list_datasets()